@@ -1,4 +1,53 @@
-import json, subprocess, sys, pathlib, shlex
+"""
+Запуск старого CLI интервью (configs/ajtd.yaml → interview.legacy) по сегментам.
+
+run_legacy_interview — один сегмент, один процесс CLI.
+run_legacy_interviews — много сегментов: не больше workers одновременно; с persistent=True
+каждый слот держит один долгоживущий процесс CLI (`<cmd> --serve`), который обслуживает
+сегменты по протоколу JSON-строк через stdin/stdout:
+
+  worker → {"event": "ready"}                                    после старта
+  runner → {"id": "<сегмент>", "input": "<task_path>", "outdir": "<out_dir>"}
+  worker → {"id": ..., "event": "output", ...}                   0..n раз, передаётся в on_event
+  worker → {"id": ..., "event": "done"} | {"id": ..., "event": "error", "error": "..."}
+
+Не-JSON строки stdout (логи CLI) пропускаются. Таймаут — на сегмент: зависший worker
+убивается и перезапускается для следующего сегмента. Если worker не ответил ready
+(CLI без --serve), слот работает по-старому — процесс на сегмент.
+"""
+
+import json
+import os
+import pathlib
+import queue
+import shlex
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from utils.tracing import tracer
+
+SERVE_ARG = "--serve"
+STARTUP_TIMEOUT_SEC = 60
+
+
+def _argv(cmd: str, *args: str):
+    """Команда без shell: список аргументов (на Windows — строка, её разбирает CreateProcess)."""
+    if os.name == "nt":
+        return f"{cmd} {subprocess.list2cmdline(args)}" if args else cmd
+    return shlex.split(cmd) + list(args)
+
+
+def _check_outputs(out_dir: str) -> None:
+    iraw = pathlib.Path(out_dir, "interview_raw.md")
+    ij = pathlib.Path(out_dir, "interview.json")
+    if not iraw.exists() or not ij.exists():
+        raise FileNotFoundError("Legacy CLI did not produce interview_raw.md and/or interview.json")
+    # Базовая валидация JSON (схема проверяется в шаге):
+    json.loads(ij.read_text(encoding="utf-8"))
+
 
 def run_legacy_interview(task_path: str, out_dir: str, cmd: str, timeout_sec: int) -> None:
     """
@@ -8,17 +57,140 @@ def run_legacy_interview(task_path: str, out_dir: str, cmd: str, timeout_sec: in
     side-effects: создает interview_raw.md и interview.json в out_dir
     """
     pathlib.Path(out_dir).mkdir(parents=True, exist_ok=True)
-    # Запускаем ваш CLI как вы делали в cmd:
-    full_cmd = f'{cmd} --input {shlex.quote(task_path)} --outdir {shlex.quote(out_dir)}'
     try:
-        subprocess.run(full_cmd, shell=True, check=True, timeout=timeout_sec)
+        subprocess.run(_argv(cmd, "--input", task_path, "--outdir", out_dir), check=True, timeout=timeout_sec)
     except subprocess.CalledProcessError as e:
         raise RuntimeError(f"Legacy CLI failed: {e}") from e
+    _check_outputs(out_dir)
 
-    # Проверяем выходы:
-    iraw = pathlib.Path(out_dir, "interview_raw.md")
-    ij = pathlib.Path(out_dir, "interview.json")
-    if not iraw.exists() or not ij.exists():
-        raise FileNotFoundError("Legacy CLI did not produce interview_raw.md and/or interview.json")
-    # Базовая валидация JSON (схема проверяется в шаге):
-    json.loads(ij.read_text(encoding="utf-8"))
+
+class _Worker:
+    """Долгоживущий процесс CLI в режиме --serve; stdout читает отдельный поток в очередь."""
+
+    def __init__(self, cmd: str):
+        self.proc = subprocess.Popen(_argv(cmd, SERVE_ARG), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     text=True, encoding="utf-8", bufsize=1)
+        self.lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+        try:
+            ready = self._next(time.monotonic() + STARTUP_TIMEOUT_SEC)
+        except TimeoutError:
+            ready = None
+        if not ready or ready.get("event") != "ready":
+            self.close(kill=True)
+            raise RuntimeError("Legacy worker did not report ready")
+
+    def _read(self) -> None:
+        for line in self.proc.stdout:
+            self.lines.put(line)
+        self.lines.put(None)  # EOF: процесс завершился
+
+    def _next(self, deadline: float) -> Optional[dict]:
+        """Следующее JSON-сообщение; None — процесс завершился."""
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError
+            try:
+                line = self.lines.get(timeout=remaining)
+            except queue.Empty:
+                raise TimeoutError from None
+            if line is None:
+                return None
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(message, dict):
+                return message
+
+    def run(self, task_id: str, task_path: str, out_dir: str, timeout_sec: int,
+            on_event: Optional[Callable[[str, dict], None]]) -> None:
+        request = {"id": task_id, "input": task_path, "outdir": out_dir}
+        self.proc.stdin.write(json.dumps(request, ensure_ascii=False) + "\n")
+        self.proc.stdin.flush()
+        deadline = time.monotonic() + timeout_sec
+        while True:
+            message = self._next(deadline)
+            if message is None:
+                raise RuntimeError(f"Legacy worker exited with code {self.proc.poll()}")
+            if message.get("id") != task_id:
+                continue
+            event = message.get("event")
+            if event == "done":
+                return
+            if event == "error":
+                raise RuntimeError(f"Legacy CLI failed: {message.get('error')}")
+            if on_event:
+                on_event(task_id, message)
+
+    def close(self, kill: bool = False) -> None:
+        if kill:
+            self.proc.kill()
+        else:
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=10)
+            except (OSError, subprocess.TimeoutExpired):
+                self.proc.kill()
+        self.proc.wait()
+
+
+def run_legacy_interviews(tasks: List[Tuple[str, str]], cmd: str, timeout_sec: int, workers: int = 4,
+                          persistent: bool = False,
+                          on_event: Optional[Callable[[str, dict], None]] = None) -> List[dict]:
+    """
+    tasks: [(task_path, out_dir)], id сегмента — имя out_dir.
+    Ошибка сегмента не прерывает остальные. Возвращает результаты в порядке tasks:
+    {"segment", "out_dir", "status": "ok"|"error", "error"?, "mode": "worker"|"process", "sec"}.
+    """
+    pending: "queue.Queue[int]" = queue.Queue()
+    for i in range(len(tasks)):
+        pending.put(i)
+    results: List[Optional[dict]] = [None] * len(tasks)
+
+    def slot() -> None:
+        worker: Optional[_Worker] = None
+        use_worker = persistent
+        while True:
+            try:
+                i = pending.get_nowait()
+            except queue.Empty:
+                break
+            task_path, out_dir = tasks[i]
+            segment = pathlib.Path(out_dir).name
+            result = {"segment": segment, "out_dir": out_dir, "status": "ok"}
+            started = time.perf_counter()
+            with tracer.span("legacy.segment", kind="subprocess", segment=segment) as sp:
+                if use_worker and worker is None:
+                    try:
+                        worker = _Worker(cmd)
+                    except (OSError, RuntimeError):
+                        use_worker = False  # CLI без --serve — процесс на сегмент
+                result["mode"] = "worker" if worker else "process"
+                try:
+                    if worker:
+                        pathlib.Path(out_dir).mkdir(parents=True, exist_ok=True)
+                        worker.run(segment, task_path, out_dir, timeout_sec, on_event)
+                        _check_outputs(out_dir)
+                    else:
+                        run_legacy_interview(task_path, out_dir, cmd, timeout_sec)
+                except (TimeoutError, subprocess.TimeoutExpired):
+                    result.update(status="error", error=f"timeout after {timeout_sec}s")
+                    if worker:
+                        worker.close(kill=True)  # завис на сегменте
+                except (OSError, RuntimeError, ValueError) as e:
+                    result.update(status="error", error=str(e))
+                if worker and worker.proc.poll() is not None:
+                    worker = None  # упал или убит по таймауту — следующий сегмент поднимет новый
+                sp.set(mode=result["mode"], status=result["status"])
+            result["sec"] = round(time.perf_counter() - started, 3)
+            results[i] = result
+        if worker:
+            worker.close()
+
+    n_slots = max(1, min(workers, len(tasks)))
+    with ThreadPoolExecutor(max_workers=n_slots) as pool:
+        for future in [pool.submit(tracer.wrap(slot)) for _ in range(n_slots)]:
+            future.result()
+    return results
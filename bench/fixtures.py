@@ -0,0 +1,96 @@
+"""
+Генераторы синтетических данных для бенчмарков поверх фикстур Matrius.
+Всё детерминировано (фиксированный seed), чтобы прогоны были сравнимы.
+"""
+
+import json
+import random
+import re
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+SITE_DIR = FIXTURES_DIR / "site"
+MATRIUS_DATA_DIR = REPO_ROOT / "projects" / "Matrius" / "AJTBD_C" / "data"
+
+SEED = 20240115
+
+
+def landing_html(scale: int = 1) -> str:
+    """Сохранённый лендинг; при scale > 1 блоки <main> повторяются, имитируя длинную страницу."""
+    html = (SITE_DIR / "index.html").read_text(encoding="utf-8")
+    if scale <= 1:
+        return html
+    match = re.search(r"<main>(.*)</main>", html, flags=re.S)
+    body = match.group(1)
+    repeated = "".join(body.replace('id="', f'id="r{i}-') for i in range(scale))
+    return html[: match.start(1)] + repeated + html[match.end(1):]
+
+
+def _seed_jobs() -> list:
+    seeds = json.loads((MATRIUS_DATA_DIR / "jtbd_seeds.json").read_text(encoding="utf-8"))
+    return seeds.get("jtbd_seeds", [])
+
+
+def write_ljd_segments(run_dir: Path, n_segments: int = 200) -> None:
+    """Кладёт 03_ljd/<segment>/ljd.json, как их ожидает step_06a_cluster."""
+    rnd = random.Random(SEED)
+    jobs = _seed_jobs()
+    for i in range(n_segments):
+        job = jobs[i % len(jobs)]
+        seg_dir = run_dir / "03_ljd" / f"S-{i:04d}"
+        seg_dir.mkdir(parents=True, exist_ok=True)
+        ljd = {
+            "segment_id": f"S-{i:04d}",
+            "job_title": f"{job['industry']} manager",
+            "pains": rnd.sample(job["pain_points"], k=min(3, len(job["pain_points"]))),
+            "triggers": [job["context"]],
+            "constraints": ["бюджет ограничен", "нет ИТ-отдела"][: 1 + i % 2],
+            "desired_outcomes": rnd.sample(job["desired_outcomes"], k=min(2, len(job["desired_outcomes"]))),
+        }
+        (seg_dir / "ljd.json").write_text(json.dumps(ljd, ensure_ascii=False), encoding="utf-8")
+
+
+def jtbd_artifact(n_jobs: int = 300) -> dict:
+    """Крупный артефакт step_04_jtbd для бенча validate_artifact."""
+    jobs = _seed_jobs()
+    items = []
+    for i in range(n_jobs):
+        job = jobs[i % len(jobs)]
+        items.append({
+            "job_id": f"J-{i:05d}",
+            "statement": job["job_statement"],
+            "type": "functional",
+            "outcomes": job["desired_outcomes"],
+            "frequency": "high",
+            "importance": 4,
+            "tags": ["pain_point", job["industry"].lower()],
+            "evidence_refs": [{
+                "id": f"E-{i:05d}",
+                "source_type": "interview",
+                "quote": job["pain_points"][0],
+                "confidence": 0.8,
+                "tags": ["pain_point"],
+            }],
+        })
+    return {"jobs": items}
+
+
+def write_interview_corpus(run_dir: Path, n_sessions: int = 2000) -> None:
+    """interviews/simulated.jsonl и corpus.sqlite в формате step_03_interview_collect для бенча загрузки корпуса."""
+    from utils.corpus_store import CorpusStore
+
+    canned = json.loads((FIXTURES_DIR / "llm_canned.json").read_text(encoding="utf-8"))
+    sessions = next(r["response"]["sessions"] for r in canned if "sessions" in r["response"])
+    interviews_dir = run_dir / "interviews"
+    store = CorpusStore.create(interviews_dir)
+    batch = []
+    with (interviews_dir / "simulated.jsonl").open("w", encoding="utf-8") as f:
+        for i in range(n_sessions):
+            template = sessions[i % len(sessions)]
+            quotes = [dict(q, local_id=q["id"], id=f"E-{i:05d}-{j}") for j, q in enumerate(template.get("quotes", []))]
+            session = dict(template, session_id=f"SES-{i:05d}", quotes=quotes)
+            f.write(json.dumps({"session": session}, ensure_ascii=False) + "\n")
+            batch.append(session)
+    store.add_sessions(batch, "simulated")
+    store.close()
@@ -0,0 +1,375 @@
+"""
+Офлайн-бенчмарки workflow.
+
+    python -m bench.run_bench                      # все кейсы, сравнение с bench/baseline.json
+    python -m bench.run_bench --cases extract_landing,cluster --repeat 5
+    python -m bench.run_bench --update-baseline    # перезаписать baseline текущими цифрами
+
+Каждый кейс выполняется в отдельном подпроцессе (чистый peak RSS, холодные импорты),
+LLM заменяется на bench.stub_llm.StubLLM. Метрики: wall, CPU, peak RSS, токены;
+для кейса pipeline — ещё и по каждому шагу WORKFLOW_STEPS.
+Код возврата 1, если какой-то показатель хуже baseline больше чем на --threshold.
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+
+# Абсолютный допуск, чтобы шум на миллисекундных кейсах не считался регрессией
+MIN_ABS_REGRESSION_SEC = 0.02
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_fixtures(directory: Path):
+    """Локальный HTTP-сервер над bench/fixtures/site; отдаёт base_url."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=str(directory)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss: килобайты на Linux, байты на macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+@contextmanager
+def _bench_run_dir():
+    """Временный artifacts/bench_<id>: шаги ищут данные относительно artifacts/<run_id>."""
+    run_id = f"bench_{uuid.uuid4().hex[:8]}"
+    run_dir = Path("artifacts") / run_id
+    run_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        yield run_id, run_dir
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+# Кэши между прогонами (config.*_DIR) — в отдельный временный каталог: бенч не оставляет файлов
+# в artifacts/ и не зависит от того, что там накопилось
+BENCH_CACHE_ENV = {
+    "HTTP_CACHE_DIR": "http_cache",
+    "LANDING_SNAPSHOT_DIR": "landing_snapshots",
+    "OFFER_CLASSIFIER_MODEL": "offer_classifier/model.json",
+    "OFFER_CLASSIFIER_HISTORY_DIR": "offer_classifier/history",
+    "GUIDE_CACHE_DIR": "guide_cache",
+}
+
+
+@contextmanager
+def _isolated_caches():
+    """Переменные окружения кэшей → временный каталог; подпроцессы кейсов наследуют окружение."""
+    saved = {name: os.environ.get(name) for name in BENCH_CACHE_ENV}
+    with tempfile.TemporaryDirectory(prefix="bench_cache_") as cache_root:
+        os.environ.update({name: str(Path(cache_root) / sub) for name, sub in BENCH_CACHE_ENV.items()})
+        try:
+            yield cache_root
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+
+def _measure(fn, tracer=None) -> dict:
+    tokens_before = tracer.totals(kind="llm", attr="total_tokens") if tracer else 0
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    fn()
+    metrics = {
+        "wall_sec": round(time.perf_counter() - wall_start, 4),
+        "cpu_sec": round(time.process_time() - cpu_start, 4),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    if tracer:
+        metrics["tokens"] = int(tracer.totals(kind="llm", attr="total_tokens") - tokens_before)
+    return metrics
+
+
+# --- Кейсы -----------------------------------------------------------------
+
+def case_extract_landing(args, page_scale: int = 1, parser: str = None) -> dict:
+    from bench.fixtures import landing_html
+    from collectors.landing import extract_landing, parse_html
+    from workflow.steps.step_02_extract import Step
+
+    html = landing_html(scale=page_scale * args.scale).encode("utf-8")
+    step = Step()
+    result = {}
+
+    def run():
+        soup = parse_html(html, parser=parser)
+        result.update(step._extract_structured_content(soup, "http://bench.local/"))
+
+    metrics = _measure(run)
+    metrics["input_bytes"] = len(html)
+    # Паритет с эталоном: html.parser, как до выбора парсера
+    reference = extract_landing(parse_html(html, parser="html.parser"), "http://bench.local/")
+    metrics["parity"] = _strip_timestamp(result) == _strip_timestamp(reference)
+    return metrics
+
+
+def _strip_timestamp(data: dict) -> dict:
+    return {k: v for k, v in data.items() if k != "extraction_timestamp"}
+
+
+def case_crawl_site(args) -> dict:
+    """Режим crawl step_02_extract по локальному серверу с фикстурами (robots.txt, sitemap.xml)."""
+    from bench.fixtures import SITE_DIR
+    from collectors.crawler import CrawlSettings, SiteCrawler
+
+    result = {}
+    with serve_fixtures(SITE_DIR) as base_url, tempfile.TemporaryDirectory() as cache_dir:
+        crawler = SiteCrawler(CrawlSettings(max_pages=20, host_delay_sec=0.0))
+        crawler.cache.cache_dir = Path(cache_dir)
+        metrics = _measure(lambda: result.update(crawler.crawl(f"{base_url}/")))
+    metrics["pages"] = result["stats"]["pages"]
+    return metrics
+
+
+def case_cluster(args) -> dict:
+    from bench.fixtures import write_ljd_segments
+    from workflow.registry import load_step
+
+    step = load_step("step_06a_cluster")
+    with _bench_run_dir() as (run_id, run_dir):
+        write_ljd_segments(run_dir, n_segments=200 * args.scale)
+        return _measure(lambda: step.run({"run_id": run_id}, {}))
+
+
+def case_validate(args) -> dict:
+    from bench.fixtures import jtbd_artifact
+    from validators.validate import validate_artifact
+
+    data = jtbd_artifact(n_jobs=300 * args.scale)
+    return _measure(lambda: validate_artifact("step_04_jtbd", data, {}))
+
+
+def case_corpus_load(args) -> dict:
+    from bench.fixtures import write_interview_corpus
+    from bench.stub_llm import estimate_tokens
+    from config import JTBD_EVIDENCE_TOKENS
+    from utils.corpus_store import CorpusStore
+    from workflow.steps.step_04_jtbd import _evidence_digest
+
+    def load(run_dir: Path) -> str:
+        store = CorpusStore.open(run_dir)
+        try:
+            return _evidence_digest(store, ["Математика", "Скорочтение"], estimate_tokens, JTBD_EVIDENCE_TOKENS)
+        finally:
+            store.close()
+
+    with _bench_run_dir() as (_, run_dir):
+        write_interview_corpus(run_dir, n_sessions=2000 * args.scale)
+        return _measure(lambda: load(run_dir))
+
+
+def case_pipeline(args) -> dict:
+    """Полный WORKFLOW_STEPS без HITL/рефлексии, как один проход main.py."""
+    from bench.fixtures import SITE_DIR
+    from config import WORKFLOW_STEPS
+    from main import build_context
+    from utils.io import save_artifact
+    from utils.tracing import tracer
+    from validators.validate import validate_artifact
+    from workflow.registry import load_step
+
+    input_template = (BENCH_DIR / "fixtures" / "pipeline_input.json").read_text(encoding="utf-8")
+    steps_metrics = {}
+    with serve_fixtures(SITE_DIR) as base_url, _bench_run_dir() as (run_id, run_dir):
+        tracer.configure(run_dir / "trace.jsonl")
+        context = build_context(run_id, run_dir, json.loads(input_template.replace("{base_url}", base_url)))
+        artifacts = {}
+
+        def run_step(step_name: str):
+            step = load_step(step_name)
+            context["current_standard_text"] = context["md_standards"].get(step_name, "")
+            context["current_schema"] = context["schemas"].get(step_name, {})
+            with tracer.span(step_name, kind="step", step=step_name):
+                result = step.run(context, artifacts)
+                schema_score, checklist_score, _ = validate_artifact(step_name, result.data, context["schemas"])
+                artifacts[step_name] = result.data
+                save_artifact(run_dir, step_name, result, 0.0)
+            steps_metrics[step_name]["score"] = round(min(result.score, schema_score, checklist_score), 3)
+
+        total = {"wall_sec": 0.0, "cpu_sec": 0.0, "tokens": 0}
+        for step_name in WORKFLOW_STEPS:
+            steps_metrics[step_name] = {}
+            steps_metrics[step_name].update(_measure(partial(run_step, step_name), tracer))
+            for key in total:
+                total[key] += steps_metrics[step_name].get(key, 0)
+
+    return {**{k: round(v, 4) for k, v in total.items()}, "peak_rss_mb": _peak_rss_mb(), "steps": steps_metrics}
+
+
+CASES = {
+    "extract_landing": case_extract_landing,
+    "extract_landing_large": partial(case_extract_landing, page_scale=40),
+    "extract_landing_large_html_parser": partial(case_extract_landing, page_scale=40,
+                                                 parser="html.parser"),
+    "crawl_site": case_crawl_site,
+    "cluster": case_cluster,
+    "validate": case_validate,
+    "corpus_load": case_corpus_load,
+    "pipeline": case_pipeline,
+}
+
+
+# --- Оркестрация -----------------------------------------------------------
+
+def _run_child(args) -> None:
+    """Выполняет один кейс в текущем процессе и пишет метрики в --child-out."""
+    import llm.client
+    from bench.stub_llm import StubLLM
+
+    # Шаги делают `from llm.client import LLM` при загрузке модуля — подменяем до импорта шагов
+    llm.client.LLM = partial(StubLLM, latency_sec=args.llm_latency_ms / 1000.0)
+    metrics = CASES[args.child](args)
+    Path(args.child_out).write_text(json.dumps(metrics, ensure_ascii=False), encoding="utf-8")
+
+
+def _run_case(case: str, args) -> dict:
+    runs = []
+    for _ in range(args.repeat):
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+            out_path = Path(tmp.name)
+        cmd = [sys.executable, "-m", "bench.run_bench", "--child", case, "--child-out", str(out_path),
+               "--scale", str(args.scale), "--llm-latency-ms", str(args.llm_latency_ms)]
+        proc = subprocess.run(cmd, cwd=REPO_ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"Bench case '{case}' failed:\n{proc.stderr[-2000:]}")
+        runs.append(json.loads(out_path.read_text(encoding="utf-8")))
+        out_path.unlink(missing_ok=True)
+    return _aggregate(runs)
+
+
+def _aggregate(runs: list) -> dict:
+    """Медиана по времени, максимум по памяти; вложенные steps агрегируются так же."""
+    result = {}
+    for key, value in runs[0].items():
+        if key == "steps":
+            result[key] = {name: _aggregate([r[key][name] for r in runs]) for name in value}
+        elif key in ("wall_sec", "cpu_sec"):
+            result[key] = round(statistics.median(r[key] for r in runs), 4)
+        elif key == "peak_rss_mb":
+            result[key] = max(r[key] for r in runs)
+        else:
+            result[key] = value
+    return result
+
+
+def compare(current: dict, baseline: dict, threshold: float, prefix: str = "") -> list:
+    """Возвращает список регрессий (строк) относительно baseline."""
+    regressions = []
+    if current.get("parity") is False:
+        regressions.append(f"{prefix}parity: output differs from the html.parser reference")
+    for key in ("wall_sec", "cpu_sec", "tokens", "peak_rss_mb"):
+        if key not in current or key not in baseline:
+            continue
+        cur, base = current[key], baseline[key]
+        if key in ("wall_sec", "cpu_sec") and cur - base < MIN_ABS_REGRESSION_SEC:
+            continue
+        if base and cur > base * (1 + threshold):
+            regressions.append(f"{prefix}{key}: {base} → {cur} (+{(cur / base - 1) * 100:.0f}%)")
+    for name, step_metrics in current.get("steps", {}).items():
+        base_step = baseline.get("steps", {}).get(name)
+        if base_step:
+            regressions.extend(compare(step_metrics, base_step, threshold, f"{prefix}{name}."))
+    return regressions
+
+
+def _print_report(results: dict, baseline: dict) -> None:
+    print(f"{'case':<42} {'wall,s':>9} {'cpu,s':>9} {'rss,MB':>8} {'tokens':>8} {'base wall':>10}")
+    for case, metrics in results.items():
+        rows = [(case, metrics, baseline.get(case, {}))]
+        rows += [(f"  {name}", m, baseline.get(case, {}).get("steps", {}).get(name, {}))
+                 for name, m in metrics.get("steps", {}).items()]
+        for label, m, base in rows:
+            print(f"{label:<42} {m.get('wall_sec', 0):>9.4f} {m.get('cpu_sec', 0):>9.4f} "
+                  f"{m.get('peak_rss_mb', 0):>8} {m.get('tokens', '-'):>8} {base.get('wall_sec', '-'):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline workflow benchmarks")
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma-separated case names")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (median is reported)")
+    parser.add_argument("--scale", type=int, default=1, help="Input size multiplier")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated latency of each stub LLM call")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression vs baseline")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--child-out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _run_child(args)
+        return
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(unknown)}. Available: {', '.join(CASES)}")
+
+    with _isolated_caches():
+        results = {case: _run_case(case, args) for case in cases}
+
+    baseline_path = Path(args.baseline)
+    baseline_doc = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}
+    baseline = baseline_doc.get("cases", {})
+    _print_report(results, baseline)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({"cases": results}, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.update_baseline:
+        baseline_doc = {
+            "meta": {"scale": args.scale, "repeat": args.repeat, "python": sys.version.split()[0]},
+            "cases": {**baseline, **results},
+        }
+        baseline_path.write_text(json.dumps(baseline_doc, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nBaseline updated: {baseline_path}")
+        return
+
+    regressions = []
+    for case, metrics in results.items():
+        if case in baseline:
+            regressions.extend(compare(metrics, baseline[case], args.threshold, f"{case}."))
+    if regressions:
+        print(f"\n❌ Regressions (threshold {args.threshold:.0%}):")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print("\n✅ No regressions against baseline." if baseline else "\nNo baseline yet (use --update-baseline).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Офлайн-замены LLM для бенчмарков.
+
+- StubLLM: отвечает из replay-каталога (записанные ответы по sha256 промпта),
+  затем из canned-правил (подстрока в промпте → JSON), иначе синтезирует
+  минимальный объект по JSON Schema шага. Токены оцениваются по длине текста
+  и пишутся в текущий спан трейсера, как это делает настоящий клиент.
+- RecordingLLM: настоящий клиент, который сохраняет ответы в replay-каталог.
+"""
+
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+
+from llm.client import LLM
+from utils.tracing import tracer
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+DEFAULT_REPLAY_DIR = FIXTURES_DIR / "llm_replay"
+DEFAULT_CANNED_PATH = FIXTURES_DIR / "llm_canned.json"
+
+
+def prompt_key(system_prompt: str, user_prompt: str) -> str:
+    return hashlib.sha256(f"{system_prompt}\n\n{user_prompt}".encode("utf-8")).hexdigest()[:24]
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 символа на токен — достаточно для сравнения прогонов между собой
+    return max(1, len(text) // 4)
+
+
+def synthesize_from_schema(schema: dict, root: dict = None):
+    """Строит минимальный объект, проходящий JSON Schema (draft-07, подмножество)."""
+    root = root or schema
+    if not isinstance(schema, dict) or not schema:
+        return {}
+    if "$ref" in schema:
+        ref = schema["$ref"].lstrip("#/").split("/")
+        target = root
+        for part in ref:
+            target = target.get(part, {})
+        return synthesize_from_schema(target, root)
+    if "enum" in schema:
+        return schema["enum"][0]
+
+    kind = schema.get("type")
+    if kind == "object" or "properties" in schema:
+        props = schema.get("properties", {})
+        return {
+            name: synthesize_from_schema(props.get(name, {}), root)
+            for name in schema.get("required", list(props.keys()))
+        }
+    if kind == "array":
+        count = max(1, schema.get("minItems", 1))
+        return [synthesize_from_schema(schema.get("items", {}), root) for _ in range(count)]
+    if kind in ("number", "integer"):
+        value = schema.get("minimum", 1)
+        return int(value) if kind == "integer" else float(value)
+    if kind == "boolean":
+        return True
+    if kind == "string":
+        pattern = schema.get("pattern", "")
+        # "^E-[A-Za-z0-9_-]{4,}$" → "E-0001"
+        prefix = re.match(r"^\^?([A-Za-z]+-)", pattern)
+        value = f"{prefix.group(1)}0001" if prefix else "stub value"
+        return value.ljust(schema.get("minLength", 0), "x")
+    return {}
+
+
+class StubLLM(LLM):
+    def __init__(self, replay_dir: Path = DEFAULT_REPLAY_DIR, canned_path: Path = DEFAULT_CANNED_PATH,
+                 latency_sec: float = 0.0):
+        # Не вызываем LLM.__init__: клиент OpenAI и ключ не нужны
+        self.max_retries = 1
+        self.retry_delay = 0
+        self.replay_dir = Path(replay_dir)
+        self.latency_sec = latency_sec
+        self.canned = json.loads(Path(canned_path).read_text(encoding="utf-8")) if Path(canned_path).exists() else []
+        self._last_schema: dict = {}
+
+    def _build_system_prompt(self, base_prompt: str, org_context: str,
+                             standard_text: str, standard_schema: dict) -> str:
+        self._last_schema = standard_schema or {}
+        return super()._build_system_prompt(base_prompt, org_context, standard_text, standard_schema)
+
+    def _respond(self, system_prompt: str, user_prompt: str) -> dict:
+        replay_path = self.replay_dir / f"{prompt_key(system_prompt, user_prompt)}.json"
+        if replay_path.exists():
+            return json.loads(replay_path.read_text(encoding="utf-8"))
+        for rule in self.canned:
+            if rule["match"] in user_prompt:
+                return json.loads(json.dumps(rule["response"]))
+        return synthesize_from_schema(self._last_schema)
+
+    def _make_api_call(self, system_prompt: str, user_prompt: str, attempt: int) -> dict:
+        if self.latency_sec:
+            time.sleep(self.latency_sec)
+        data = self._respond(system_prompt, user_prompt)
+
+        prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        completion_tokens = estimate_tokens(json.dumps(data, ensure_ascii=False))
+        span = tracer.current()
+        if span is not None:
+            span.add("prompt_tokens", prompt_tokens)
+            span.add("completion_tokens", completion_tokens)
+            span.add("total_tokens", prompt_tokens + completion_tokens)
+
+        return {
+            "data": data,
+            "score": float(data.pop("self_assessed_score", 0.9)) if isinstance(data, dict) else 0.9,
+            "uncertainty": float(data.pop("uncertainty_score", 0.1)) if isinstance(data, dict) else 0.1,
+            "notes": "stub response",
+        }
+
+
+class RecordingLLM(LLM):
+    """Настоящий LLM, сохраняющий ответы для последующего офлайн-replay."""
+
+    def __init__(self, replay_dir: Path = DEFAULT_REPLAY_DIR):
+        super().__init__()
+        self.replay_dir = Path(replay_dir)
+        self.replay_dir.mkdir(parents=True, exist_ok=True)
+
+    def _make_api_call(self, system_prompt: str, user_prompt: str, attempt: int) -> dict:
+        result = super()._make_api_call(system_prompt, user_prompt, attempt)
+        payload = dict(result["data"])
+        payload["self_assessed_score"] = result["score"]
+        payload["uncertainty_score"] = result["uncertainty"]
+        (self.replay_dir / f"{prompt_key(system_prompt, user_prompt)}.json").write_text(
+            json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        return result
@@ -0,0 +1,233 @@
+"""
+Конкуренты проекта: разбор sources/competitors.txt, параллельное извлечение их лендингов
+тем же экстрактором (collectors.landing) через общий HttpCache и нормализация в компактный,
+сравнимый профиль + дифф с нашим лендингом.
+
+Формат competitors.txt — markdown, как в projects/<proj>/AJTBD_*/sources/:
+    ## Прямые конкуренты
+    ### 1. Zapier
+    **Сайт:** https://zapier.com
+    **Сильные стороны:**
+    - ...
+URL берётся из любой http(s)-ссылки внутри блока конкурента; строки вида
+"Name — https://..." и "[Name](https://...)" без заголовков тоже поддерживаются.
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+import requests
+
+import config
+from collectors.keywords import KeywordMatcher, cta_matcher, offer_matcher
+from collectors.landing import extract_landing, parse_html
+from utils.http_cache import HttpCache, pooled_session
+from utils.tracing import tracer
+
+URL_RE = re.compile(r"https?://[^\s)>\]\"'`*]+")
+HEADING_RE = re.compile(r"^(#{2,3})\s+(?:\d+\.\s*)?(.+?)\s*$")
+# "**Поле:** значение" и "- **Поле**: значение"
+FIELD_RE = re.compile(r"^[-*]?\s*\*\*(.+?)(?::\*\*|\*\*:)\s*(.*)$")
+# "**Epic Systems**" — конкурент внутри отраслевой группы (### Healthcare)
+MD_LINK_RE = re.compile(r"\[([^\]]+)\]\((https?://[^)\s]+)\)")
+NAME_RE = re.compile(r"^\*\*(.+?)\*\*$")
+# Поля, по которым блок считается конкурентом (а не «Позиционированием» и т.п.)
+COMPETITOR_FIELDS = {"сильные стороны", "слабые стороны", "целевая аудитория", "сайт", "url",
+                     "strengths", "weaknesses", "audience", "target audience", "website"}
+PRICE_RE = re.compile(r"(?:\d[\d\s ]*(?:[.,]\d+)?\s?(?:₽|руб\.?|\$|€|USD|EUR)|[$€]\s?\d[\d,.]*)")
+# Границы предложений в тексте секций: get_text склеивает блоки без пробелов
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s*(?=[A-ZА-ЯЁ«\"])")
+OFFER_HINT_RE = re.compile(r"\d+\s?(?:%|₽|\$|€|дн|день|дней|час|мин|недел|месяц|day|hour|min|week|month|x\b)", re.I)
+
+# Темы, которые сами по себе делают фразу оффером
+OFFER_THEMES_STRONG = {"free_trial", "discount", "guarantee"}
+
+MAX_ITEMS = 10
+
+
+def parse_competitors(text: str) -> List[dict]:
+    """
+    Конкуренты из markdown: имя, категория (## раздел / ### группа), URL и заметки
+    (сильные/слабые стороны, ЦА). Поддерживаются оба формата из projects/Matrius:
+    "### 1. Zapier" + "**Поле:**" со списком и "### 1. Healthcare" + "**Epic Systems**" + "- **Поле**: значение".
+    """
+    competitors: List[dict] = []
+    section = group = ""
+    current: Optional[dict] = None
+    field = None
+
+    def start(name: str, category: str, url: str = None) -> dict:
+        entry = {"name": name, "category": category, "url": url, "notes": {}}
+        competitors.append(entry)
+        return entry
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        field = field if line.startswith(("-", "*")) and not FIELD_RE.match(line) else None
+        heading = HEADING_RE.match(line)
+        if heading:
+            level, title = heading.groups()
+            if level == "##":
+                section, group, current = title, "", None
+            else:
+                group, current = title, start(title, section)
+            continue
+
+        name = NAME_RE.match(line)
+        if name and not FIELD_RE.match(line):
+            current = start(name.group(1).strip(), " / ".join(p for p in (section, group) if p))
+            continue
+
+        urls = URL_RE.findall(line)
+        if current is None:
+            # простой формат: "Name — https://..." или "- [Name](https://...)" без заголовков
+            link = MD_LINK_RE.search(line)
+            if link:
+                start(link.group(1).strip(), section, link.group(2))
+            elif urls:
+                title = re.sub(r"[\s\-—–:|*]+$", "", line[: line.find(urls[0])]).strip("*- ") or urls[0]
+                start(title, section, urls[0])
+            continue
+
+        if urls and not current["url"]:
+            current["url"] = urls[0]
+        match = FIELD_RE.match(line)
+        if match:
+            key, value = match.group(1).strip(), match.group(2).strip()
+            if value:
+                if not URL_RE.fullmatch(value):
+                    current["notes"][key] = value
+            else:
+                field = key  # значения — следующим списком
+        elif field and line.startswith(("-", "*")):
+            current["notes"].setdefault(field, []).append(line.lstrip("-* ").strip())
+
+    return [c for c in competitors
+            if c["url"] or COMPETITOR_FIELDS & {k.lower() for k in c["notes"]}]
+
+
+def find_competitors_file(input_data: dict) -> Optional[Path]:
+    """input.competitors_file или sources/competitors.txt рядом с data/ из input.files."""
+    explicit = input_data.get("competitors_file")
+    if explicit:
+        return Path(explicit)
+    for file_path in input_data.get("files", []):
+        candidate = Path(file_path).parent.parent / "sources" / "competitors.txt"
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def _norm(text: str) -> str:
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+
+def _themes(texts: List[str]) -> List[str]:
+    """Темы офферов (метки словаря offers из collectors.keywords)."""
+    return sorted(offer_matcher().labels(" ".join(texts)))
+
+
+def _unique(items, limit: int = MAX_ITEMS) -> list:
+    seen, result = set(), []
+    for item in items:
+        key = _norm(item)
+        if key and key not in seen:
+            seen.add(key)
+            result.append(item)
+        if len(result) >= limit:
+            break
+    return result
+
+
+def _strip_heading(sentence: str, headings: List[str]) -> str:
+    for heading in headings:
+        if sentence.startswith(heading):
+            return sentence[len(heading):].strip()
+    return sentence
+
+
+def landing_profile(extraction: dict) -> dict:
+    """Компактный профиль страницы из результата extract_landing (или сводного вида crawl)."""
+    headings = [h["text"] for h in extraction.get("headings", []) if h.get("level", 9) <= 2]
+    ctas = [c["text"] for c in extraction.get("ctas", [])]
+    features = [item for lst in extraction.get("lists", []) for item in lst.get("items", [])]
+
+    sentences = []
+    if extraction.get("blocks") is not None:
+        # контент-блоки без шаблонов; строки блока — отдельные элементы страницы
+        for block in extraction["blocks"]:
+            for line in block["text"].split("\n"):
+                sentences.extend(s.strip() for s in SENTENCE_SPLIT_RE.split(line))
+    else:
+        for section in extraction.get("sections", []):
+            sentences.extend(s.strip() for s in SENTENCE_SPLIT_RE.split(section.get("content", "")))
+        # заголовок секции склеен с первым предложением — отрезаем его
+        sentences = [_strip_heading(s, headings) for s in sentences]
+    offers = [s for s in headings + sentences
+              if s and (OFFER_HINT_RE.search(s) or set(_themes([s])) & OFFER_THEMES_STRONG)]
+    corpus = headings + sentences + ctas + features
+
+    return {
+        "title": extraction.get("title", ""),
+        "meta_description": extraction.get("meta_description", ""),
+        "value_props": _unique(headings),
+        "ctas": _unique(ctas),
+        "offers": _unique(offers, limit=15),
+        "price_points": _unique(m.group(0).strip() for text in corpus for m in PRICE_RE.finditer(text)),
+        "features": _unique(features, limit=15),
+        "themes": _themes(corpus + [extraction.get("title", ""), extraction.get("meta_description", "")]),
+        "has_form": bool(extraction.get("forms")),
+        "word_count": sum(b.get("word_count", 0) for b in extraction.get("blocks") or extraction.get("sections", [])),
+    }
+
+
+def diff_profiles(ours: dict, theirs: dict) -> dict:
+    """Что есть у конкурента и нет у нас (и наоборот) — по темам офферов и CTA."""
+    our_themes, their_themes = set(ours.get("themes", [])), set(theirs.get("themes", []))
+    our_ctas = {_norm(c) for c in ours.get("ctas", [])}
+    return {
+        "shared_themes": sorted(our_themes & their_themes),
+        "their_only_themes": sorted(their_themes - our_themes),
+        "our_only_themes": sorted(our_themes - their_themes),
+        "their_only_ctas": [c for c in theirs.get("ctas", []) if _norm(c) not in our_ctas],
+        "their_price_points": theirs.get("price_points", []),
+    }
+
+
+def _extract_one(cache: HttpCache, competitor: dict, ctas_matcher: KeywordMatcher) -> dict:
+    entry = {
+        "name": competitor["name"],
+        "category": competitor.get("category", ""),
+        "url": competitor.get("url"),
+        "desk_notes": competitor.get("notes", {}),
+    }
+    if not entry["url"]:
+        return {**entry, "status": "no_url"}
+    with tracer.span("competitor.extract", kind="crawl", competitor=entry["name"], url=entry["url"]) as sp:
+        try:
+            response = cache.fetch(entry["url"])
+            profile = landing_profile(extract_landing(parse_html(response.content), entry["url"], ctas_matcher))
+        except requests.RequestException as e:
+            sp.set(error=str(e))
+            return {**entry, "status": "error", "error": f"Failed to fetch URL: {e}"}
+        except Exception as e:
+            # битая страница одного конкурента не должна прерывать весь шаг
+            sp.set(error=str(e))
+            return {**entry, "status": "error", "error": f"Failed to process page: {e}"}
+        return {**entry, "status": "ok", "fetch": response.cache_info(), "profile": profile}
+
+
+def extract_competitors(competitors: List[dict], concurrency: int = None, offline: bool = None,
+                        project: Optional[str] = None) -> List[dict]:
+    """
+    Параллельно извлекает лендинги конкурентов; порядок результата = порядок входа.
+    CTA размечаются словарём проекта — тем же, что у нашего лендинга (иначе diff_profiles сравнивает разное).
+    """
+    concurrency = concurrency or config.COMPETITOR_CONCURRENCY
+    cache = HttpCache(offline=offline, session=pooled_session(concurrency))
+    ctas_matcher = cta_matcher(project)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="competitor") as pool:
+        futures = [pool.submit(tracer.wrap(_extract_one), cache, c, ctas_matcher) for c in competitors]
+        return [f.result() for f in futures]
@@ -0,0 +1,293 @@
+"""
+Обход сайта для step_02_extract (режим crawl): офферы и CTA разбросаны по страницам
+тарифов, продукта и FAQ, а не только по лендингу.
+
+- страницы находятся по ссылкам (в пределах того же хоста) и из sitemap.xml;
+- загрузка параллельная (ThreadPoolExecutor, пул соединений requests.Session),
+  через общий HttpCache — повторные обходы идут условными запросами;
+- вежливость: не чаще одного запроса в host_delay_sec на хост (или Crawl-delay из robots.txt),
+  robots.txt соблюдается;
+- лимиты по глубине и числу страниц; обход по уровням, порядок результатов детерминирован.
+
+Результат — извлечение по каждой странице (collectors.landing) и сводный вид по сайту.
+"""
+
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from urllib import robotparser
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from pydantic import BaseModel
+
+import config
+from collectors.keywords import KeywordMatcher
+from collectors.landing import extract_landing, parse_html
+from utils.http_cache import DEFAULT_USER_AGENT, HttpCache, pooled_session
+from utils.tracing import tracer
+
+# Ссылки на файлы, которые не являются страницами
+SKIP_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".css", ".js", ".xml",
+    ".zip", ".rar", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".mp3", ".mp4", ".avi",
+)
+MAX_SITEMAPS = 5  # вложенные sitemap index читаем ограниченно
+
+
+class CrawlSettings(BaseModel):
+    max_pages: int = config.CRAWL_MAX_PAGES
+    max_depth: int = config.CRAWL_MAX_DEPTH
+    concurrency: int = config.CRAWL_CONCURRENCY
+    host_delay_sec: float = config.CRAWL_HOST_DELAY_SEC
+    respect_robots: bool = True
+    use_sitemap: bool = True
+
+    @classmethod
+    def from_input(cls, value) -> Optional["CrawlSettings"]:
+        """input.crawl: true → настройки по умолчанию, {...} → переопределения, иначе None."""
+        if isinstance(value, dict):
+            if not value.get("enabled", True):
+                return None
+            return cls(**{k: v for k, v in value.items() if k != "enabled"})
+        if value or (value is None and config.CRAWL_ENABLED):
+            return cls()
+        return None
+
+
+def _site_key(netloc: str) -> str:
+    netloc = netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+def normalize_url(url: str, base_url: str = "") -> Optional[str]:
+    """Абсолютный URL без фрагмента; None для mailto:, tel:, javascript: и файлов."""
+    url = urldefrag(urljoin(base_url, url.strip()))[0]
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.netloc:
+        return None
+    if parsed.path.lower().endswith(SKIP_EXTENSIONS):
+        return None
+    if not parsed.path:
+        url = parsed._replace(path="/").geturl()
+    return url
+
+
+def discover_links(soup: BeautifulSoup, page_url: str) -> List[str]:
+    """Ссылки страницы в порядке появления (включая nav/footer — там обычно тарифы и FAQ)."""
+    links, seen = [], set()
+    for a in soup.find_all("a", href=True):
+        url = normalize_url(a["href"], page_url)
+        if url and url not in seen:
+            seen.add(url)
+            links.append(url)
+    return links
+
+
+def merge_pages(pages: List[dict]) -> dict:
+    """Сводный вид по сайту: те же ключи, что у извлечения страницы, без дублей, с source_url."""
+    merged = {"headings": [], "ctas": [], "sections": [], "blocks": [], "lists": [], "forms": []}
+    keys = {
+        "headings": lambda h: (h["level"], h["text"]),
+        "ctas": lambda c: (c["text"], c["href"]),
+        "sections": lambda s: s["content"],
+        "blocks": lambda b: b["id"],
+        "lists": lambda lst: tuple(lst["items"]),
+        "forms": lambda f: (f["action"], tuple(f["inputs"])),
+    }
+    seen = {name: set() for name in keys}
+    for page in pages:
+        for name, key in keys.items():
+            for item in page.get(name, []):
+                k = key(item)
+                if k in seen[name]:
+                    continue
+                seen[name].add(k)
+                merged[name].append({**item, "source_url": page["url"]})
+    landing = pages[0] if pages else {}
+    return {
+        "url": landing.get("url", ""),
+        "title": landing.get("title", ""),
+        "meta_description": landing.get("meta_description", ""),
+        **merged,
+        "page_count": len(pages),
+    }
+
+
+class SiteCrawler:
+    def __init__(self, settings: CrawlSettings = None, offline: bool = None, ctas_matcher: KeywordMatcher = None):
+        self.settings = settings or CrawlSettings()
+        # словарь CTA проекта — тот же, что у стартовой страницы в step_02_extract
+        self.ctas_matcher = ctas_matcher
+        # пул соединений по числу потоков: keep-alive к одному хосту переиспользуется
+        self.cache = HttpCache(offline=offline, session=pooled_session(self.settings.concurrency))
+        self._robots: dict = {}
+        self._robots_lock = threading.Lock()
+        self._next_slot: dict = {}
+        self._lock = threading.Lock()
+        self.stats = {"fetched": 0, "errors": 0, "robots_blocked": 0, "sitemap_urls": 0}
+
+    # --- вежливость -------------------------------------------------------
+
+    def _robots_for(self, url: str) -> Optional[robotparser.RobotFileParser]:
+        parsed = urlparse(url)
+        root = f"{parsed.scheme}://{parsed.netloc}"
+        with self._robots_lock:
+            if root not in self._robots:
+                self._robots[root] = self._load_robots(root)
+            return self._robots[root]
+
+    def _load_robots(self, root: str) -> Optional[robotparser.RobotFileParser]:
+        try:
+            response = self.cache.fetch(f"{root}/robots.txt")
+        except requests.RequestException:
+            return None  # нет robots.txt — ограничений нет
+        parser = robotparser.RobotFileParser(f"{root}/robots.txt")
+        parser.parse(response.content.decode(response.encoding or "utf-8", errors="replace").splitlines())
+        return parser
+
+    def _allowed(self, url: str) -> bool:
+        if not self.settings.respect_robots:
+            return True
+        parser = self._robots_for(url)
+        return parser is None or parser.can_fetch(DEFAULT_USER_AGENT, url)
+
+    def _host_delay(self, url: str) -> float:
+        delay = self.settings.host_delay_sec
+        parser = self._robots_for(url) if self.settings.respect_robots else None
+        if parser is not None:
+            delay = max(delay, float(parser.crawl_delay(DEFAULT_USER_AGENT) or 0))
+        return delay
+
+    def _wait_turn(self, url: str) -> None:
+        """Резервирует слот для хоста; ждёт вне блокировки, чтобы другие хосты не простаивали."""
+        host = urlparse(url).netloc
+        delay = self._host_delay(url)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + delay
+        if slot > now:
+            time.sleep(slot - now)
+
+    # --- sitemap ----------------------------------------------------------
+
+    def _sitemap_urls(self, start_url: str) -> List[str]:
+        parsed = urlparse(start_url)
+        root = f"{parsed.scheme}://{parsed.netloc}"
+        queue = [f"{root}/sitemap.xml"]
+        robots = self._robots_for(start_url) if self.settings.respect_robots else None
+        if robots is not None:
+            queue = list(dict.fromkeys((robots.site_maps() or []) + queue))
+
+        urls, visited = [], set()
+        while queue and len(visited) < MAX_SITEMAPS:
+            sitemap_url = queue.pop(0)
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+            try:
+                response = self.cache.fetch(sitemap_url)
+                tree = ET.fromstring(response.content)
+            except (requests.RequestException, ET.ParseError):
+                continue
+            for loc in tree.iter():
+                if not loc.tag.endswith("loc") or not (loc.text or "").strip():
+                    continue
+                # <sitemapindex> ссылается на другие sitemap, <urlset> — на страницы
+                if tree.tag.endswith("sitemapindex"):
+                    queue.append(urljoin(sitemap_url, loc.text.strip()))
+                else:
+                    url = normalize_url(loc.text, sitemap_url)
+                    if url:
+                        urls.append(url)
+        return urls
+
+    # --- обход ------------------------------------------------------------
+
+    def _crawl_page(self, url: str, depth: int) -> tuple:
+        with tracer.span("crawl.page", kind="crawl", url=url, depth=depth) as sp:
+            try:
+                self._wait_turn(url)
+                response = self.cache.fetch(url)
+                content_type = response.headers.get("Content-Type", "text/html")
+                if "html" not in content_type:
+                    sp.set(skipped=content_type)
+                    return None, []
+                soup = parse_html(response.content)
+                links = discover_links(soup, url)
+                page = {"depth": depth, "fetch": response.cache_info(), **extract_landing(soup, url, self.ctas_matcher)}
+            except requests.RequestException as e:
+                sp.set(error=str(e))
+                return {"url": url, "depth": depth, "error": f"Failed to fetch URL: {e}"}, []
+            except Exception as e:
+                # битая страница не должна ронять обход (и уже извлечённый лендинг)
+                sp.set(error=str(e))
+                return {"url": url, "depth": depth, "error": f"Failed to process page: {e}"}, []
+            sp.set(links=len(links))
+            return page, links
+
+    def crawl(self, start_url: str, start_soup: BeautifulSoup = None, start_extraction: dict = None) -> dict:
+        """
+        Обходит сайт от start_url. start_soup — уже разобранная стартовая страница
+        (step_02_extract её только что загрузил), чтобы не запрашивать её повторно;
+        start_extraction — её готовое извлечение, чтобы не извлекать второй раз.
+        """
+        started = time.perf_counter()
+        settings = self.settings
+        start_url = normalize_url(start_url) or start_url
+        site = _site_key(urlparse(start_url).netloc)
+
+        def in_scope(url: str) -> bool:
+            return _site_key(urlparse(url).netloc) == site
+
+        pages: List[dict] = []
+        seen = set()
+        if start_soup is not None:
+            seen.add(start_url)
+            extraction = start_extraction or extract_landing(start_soup, start_url, self.ctas_matcher)
+            pages.append({"depth": 0, **extraction})
+            level = [(url, 1) for url in discover_links(start_soup, start_url)]
+        else:
+            level = [(start_url, 0)]
+
+        if settings.use_sitemap:
+            sitemap_urls = [url for url in self._sitemap_urls(start_url) if in_scope(url)]
+            self.stats["sitemap_urls"] = len(sitemap_urls)
+            level += [(url, 1) for url in sitemap_urls]
+
+        with ThreadPoolExecutor(max_workers=settings.concurrency, thread_name_prefix="crawl") as pool:
+            while level and len(pages) < settings.max_pages:
+                batch = []
+                for url, depth in level:
+                    if len(pages) + len(batch) >= settings.max_pages:
+                        break
+                    if depth > settings.max_depth or not in_scope(url):
+                        continue
+                    if url in seen:
+                        continue
+                    seen.add(url)
+                    if not self._allowed(url):
+                        self.stats["robots_blocked"] += 1
+                        continue
+                    batch.append((url, depth))
+
+                futures = [pool.submit(tracer.wrap(self._crawl_page), url, depth) for url, depth in batch]
+                level = []
+                for future in futures:
+                    page, links = future.result()
+                    if page is None:
+                        continue
+                    pages.append(page)
+                    self.stats["errors" if "error" in page else "fetched"] += 1
+                    level += [(url, page["depth"] + 1) for url in links if url not in seen]
+
+        ok_pages = [p for p in pages if "error" not in p]
+        return {
+            "pages": pages,
+            "site": merge_pages(ok_pages),
+            "stats": {**self.stats, "pages": len(pages), "elapsed_sec": round(time.perf_counter() - started, 3)},
+        }
@@ -0,0 +1,201 @@
+"""
+Компилируемые словари ключевых слов (CTA, типы офферов) для RU/EN.
+
+Словарь — {метка: {язык: [термины]}}. Термин — основа слова: совпадает с начала слова
+и допускает любое окончание («купи» → купить/купите/купим, «скидк» → скидка/скидки),
+«е» в русских основах совпадает и с «ё». Термин с префиксом "re:" — готовое регулярное
+выражение; им задаются короткие и многозначные термины с границами слова (\\bруб(?:\\.|л|\\b),
+иначе «руб» находит «рубрику», а «left» — «left-aligned»). Все термины группы собираются
+в одно регулярное выражение (по именованной группе на метку), поэтому проверка текста —
+один проход без lower() и any().
+
+Встроенные словари дополняются секцией keywords в configs/ajtd.yaml и файлом
+projects/<project>/keywords.yaml той же структуры:
+    cta:
+      ru: [записаться]
+    offers:
+      discount:
+        ru: [кэшбэк]
+"""
+
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+
+import config
+
+DEFAULT_KEYWORDS = {
+    "cta": {
+        "cta": {
+            "ru": ["купи", "заказ", "попроб", "получ", "скача", "скачай", "начат", "начни", "начнит",
+                   "подпис", "регистрац", "зарегистр"],
+            "en": ["buy", "order", "try", "get", "download", "start", "subscribe", "sign up"],
+        },
+    },
+    "offers": {
+        "free_trial": {
+            "ru": ["бесплатн", "пробн", "тест-драйв"],
+            "en": ["re:\\bfree\\b", "trial"],
+        },
+        "discount": {
+            "ru": ["скидк", "акци", "распродаж", "промокод", "кэшбэк"],
+            "en": ["discount", "re:\\bsale\\b", "promo", "re:\\d+\\s?%\\s?off"],
+            "any": ["re:-\\s?\\d+\\s?%"],
+        },
+        "guarantee": {
+            "ru": ["гарант", "re:\\bверн[её]м\\b", "вернут деньги", "возврат"],
+            "en": ["guarantee", "money back", "refund"],
+        },
+        "urgency_scarcity": {
+            "ru": ["только до", "осталось", "успей", "ограничен", "последн"],
+            "en": ["limited", "only today", "re:\\bends\\b(?!-)", "re:\\b\\d+\\s+(?:\\w+\\s+)?left\\b(?!-)",
+                   "few left", "last chance"],
+        },
+        "social_proof": {
+            "ru": ["клиентов", "клиенты", "компаний", "отзыв", "кейс", "доверя"],
+            "en": ["customers", "companies", "reviews", "trusted", "case stud"],
+        },
+        "speed": {
+            "ru": ["минут", "дней", "за день", "быстр"],
+            "en": ["minutes", "days", "fast", "quick"],
+        },
+        "integrations": {
+            "ru": ["интеграц", "1с"],
+            "en": ["integration", "re:\\bapis?\\b", "connect"],
+        },
+        "support": {
+            "ru": ["поддержк", "менеджер", "обучени"],
+            "en": ["support", "onboarding"],
+        },
+        "pricing": {
+            "ru": ["тариф", "re:\\bруб(?:\\.|л|\\b)", "в месяц"],
+            "en": ["pricing", "per month"],
+            "any": ["re:₽", "re:[$€]\\s?\\d"],
+        },
+        "security": {
+            "ru": ["безопасн", "шифров", "152-фз"],
+            "en": ["security", "re:\\bsla\\b", "gdpr"],
+        },
+    },
+}
+
+
+def _char_pattern(ch: str) -> str:
+    if ch == " ":
+        return r"\s+"
+    if ch == "е":
+        return "[её]"
+    return re.escape(ch)
+
+
+def _trie_pattern(terms: List[str]) -> str:
+    """
+    Основы слов → одно выражение по префиксному дереву: «купи|куп|заказ» → «ку(?:пи?)|заказ».
+    Движок re не умеет Aho-Corasick, но общий префикс проверяется один раз на позицию.
+    """
+    trie: dict = {}
+    for term in terms:
+        node = trie
+        for ch in " ".join(term.lower().split()):
+            node = node.setdefault(ch, {})
+        node[""] = {}  # конец термина
+
+    def build(node: dict) -> str:
+        if "" in node and len(node) == 1:
+            return ""
+        optional = "" in node
+        branches = [_char_pattern(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if optional:
+            body = (body if len(branches) > 1 or len(branches[0]) == 1 else f"(?:{body})") + "?"
+        return body
+
+    return build(trie)
+
+
+def _group_pattern(terms: List[str]) -> str:
+    stems = [t for t in terms if not t.startswith("re:")]
+    patterns = [t[3:] for t in terms if t.startswith("re:")]
+    if stems:
+        # начало слова, окончание любое; пробелы между словами — любые
+        patterns.insert(0, r"(?<!\w)" + _trie_pattern(stems) + r"\w*")
+    return "|".join(patterns)
+
+
+class KeywordMatcher:
+    """Одно скомпилированное выражение на все метки словаря."""
+
+    def __init__(self, groups: Dict[str, List[str]]):
+        self._labels: Dict[str, str] = {}
+        parts = []
+        for i, (label, terms) in enumerate(groups.items()):
+            if not terms:
+                continue
+            self._labels[f"g{i}"] = label
+            parts.append(f"(?P<g{i}>{_group_pattern(terms)})")
+        self._regex = re.compile("|".join(parts), re.IGNORECASE) if parts else None
+
+    def search(self, text: str) -> Optional[str]:
+        """Метка первого совпадения или None."""
+        if not text or self._regex is None:
+            return None
+        match = self._regex.search(text)
+        return self._labels[match.lastgroup] if match else None
+
+    def labels(self, text: str) -> List[str]:
+        """Все метки, встретившиеся в тексте (за один проход), в порядке появления."""
+        if not text or self._regex is None:
+            return []
+        found = {}
+        for match in self._regex.finditer(text):
+            found.setdefault(self._labels[match.lastgroup], None)
+        return list(found)
+
+
+def _merge(base: dict, extra: dict) -> dict:
+    """Дополняет словарь {метка: {язык: [термины]}} (термины добавляются, не заменяются)."""
+    merged = {label: {lang: list(terms) for lang, terms in langs.items()} for label, langs in base.items()}
+    for label, langs in (extra or {}).items():
+        target = merged.setdefault(label, {})
+        for lang, terms in (langs or {}).items():
+            target.setdefault(lang, []).extend(t for t in terms or [] if t not in target[lang])
+    return merged
+
+
+def _labelled(kind: str, extra: dict) -> dict:
+    # секция cta задаётся плоско ({ru: [...], en: [...]}) — это одна метка "cta"
+    if kind == "cta" and extra and all(isinstance(v, list) for v in extra.values()):
+        return {"cta": extra}
+    return extra or {}
+
+
+def load_keywords(kind: str, project: Optional[str] = None) -> dict:
+    """Словарь вида kind ("cta" / "offers"): встроенный + configs/ajtd.yaml + projects/<project>/keywords.yaml."""
+    keywords = _merge(DEFAULT_KEYWORDS.get(kind, {}), _labelled(kind, config.get_config_keywords(kind, {})))
+    if project:
+        project_file = Path("projects") / project / "keywords.yaml"
+        if project_file.exists():
+            project_extra = (yaml.safe_load(project_file.read_text(encoding="utf-8")) or {}).get(kind, {})
+            keywords = _merge(keywords, _labelled(kind, project_extra))
+    return keywords
+
+
+@lru_cache(maxsize=None)
+def get_matcher(kind: str, project: Optional[str] = None, languages: Optional[tuple] = None) -> KeywordMatcher:
+    """Скомпилированный матчер (кэшируется на процесс). languages=None — все языки словаря."""
+    groups = {}
+    for label, langs in load_keywords(kind, project).items():
+        groups[label] = [t for lang, terms in langs.items()
+                         if languages is None or lang in languages or lang == "any" for t in terms]
+    return KeywordMatcher(groups)
+
+
+def cta_matcher(project: Optional[str] = None) -> KeywordMatcher:
+    return get_matcher("cta", project)
+
+
+def offer_matcher(project: Optional[str] = None) -> KeywordMatcher:
+    return get_matcher("offers", project)
@@ -0,0 +1,433 @@
+"""
+Однопроходный экстрактор структуры лендинга (используется step_02_extract).
+
+Дерево обходится один раз: все видимые текстовые узлы складываются в плоский список
+(в порядке документа, уже после strip), а каждый элемент запоминает диапазон
+[start, end) своих строк. Текст элемента, его длина, число слов и хэш считаются
+по диапазону через префиксные суммы — без повторных get_text() по вложенным div.
+
+Результат совпадает по форме с прежним BeautifulSoup-вариантом (find_all на каждый тип):
+заголовки сгруппированы по уровню, CTA/секции/списки/формы — в порядке документа.
+
+Дополнительно текст страницы сегментируется на контент-блоки (segment_blocks): по плотности
+текста и ссылок и положению в DOM отбрасываются шаблонные области (меню из ссылок, cookie,
+share, aside), остальное — непересекающиеся ранжированные блоки со стабильными id и
+смещениями в full_text. В промпты идут лучшие блоки в пределах бюджета (select_blocks).
+
+parse_html() строит полное дерево выбранным парсером (config.HTML_PARSER, по умолчанию lxml);
+script/style/nav/footer пропускает уже обход (_walk).
+"""
+
+import hashlib
+import math
+import re
+import time
+from bisect import bisect_left
+from itertools import groupby
+from typing import List, Optional
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, CData, FeatureNotFound, NavigableString, Tag
+
+import config
+from collectors.keywords import KeywordMatcher, cta_matcher, offer_matcher
+
+# Эти поддеревья не участвуют в извлечении (раньше — decompose() перед поиском)
+SKIP_TAGS = {"script", "style", "nav", "footer"}
+# Как у Tag.get_text(): комментарии, doctype и т.п. в текст не попадают
+TEXT_TYPES = (NavigableString, CData)
+
+HEADING_TAGS = {f"h{level}": level for level in range(1, 7)}
+CTA_TAGS = {"a", "button"}
+SECTION_TAGS = {"div", "section", "article"}
+LIST_TAGS = {"ul", "ol"}
+
+SECTION_MIN_CHARS = 50       # короткие блоки игнорируем
+SECTION_MAX_CHARS = 1000     # длина content секции
+LIST_MAX_ITEMS = 10
+
+FALLBACK_PARSER = "html.parser"
+
+# --- Сегментация на контент-блоки ---
+# Элементы, которые «владеют» своим текстом как отдельный блок (атомарный блок — как в boilerpipe)
+BLOCK_TAGS = (set(HEADING_TAGS) | SECTION_TAGS | LIST_TAGS
+              | {"p", "li", "td", "th", "blockquote", "dd", "dt", "figcaption", "pre", "form",
+                 "header", "main", "aside", "table", "tr"})
+# Смена контейнера начинает новый контент-блок
+CONTAINER_TAGS = {"section", "article", "header", "main", "aside", "form"}
+BOILERPLATE_TAGS = {"aside"}
+BOILERPLATE_ATTR_RE = re.compile(
+    r"cookie|consent|gdpr|popup|modal|breadcrumb|share|social|sidebar|copyright|advert|skip-link|widget",
+    re.IGNORECASE,
+)
+BLOCK_MAX_CHARS = 1500       # длинный контейнер режется по границам атомарных блоков
+BLOCK_MIN_WORDS = 5
+LINK_DENSITY_MAX = 0.5       # меню, списки ссылок
+
+# Полиномиальный хэш последовательности строк (для дедупликации секций за O(1))
+_HASH_MOD = (1 << 61) - 1
+_HASH_BASE = 1_000_003
+
+
+class _Node:
+    __slots__ = ("tag", "index", "last", "start", "end", "owner", "container", "link", "boiler")
+
+    def __init__(self, tag: Tag, index: int, start: int, parent: Optional["_Node"]):
+        self.tag = tag
+        self.index = index      # позиция элемента в порядке документа
+        self.last = index       # позиция последнего потомка
+        self.start = start      # диапазон строк [start, end)
+        self.end = start
+        # состояние для сегментации наследуется от родителя за O(1)
+        name = tag.name
+        self.owner = index if name in BLOCK_TAGS else (parent.owner if parent else -1)
+        self.container = index if name in CONTAINER_TAGS else (parent.container if parent else -1)
+        self.link = name == "a" or (parent.link if parent else False)
+        self.boiler = (parent is not None and parent.boiler) or name in BOILERPLATE_TAGS or _is_boilerplate(tag)
+
+
+_boilerplate_markers: dict = {}
+
+
+def _is_boilerplate(tag: Tag) -> bool:
+    attrs = tag.attrs
+    if not attrs:
+        return False
+    classes = attrs.get("class") or ()
+    marker = " ".join(classes) if isinstance(classes, list) else str(classes)
+    marker = f"{marker} {attrs.get('id') or ''}"
+    # наборы классов на странице повторяются (card, item...) — регулярное выражение по каждому один раз
+    found = _boilerplate_markers.get(marker)
+    if found is None:
+        if len(_boilerplate_markers) > 10000:
+            _boilerplate_markers.clear()
+        found = _boilerplate_markers[marker] = bool(BOILERPLATE_ATTR_RE.search(marker))
+    return found
+
+
+class _TextIndex:
+    """Плоский список строк документа + префиксные суммы длин, слов и хэшей."""
+
+    def __init__(self, strings: List[str]):
+        self.strings = strings
+        n = len(strings)
+        self.chars = [0] * (n + 1)
+        self.words = [0] * (n + 1)
+        self.hashes = [0] * (n + 1)
+        self.powers = [1] * (n + 1)
+        for i, s in enumerate(strings):
+            self.chars[i + 1] = self.chars[i] + len(s)
+            self.words[i + 1] = self.words[i] + len(s.split())
+            self.hashes[i + 1] = (self.hashes[i] * _HASH_BASE + hash(s) % _HASH_MOD) % _HASH_MOD
+            self.powers[i + 1] = self.powers[i] * _HASH_BASE % _HASH_MOD
+
+    def text(self, node: _Node) -> str:
+        return "".join(self.strings[node.start:node.end])
+
+    def length(self, node: _Node) -> int:
+        return self.chars[node.end] - self.chars[node.start]
+
+    def word_count(self, node: _Node) -> int:
+        # строки склеиваются без разделителя и не имеют краевых пробелов,
+        # поэтому на каждом стыке последнее и первое слова сливаются в одно
+        count = node.end - node.start
+        if not count:
+            return 0
+        return self.words[node.end] - self.words[node.start] - (count - 1)
+
+    def prefix(self, node: _Node, limit: int) -> str:
+        parts, size = [], 0
+        for s in self.strings[node.start:node.end]:
+            parts.append(s)
+            size += len(s)
+            if size >= limit:
+                break
+        return "".join(parts)[:limit]
+
+    def fingerprint(self, node: _Node) -> tuple:
+        h = (self.hashes[node.end] - self.hashes[node.start] * self.powers[node.end - node.start]) % _HASH_MOD
+        return h, self.length(node)
+
+
+def parse_html(content, parser: Optional[str] = None) -> BeautifulSoup:
+    """
+    Парсит страницу для extract_landing. Дерево полное: SoupStrainer фильтрует только элементы
+    верхнего уровня и терял бы текст вне них (span, свои теги, текст прямо в body).
+    Если парсер не установлен, используется html.parser.
+    """
+    parser = parser or config.HTML_PARSER
+    try:
+        return BeautifulSoup(content, parser)
+    except FeatureNotFound:
+        if parser == FALLBACK_PARSER:
+            raise
+        print(f"WARNING: HTML parser '{parser}' is not installed, falling back to {FALLBACK_PARSER}")
+        return BeautifulSoup(content, FALLBACK_PARSER)
+
+
+def _walk(root: Tag):
+    """
+    Итеративный pre-order обход: элементы с диапазонами строк, плоский список строк
+    и для каждой строки — её ближайший элемент (источник owner/link/boiler для сегментации).
+    """
+    nodes: List[_Node] = []
+    strings: List[str] = []
+    string_nodes: List[Optional[_Node]] = []
+    open_nodes: List[_Node] = []
+    stack = [iter(root.contents)]
+    while stack:
+        for child in stack[-1]:
+            if isinstance(child, Tag):
+                if child.name in SKIP_TAGS:
+                    continue
+                node = _Node(child, len(nodes), len(strings), open_nodes[-1] if open_nodes else None)
+                nodes.append(node)
+                open_nodes.append(node)
+                stack.append(iter(child.contents))
+                break
+            if type(child) in TEXT_TYPES:
+                text = child.strip()
+                if text:
+                    strings.append(text)
+                    string_nodes.append(open_nodes[-1] if open_nodes else None)
+        else:
+            stack.pop()
+            if open_nodes and len(stack) == len(open_nodes):
+                node = open_nodes.pop()
+                node.end = len(strings)
+                node.last = len(nodes) - 1
+    return nodes, strings, string_nodes
+
+
+def _descendants(positions: List[int], items: list, node: _Node) -> list:
+    """Элементы из items, чьи позиции лежат внутри поддерева node (позиции отсортированы)."""
+    lo = bisect_left(positions, node.index + 1)
+    hi = bisect_left(positions, node.last + 1)
+    return items[lo:hi]
+
+
+def _collect_sections(section_nodes: List[_Node], index: _TextIndex) -> list:
+    """
+    Текстовые блоки div/section/article без дублей.
+    Блок пропускается, если его текст целиком попал в content объемлющей секции
+    (раньше — подстрочный поиск по всем секциям) или уже встречался дословно (хэш) —
+    во втором случае вместе со всем поддеревом.
+    """
+    sections = []
+    seen = set()
+    enclosing: List[_Node] = []  # выданные секции, внутри которых находится текущий элемент
+    duplicate_until = -1         # конец поддерева последнего дословного дубля
+    for node in section_nodes:
+        if node.index <= duplicate_until:
+            continue
+        while enclosing and enclosing[-1].last < node.index:
+            enclosing.pop()
+        length = index.length(node)
+        if length <= SECTION_MIN_CHARS:
+            continue
+        if enclosing:
+            parent = enclosing[-1]
+            offset = index.chars[node.start] - index.chars[parent.start]
+            if offset + length <= SECTION_MAX_CHARS:
+                continue
+        fingerprint = index.fingerprint(node)
+        if fingerprint in seen:
+            duplicate_until = node.last
+            continue
+        seen.add(fingerprint)
+        enclosing.append(node)
+        sections.append({
+            "content": index.prefix(node, SECTION_MAX_CHARS),
+            "word_count": index.word_count(node),
+            "tag": node.tag.name,
+        })
+    return sections
+
+
+def segment_blocks(nodes: List[_Node], strings: List[str], string_nodes: List[Optional[_Node]]):
+    """
+    Делит текст страницы на непересекающиеся контент-блоки и ранжирует их.
+
+    1. Атомарные блоки: подряд идущие строки с одним владельцем (ближайший p/li/h*/div/... предок).
+    2. Контент-блоки: атомарные блоки склеиваются, пока не встретится заголовок h1–h3, смена
+       контейнера (section/article/header/...), граница шаблонной области или лимит BLOCK_MAX_CHARS.
+    3. Отбрасываются: шаблонные области (cookie, share, sidebar, aside...), блоки с плотностью
+       ссылок > LINK_DENSITY_MAX, короче BLOCK_MIN_WORDS слов и дословные дубли.
+    4. score = (1 − плотность ссылок) · ln(1 + слов) · вес позиции + бонусы за заголовок и офферы.
+
+    Возвращает (blocks, full_text): блоки в порядке документа с id (хэш текста), смещениями
+    [start, end) в full_text и rank; full_text — текст страницы, атомарные блоки через перевод строки.
+    """
+    # --- 1. атомарные блоки ---
+    atoms = []  # (owner, start_char, end_char, link_chars, boiler, container, heading_level)
+    parts: List[str] = []
+    offset = 0
+    owners = [node.owner if node is not None else -1 for node in string_nodes]
+    for owner, run in groupby(range(len(strings)), owners.__getitem__):
+        run = list(run)
+        texts = [strings[k] for k in run]
+        owned = [string_nodes[k] for k in run if string_nodes[k] is not None]
+        link_chars = sum(len(strings[k]) for k in run if string_nodes[k] is not None and string_nodes[k].link)
+        text = " ".join(texts)
+        owner_node = nodes[owner] if owner >= 0 else None
+        level = HEADING_TAGS.get(owner_node.tag.name, 0) if owner_node else 0
+        start = offset + (1 if parts else 0)
+        parts.append(text)
+        offset = start + len(text)
+        atoms.append((owner, start, offset, link_chars, any(node.boiler for node in owned),
+                      owner_node.container if owner_node else -1, level))
+    full_text = "\n".join(parts)
+
+    # --- 2. контент-блоки ---
+    groups: List[list] = []
+    first = None
+    headings_only = False  # в текущем блоке пока только заголовки — следующий заголовок не режет
+    for atom in atoms:
+        _, start, end, _, boiler, container, level = atom
+        if (first is None
+                or (1 <= level <= 3 and not headings_only)
+                or container != first[5]
+                or boiler != first[4]
+                or end - first[1] > BLOCK_MAX_CHARS):
+            groups.append([atom])
+            first, headings_only = atom, bool(level)
+        else:
+            groups[-1].append(atom)
+            headings_only = headings_only and bool(level)
+
+    # --- 3–4. фильтр шаблонов и ранжирование ---
+    offers = offer_matcher()
+    total = max(1, len(full_text))
+    blocks, seen = [], set()
+    for group in groups:
+        start, end = group[0][1], group[-1][2]
+        text = full_text[start:end]
+        chars = sum(a[2] - a[1] for a in group)
+        link_density = sum(a[3] for a in group) / max(1, chars)
+        word_count = len(text.split())
+        if group[0][4] or link_density > LINK_DENSITY_MAX or word_count < BLOCK_MIN_WORDS:
+            continue
+        block_id = "B-" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
+        if block_id in seen:
+            continue
+        seen.add(block_id)
+        heading = next((full_text[a[1]:a[2]] for a in group if a[6]), "")
+        offer_tags = offers.labels(text)
+        score = ((1.0 - link_density) * math.log1p(word_count) * (1.0 - 0.3 * start / total)
+                 + (0.5 if heading else 0.0) + 0.5 * len(offer_tags))
+        blocks.append({
+            "id": block_id,
+            "heading": heading,
+            "text": text,
+            "start": start,
+            "end": end,
+            "word_count": word_count,
+            "link_density": round(link_density, 3),
+            "offer_tags": offer_tags,
+            "score": round(score, 3),
+        })
+
+    for rank, block in enumerate(sorted(blocks, key=lambda b: -b["score"]), start=1):
+        block["rank"] = rank
+    return blocks, full_text
+
+
+def select_blocks(blocks: List[dict], budget_chars: int = None) -> List[dict]:
+    """Лучшие по score блоки в пределах бюджета символов — в исходном порядке (для промптов)."""
+    budget = config.LANDING_BLOCK_BUDGET_CHARS if budget_chars is None else budget_chars
+    chosen, used = [], 0
+    for i in sorted(range(len(blocks)), key=lambda i: -blocks[i]["score"]):
+        size = len(blocks[i]["text"])
+        if used + size <= budget:
+            chosen.append(i)
+            used += size
+    return [blocks[i] for i in sorted(chosen)]
+
+
+def extract_landing(soup: BeautifulSoup, base_url: str, ctas_matcher: Optional[KeywordMatcher] = None) -> dict:
+    """
+    Извлекает заголовки, CTA, текстовые секции, списки и формы за один обход DOM.
+    ctas_matcher — словарь CTA (по умолчанию встроенный + configs/ajtd.yaml, см. collectors.keywords).
+    """
+    ctas_matcher = ctas_matcher or cta_matcher()
+    nodes, strings, string_nodes = _walk(soup)
+    index = _TextIndex(strings)
+
+    title: Optional[str] = None
+    meta_description = ""
+    meta_found = False
+    headings_by_level: dict = {level: [] for level in range(1, 7)}
+    ctas, section_nodes, list_nodes, form_nodes = [], [], [], []
+    li_positions, li_texts = [], []
+    input_positions, input_tags = [], []
+
+    for node in nodes:
+        tag = node.tag
+        name = tag.name
+        if name in HEADING_TAGS:
+            text = index.text(node)
+            if text:
+                level = HEADING_TAGS[name]
+                headings_by_level[level].append({"level": level, "text": text, "tag": name})
+        elif name in CTA_TAGS:
+            text = index.text(node)
+            if text:
+                if tag.get('type') == 'submit' or ctas_matcher.search(text):
+                    href = tag.get('href', '')
+                    ctas.append({
+                        "text": text,
+                        "href": urljoin(base_url, href) if href else "",
+                        "type": name,
+                    })
+        elif name in SECTION_TAGS:
+            section_nodes.append(node)
+        elif name in LIST_TAGS:
+            list_nodes.append(node)
+        elif name == "li":
+            li_positions.append(node.index)
+            li_texts.append(index.text(node))
+        elif name == "form":
+            form_nodes.append(node)
+        elif name == "input":
+            input_positions.append(node.index)
+            input_tags.append(tag)
+        elif name == "title" and title is None:
+            title = index.text(node)
+        elif name == "meta" and not meta_found and tag.get('name') == 'description':
+            meta_found = True
+            meta_description = tag.get('content', '')
+
+    sections = _collect_sections(section_nodes, index)
+    blocks, full_text = segment_blocks(nodes, strings, string_nodes)
+
+    lists = []
+    for node in list_nodes:
+        items = _descendants(li_positions, li_texts, node)
+        if len(items) > 1:
+            lists.append({"items": items[:LIST_MAX_ITEMS], "type": node.tag.name})
+
+    forms = []
+    for node in form_nodes:
+        inputs = [inp.get('name', inp.get('placeholder', ''))
+                  for inp in _descendants(input_positions, input_tags, node)]
+        if inputs:
+            forms.append({
+                "action": node.tag.get('action', ''),
+                "method": node.tag.get('method', 'get'),
+                "inputs": inputs,
+            })
+
+    return {
+        "url": base_url,
+        "title": title or "",
+        "meta_description": meta_description,
+        "headings": [h for level in range(1, 7) for h in headings_by_level[level]],
+        "ctas": ctas,
+        "sections": sections,
+        "lists": lists,
+        "forms": forms,
+        "blocks": blocks,
+        "full_text": full_text,
+        "extraction_timestamp": time.time(),
+    }
+
@@ -0,0 +1,94 @@
+"""
+Поиск почти-дубликатов текстов (VOC-записи перед любыми вызовами LLM).
+
+Текст → множество символьных 4-грамм нормализованного текста (регистр, ё/е, пунктуация
+не важны; устойчиво к окончаниям и опечаткам) → MinHash-сигнатура из NUM_PERM значений →
+LSH: сигнатура режется на BANDS полос, записи с совпавшей полосой — кандидаты. Кандидат
+подтверждается точным Жаккаром по шинглам не ниже порога. Индекс потоковый: запись либо
+присоединяется к кластеру первого похожего представителя, либо сама становится представителем.
+
+Хэши детерминированы (crc32 + фиксированные маски) — результат не зависит от
+PYTHONHASHSEED и одинаков между прогонами.
+"""
+
+import hashlib
+import random
+import re
+import zlib
+from typing import Dict, List, Optional
+
+SHINGLE_CHARS = 4
+NUM_PERM = 32
+BANDS = 8  # по 4 строки: при Жаккаре 0.8 кандидат находится с вероятностью ~0.98, при 0.5 — ~0.4
+# «перестановки» — XOR хэша шингла со случайной 32-битной маской: min(map(mask.__xor__, ...))
+# считается целиком в C; смещение оценки не важно — кандидаты LSH проверяются точным Жаккаром
+_rng = random.Random(20240101)
+_MASKS = [_rng.getrandbits(32) for _ in range(NUM_PERM)]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.findall(r"\w+", text.lower().replace("ё", "е")))
+
+
+def shingles(text: str) -> frozenset:
+    norm = _normalize(text)
+    if len(norm) <= SHINGLE_CHARS:
+        return frozenset([zlib.crc32(norm.encode("utf-8"))]) if norm else frozenset()
+    return frozenset(zlib.crc32(norm[i:i + SHINGLE_CHARS].encode("utf-8"))
+                     for i in range(len(norm) - SHINGLE_CHARS + 1))
+
+
+def minhash(hashes: frozenset) -> tuple:
+    return tuple(min(map(mask.__xor__, hashes)) for mask in _MASKS)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class NearDuplicateIndex:
+    """
+    Потоковая кластеризация: add(text) → (id кластера, новый ли он). В памяти — шинглы
+    представителей и LSH-полосы, сами тексты не хранятся.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self._rows = NUM_PERM // BANDS
+        self._buckets: List[Dict[tuple, List[int]]] = [{} for _ in range(BANDS)]
+        self._shingles: List[frozenset] = []
+        self._exact: Dict[bytes, int] = {}  # дайджест нормализованного текста → кластер
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+    def add(self, text: str) -> tuple:
+        digest = hashlib.blake2b(_normalize(text).encode("utf-8"), digest_size=16).digest()
+        cluster = self._exact.get(digest)
+        if cluster is not None:
+            return cluster, False
+
+        items = shingles(text)
+        signature = minhash(items) if items else (0,) * NUM_PERM
+        bands = [signature[i * self._rows:(i + 1) * self._rows] for i in range(BANDS)]
+        cluster = self._match(items, bands)
+        if cluster is not None:
+            return cluster, False
+
+        cluster = len(self._shingles)
+        self._shingles.append(items)
+        self._exact[digest] = cluster
+        for bucket, band in zip(self._buckets, bands):
+            bucket.setdefault(band, []).append(cluster)
+        return cluster, True
+
+    def _match(self, items: frozenset, bands: list) -> Optional[int]:
+        seen = set()
+        for bucket, band in zip(self._buckets, bands):
+            for candidate in bucket.get(band, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                if jaccard(items, self._shingles[candidate]) >= self.threshold:
+                    return candidate
+        return None
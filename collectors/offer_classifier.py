@@ -0,0 +1,325 @@
+"""
+Локальный классификатор типов офферов для контент-блоков (step_02b_initial_classification).
+
+Типы — те же, что в контракте step_03_offers_inventory: quantitative, qualitative, social_proof,
+risk_reducer, urgency, process (плюс "none" — фраза не оффер). Фраза блока описывается
+признаками: основы слов, метки словаря офферов (collectors.keywords) и шаблоны (цифры с
+единицами, кавычки, шаги). По признакам работает мультиномиальный наивный Байес, обученный
+на принятых выходах LLM прошлых прогонов:
+    artifacts/<run>/step_03_offers_inventory.json  — офферы (тип, текст, sources = id блоков)
+    artifacts/<run>/step_02_extract.json           — тексты блоков того же прогона
+Фраза блока, совпавшая с оффером, — пример его типа, остальные фразы блока — примеры "none".
+Офферы, размеченные локально (classified_by = "local"), и решённые локально блоки в обучение
+не попадают — модель учится только на ответах LLM.
+
+Модель кэшируется в config.OFFER_CLASSIFIER_MODEL и переобучается, когда меняется набор
+прошлых прогонов. Модели доверяют, только если на отложенной части примеров уверенные
+предсказания точны не хуже OFFER_CLASSIFIER_MIN_PRECISION; без истории работают правила
+(RULES) с уверенностью ниже порога — такие блоки всё равно уходят в LLM.
+"""
+
+import hashlib
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import config
+from collectors.competitors import OFFER_HINT_RE, SENTENCE_SPLIT_RE
+from collectors.keywords import offer_matcher
+from utils.http_cache import write_atomic
+
+OFFER_TYPES = ("quantitative", "qualitative", "social_proof", "risk_reducer", "urgency", "process")
+NONE = "none"
+# названия типов из промпта step_03 → типы контракта
+TYPE_ALIASES = {
+    "quantitative_promise": "quantitative",
+    "qualitative_benefit": "qualitative",
+    "urgency_scarcity": "urgency",
+    "process_clarity": "process",
+}
+
+WORD_RE = re.compile(r"[^\W\d_]{3,}")
+STEM_CHARS = 6
+PATTERNS = {
+    "num": re.compile(r"\d"),
+    "metric": OFFER_HINT_RE,
+    "quote": re.compile(r"[«»“”\"]"),
+    "step": re.compile(r"(?<!\w)(?:шаг|этап|step|how it works|как это работает)|^\s*\d+[.)]\s", re.I),
+}
+
+# Правила холодного старта: (тип, признаки) в порядке приоритета
+RULES = (
+    ("urgency", {"#urgency_scarcity"}),
+    ("risk_reducer", {"#guarantee", "#free_trial", "#security"}),
+    ("social_proof", {"#social_proof", "#quote"}),
+    ("process", {"#step"}),
+    ("quantitative", {"#metric", "#discount", "#pricing"}),
+    ("qualitative", {"#speed", "#integrations", "#support"}),
+)
+RULE_CONFIDENCE = 0.6
+
+MODEL_VERSION = 2  # признаки зависят от словаря офферов (collectors.keywords): сменился словарь — увеличить
+# каждый HOLDOUT_EVERY-й пример (по хэшу текста) — отложенная выборка для оценки точности
+HOLDOUT_EVERY = 5
+DEFAULT_STRENGTH = 3
+
+
+def normalize_type(value) -> Optional[str]:
+    value = str(value or "").strip().lower()
+    value = TYPE_ALIASES.get(value, value)
+    return value if value in OFFER_TYPES else None
+
+
+def _key(text: str) -> str:
+    return " ".join(re.findall(r"\w+", str(text).lower().replace("ё", "е")))
+
+
+def split_sentences(text: str) -> List[str]:
+    """Фразы блока: строки (элементы страницы), внутри строки — предложения."""
+    sentences = []
+    for line in text.split("\n"):
+        sentences.extend(s.strip() for s in SENTENCE_SPLIT_RE.split(line))
+    return [s for s in sentences if s]
+
+
+def features(text: str, matcher=None) -> List[str]:
+    """Основы слов + метки словаря офферов (#discount...) + шаблоны (#num, #metric, #quote, #step)."""
+    matcher = matcher or offer_matcher()
+    tokens = [w[:STEM_CHARS] for w in WORD_RE.findall(text.lower().replace("ё", "е"))]
+    tokens += ["#" + label for label in matcher.labels(text)]
+    tokens += ["#" + name for name, regex in PATTERNS.items() if regex.search(text)]
+    return tokens
+
+
+def rule_label(tokens: List[str]) -> Tuple[str, float]:
+    present = {t for t in tokens if t.startswith("#")}
+    for offer_type, triggers in RULES:
+        if present & triggers:
+            return offer_type, RULE_CONFIDENCE
+    return NONE, RULE_CONFIDENCE
+
+
+class NaiveBayes:
+    """Мультиномиальный наивный Байес со сглаживанием Лапласа; чистый Python, сериализуется в JSON."""
+
+    def __init__(self, class_counts: dict, token_counts: dict, strength: dict = None):
+        self.class_counts = class_counts
+        self.token_counts = token_counts
+        self.strength = strength or {}
+        self.vocab = {t for counts in token_counts.values() for t in counts}
+        total = sum(class_counts.values())
+        self._log_prior = {c: math.log(n / total) for c, n in class_counts.items()}
+        self._totals = {c: sum(token_counts.get(c, {}).values()) for c in class_counts}
+
+    @classmethod
+    def train(cls, samples: Iterable[Tuple[List[str], str, Optional[float]]]) -> "NaiveBayes":
+        class_counts: Counter = Counter()
+        token_counts: dict = defaultdict(Counter)
+        strengths: dict = defaultdict(list)
+        for tokens, label, strength in samples:
+            class_counts[label] += 1
+            token_counts[label].update(tokens)
+            if strength:
+                strengths[label].append(strength)
+        return cls(dict(class_counts), {c: dict(v) for c, v in token_counts.items()},
+                   {c: round(sum(v) / len(v)) for c, v in strengths.items()})
+
+    def predict(self, tokens: List[str]) -> Tuple[str, float]:
+        """(класс, апостериорная вероятность); незнакомые токены не учитываются."""
+        known = [t for t in tokens if t in self.vocab]
+        size = len(self.vocab)
+        scores = {}
+        for label, log_prior in self._log_prior.items():
+            counts, denominator = self.token_counts.get(label, {}), self._totals[label] + size
+            scores[label] = log_prior + sum(math.log((counts.get(t, 0) + 1) / denominator) for t in known)
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(s - scores[best]) for s in scores.values())
+        return best, 1.0 / norm
+
+    def to_dict(self) -> dict:
+        return {"class_counts": self.class_counts, "token_counts": self.token_counts, "strength": self.strength}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NaiveBayes":
+        return cls(data["class_counts"], data["token_counts"], data.get("strength"))
+
+
+def _history(artifacts_root: Path, max_runs: int) -> List[Path]:
+    """Прогоны с принятым инвентарём офферов, новые первыми."""
+    root = Path(artifacts_root)
+    if not root.exists():
+        return []
+    paths = sorted(root.glob("*/step_03_offers_inventory.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    return [p.parent for p in paths[:max_runs]]
+
+
+def _signature(runs: List[Path]) -> str:
+    parts = []
+    for run in runs:
+        for name in ("step_03_offers_inventory.json", "step_02_extract.json"):
+            path = run / name
+            if path.exists():
+                parts.append(f"{path}:{path.stat().st_mtime_ns}")
+    # смена порогов меняет и оценку доверия к модели
+    parts.append(f"v{MODEL_VERSION}:{config.OFFER_CLASSIFIER_THRESHOLD}:{config.OFFER_CLASSIFIER_MIN_PRECISION}:"
+                 f"{config.OFFER_CLASSIFIER_MIN_SAMPLES}")
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def _read_data(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("data")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def load_training_samples(runs: List[Path]) -> List[Tuple[str, str, Optional[float]]]:
+    """(текст, тип, strength) из принятых выходов LLM; фразы блоков без оффера — тип "none"."""
+    samples = []
+    for run in runs:
+        inventory = _read_data(run / "step_03_offers_inventory.json") or {}
+        if "error" in inventory:
+            continue
+        offers = [o for o in inventory.get("offers", []) if isinstance(o, dict) and o.get("text")]
+        # блоки, решённые локально в этом или (инкрементально) прошлом прогоне
+        skip = set((inventory.get("prelabelled") or {}).get("blocks", []))
+        skip.update(s for o in offers if o.get("classified_by") == "local" for s in o.get("sources") or [])
+        offers = [(o["text"], normalize_type(o.get("type")), o.get("strength"))
+                  for o in offers if o.get("classified_by") != "local"]
+        offers = [o for o in offers if o[1]]
+        keys = [_key(text) for text, _, _ in offers]
+
+        extracted = _read_data(run / "step_02_extract.json") or {}
+        blocks = (extracted.get("site") or extracted).get("blocks") or []
+        matched = set()
+        for block in blocks:
+            if block["id"] in skip:
+                continue
+            for sentence in split_sentences(block["text"]):
+                key = _key(sentence)
+                label, strength = NONE, None
+                for i, offer_key in enumerate(keys):
+                    if offer_key and (offer_key in key or key in offer_key and len(key) * 2 >= len(offer_key)):
+                        _, label, strength = offers[i]
+                        matched.add(i)
+                        break
+                samples.append((sentence, label, strength))
+        # офферы, не найденные в блоках (CTA, прогоны без блоков), — только положительные примеры
+        samples += [offer for i, offer in enumerate(offers) if i not in matched]
+    return samples
+
+
+def _holdout(text: str) -> bool:
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest(), 16) % HOLDOUT_EVERY == 0
+
+
+class OfferClassifier:
+    def __init__(self, model: Optional[NaiveBayes] = None, stats: dict = None, matcher=None,
+                 threshold: float = None):
+        self.model = model
+        self.stats = stats or {"samples": 0, "trusted": False}
+        self.matcher = matcher or offer_matcher()
+        self.threshold = config.OFFER_CLASSIFIER_THRESHOLD if threshold is None else threshold
+
+    @property
+    def trusted(self) -> bool:
+        return self.model is not None and self.stats.get("trusted", False)
+
+    @classmethod
+    def train(cls, samples: List[Tuple[str, str, Optional[float]]], matcher=None,
+              threshold: float = None) -> "OfferClassifier":
+        """
+        Обучает модель; точность уверенных предсказаний меряется на отложенной выборке,
+        затем модель переобучается на всех примерах.
+        """
+        matcher = matcher or offer_matcher()
+        threshold = config.OFFER_CLASSIFIER_THRESHOLD if threshold is None else threshold
+        featured = [(features(text, matcher), label, strength, text) for text, label, strength in samples]
+        positives = sum(1 for _, label, _, _ in featured if label != NONE)
+        stats = {"samples": len(featured), "positives": positives, "trusted": False}
+        if positives < config.OFFER_CLASSIFIER_MIN_SAMPLES:
+            return cls(None, stats, matcher, threshold)
+
+        train = [(t, label, s) for t, label, s, text in featured if not _holdout(text)]
+        holdout = [(t, label) for t, label, _, text in featured if _holdout(text)]
+        model = NaiveBayes.train(train)
+        confident = [(model.predict(t), label) for t, label in holdout]
+        confident = [(predicted, label) for (predicted, prob), label in confident if prob >= threshold]
+        correct = sum(1 for predicted, label in confident if predicted == label)
+        precision = correct / len(confident) if confident else 0.0
+        stats.update({
+            "holdout": len(holdout),
+            "holdout_confident": len(confident),
+            "holdout_precision": round(precision, 3),
+            "trusted": bool(confident) and precision >= config.OFFER_CLASSIFIER_MIN_PRECISION,
+        })
+        return cls(NaiveBayes.train((t, label, s) for t, label, s, _ in featured), stats, matcher, threshold)
+
+    @classmethod
+    def load(cls, artifacts_root: Path = Path("artifacts"), project: Optional[str] = None,
+             max_runs: int = None) -> "OfferClassifier":
+        """Модель из кэша, если набор прошлых прогонов не изменился; иначе обучение заново."""
+        matcher = offer_matcher(project)
+        runs = _history(artifacts_root, max_runs or config.OFFER_CLASSIFIER_HISTORY_RUNS)
+        signature = _signature(runs) + (f":{project}" if project else "")
+        path = Path(config.OFFER_CLASSIFIER_MODEL)
+        if path.exists():
+            try:
+                cached = json.loads(path.read_text(encoding="utf-8"))
+            except ValueError:
+                cached = {}
+            if cached.get("signature") == signature:
+                model = NaiveBayes.from_dict(cached["model"]) if cached.get("model") else None
+                return cls(model, {**cached["stats"], "cached": True}, matcher)
+
+        classifier = cls.train(load_training_samples(runs), matcher)
+        classifier.stats["runs"] = len(runs)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, json.dumps({
+            "signature": signature,
+            "stats": classifier.stats,
+            "model": classifier.model.to_dict() if classifier.model else None,
+        }, ensure_ascii=False).encode("utf-8"))
+        return classifier
+
+    def classify(self, text: str) -> Tuple[str, float, str]:
+        """(тип или "none", уверенность, метод: model/rules)."""
+        tokens = features(text, self.matcher)
+        if self.trusted:
+            label, prob = self.model.predict(tokens)
+            return label, prob, "model"
+        label, prob = rule_label(tokens)
+        return label, prob, "rules"
+
+    def classify_block(self, block: dict) -> dict:
+        """
+        Разметка блока по фразам. Блок решён (decided), если каждая фраза классифицирована
+        с уверенностью не ниже порога; офферы решённого блока не нужно отправлять в LLM.
+        """
+        labelled = []
+        for sentence in split_sentences(block["text"]):
+            label, prob, method = self.classify(sentence)
+            labelled.append({"text": sentence, "type": label, "confidence": round(prob, 3), "method": method})
+        confidence = min((s["confidence"] for s in labelled), default=0.0)
+        return {
+            "id": block["id"],
+            "heading": block.get("heading", ""),
+            "confidence": confidence,
+            "decided": bool(labelled) and confidence >= self.threshold,
+            "types": sorted({s["type"] for s in labelled} - {NONE}),
+            "sentences": labelled,
+        }
+
+    def offers(self, labelled_block: dict) -> List[dict]:
+        """Офферы решённого блока в формате step_03_offers_inventory."""
+        strength = self.model.strength if self.model else {}
+        return [{
+            "type": s["type"],
+            "text": s["text"],
+            "strength": strength.get(s["type"], DEFAULT_STRENGTH),
+            "confidence": s["confidence"],
+            "classified_by": "local",
+        } for s in labelled_block["sentences"] if s["type"] != NONE]
@@ -0,0 +1,90 @@
+"""
+Локальное извлечение цитат-кандидатов из VOC-текстов и ответов интервью.
+
+Раньше цитаты искала модель и переписывала их текст в ответ — большая часть выходных
+токенов уходила на копирование. Теперь текст режется на предложения (RU/EN, с учётом
+сокращений «т.е.», «e.g.»), каждое предложение оценивается словарями pain_point /
+motivation / barrier, лучшие становятся кандидатами; E-id им выдаёт пайплайн (utils.ids),
+а от модели (если нужно) требуются только теги по id кандидата.
+"""
+
+import re
+from typing import Dict, List
+
+MIN_CHARS = 20
+MAX_CHARS = 300
+MAX_QUOTES = 3
+
+# основы слов и фразы; совпадение — с начала слова, регистр и ё/е не важны
+LEXICONS: Dict[str, tuple] = {
+    "pain_point": (
+        "проблем", "неудоб", "долго", "медлен", "сложн", "устал", "устаю", "раздраж", "ошибк", "тормоз",
+        "зависа", "не работа", "не хватает", "трачу", "тратим", "теряю", "теряем", "бесит", "ужасн", "плохо",
+        "жалоб", "сбо", "вылета", "путает", "отстает", "неудобн", "вручную",
+        "problem", "slow", "hard to", "difficult", "annoy", "frustrat", "bug", "crash", "broken", "waste",
+        "painful", "confus", "error", "fail", "manual",
+    ),
+    "motivation": (
+        "хочу", "хотел", "хотим", "нужн", "надо", "чтобы", "мечта", "цель", "важно", "экономит", "удобно",
+        "помога", "быстрее", "успева", "проще", "наконец",
+        "want", "need", "goal", "so that", "help", "save", "faster", "easier", "love", "wish",
+    ),
+    "barrier": (
+        "боюсь", "страх", "дорог", "сомнева", "не уверен", "не доверя", "риск", "мешает", "не могу",
+        "нет времени", "скучно", "брошу", "бросить", "переход", "внедрени",
+        "afraid", "fear", "expensive", "price", "cost", "worry", "risk", "doubt", "trust", "can't", "cannot",
+        "switching",
+    ),
+}
+_LEXICON_RE = {tag: re.compile(r"(?<!\w)(?:" + "|".join(re.escape(stem) for stem in stems) + ")")
+               for tag, stems in LEXICONS.items()}
+
+ABBREVIATIONS = {"т.е", "т.д", "т.п", "т.к", "т.н", "др", "напр", "г", "гг", "руб", "тыс", "млн", "стр",
+                 "e.g", "i.e", "etc", "vs", "mr", "mrs", "ms", "dr", "inc", "approx"}
+_BOUNDARY_RE = re.compile(r"[.!?…]+[\"»”')]*\s+(?=[\"«“(]?[A-ZА-ЯЁ0-9])|\n\s*\n|\n(?=\s*[-•*]\s)")
+_LAST_WORD_RE = re.compile(r"(\S+?)[.!?…]*[\"»”')]*\s*$")
+
+
+def _normalize(text: str) -> str:
+    return text.lower().replace("ё", "е")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Предложения текста; точка после сокращения («т.е.», «e.g.») границей не считается."""
+    sentences, start = [], 0
+    text = str(text or "")
+    for match in _BOUNDARY_RE.finditer(text):
+        head = text[start:match.end()]
+        last = _LAST_WORD_RE.search(head.rstrip())
+        if last and _normalize(last.group(1)).rstrip(".") in ABBREVIATIONS and "\n" not in match.group():
+            continue
+        sentences.append(head.strip(" \n-•*"))
+        start = match.end()
+    sentences.append(text[start:].strip(" \n-•*"))
+    return [s for s in sentences if s]
+
+
+def lexicon_tags(sentence: str) -> Dict[str, int]:
+    """{тег: число совпадений словаря}."""
+    norm = _normalize(sentence)
+    hits = {tag: len(pattern.findall(norm)) for tag, pattern in _LEXICON_RE.items()}
+    return {tag: n for tag, n in hits.items() if n}
+
+
+def extract_candidates(text: str, max_quotes: int = MAX_QUOTES) -> List[dict]:
+    """
+    Лучшие предложения текста по совпадениям словарей, в порядке текста:
+    [{"text", "tags", "score"}]. Слишком короткие/длинные предложения пропускаются.
+    """
+    scored = []
+    for order, sentence in enumerate(split_sentences(text)):
+        if not MIN_CHARS <= len(sentence) <= MAX_CHARS:
+            continue
+        hits = lexicon_tags(sentence)
+        if not hits:
+            continue
+        # несколько семейств в одном предложении ценнее, чем повтор одного слова
+        score = sum(hits.values()) + len(hits)
+        scored.append((score, order, {"text": sentence, "tags": sorted(hits), "score": score}))
+    best = sorted(scored, key=lambda item: (-item[0], item[1]))[:max_quotes]
+    return [candidate for _, _, candidate in sorted(best, key=lambda item: item[1])]
@@ -0,0 +1,87 @@
+"""
+Компактный дайджест сессии интервью для промптов следующих шагов.
+
+Сессия (транскрипт, резюме, цитаты) один раз превращается в дайджест: персона, продукт,
+резюме, теги, ключевые цитаты с E-id и упомянутые работы («хочу…», «нужно, чтобы…»).
+Тексты режутся по границе предложения/слова, а не посреди слова. Дайджест детерминирован
+(без LLM) и хранится в корпусе прогона (utils.corpus_store) вместе с сессией.
+"""
+
+import re
+from typing import List
+
+SUMMARY_CHARS = 240
+QUOTE_CHARS = 160
+JOB_CHARS = 140
+MAX_QUOTES = 4
+MAX_JOBS = 3
+
+SENTENCE_RE = re.compile(r"[^.!?…]+[.!?…]*")
+JOB_RE = re.compile(r"\b(хочу|хотим|хотел[аи]?|нужн[оа]|надо|чтобы|стараюсь|пытаюсь|"
+                    r"want|need|trying to|so that|in order to)\b", re.IGNORECASE)
+
+
+def clip(text: str, limit: int) -> str:
+    """Обрезка по последнему целому предложению, иначе по слову, с «…»."""
+    text = " ".join(str(text or "").split())
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    cut = max(head.rfind(". "), head.rfind("! "), head.rfind("? "))
+    if cut >= limit // 2:
+        return head[:cut + 1]
+    return head.rsplit(" ", 1)[0].rstrip(",;:—-") + "…"
+
+
+def _answers(session: dict) -> List[str]:
+    turns = session.get("transcript") if isinstance(session.get("transcript"), list) else []
+    answers = []
+    for turn in turns:
+        if isinstance(turn, dict):
+            answers.append(str(turn.get("a") or turn.get("answer") or ""))
+        elif isinstance(turn, str):
+            answers.append(turn)
+    return answers
+
+
+def _jobs(session: dict) -> List[str]:
+    """Предложения ответов с формулировкой цели — кандидаты в работы (job statements)."""
+    jobs = []
+    for answer in _answers(session):
+        for sentence in SENTENCE_RE.findall(answer):
+            sentence = sentence.strip()
+            if sentence and JOB_RE.search(sentence) and sentence not in jobs:
+                jobs.append(clip(sentence, JOB_CHARS))
+                if len(jobs) == MAX_JOBS:
+                    return jobs
+    return jobs
+
+
+def compact_session(session: dict) -> dict:
+    quotes = [q for q in session.get("quotes") or [] if isinstance(q, dict) and q.get("text")]
+    tags = [str(t) for t in session.get("evidence_tags") or []]
+    summary = session.get("summary") or next((a for a in _answers(session) if a), "")
+    return {
+        "session_id": session.get("session_id"),
+        "persona": session.get("persona"),
+        "product": session.get("product"),
+        "summary": clip(summary, SUMMARY_CHARS),
+        "tags": list(dict.fromkeys(tags + [str(t) for q in quotes for t in q.get("tags") or []])),
+        "quotes": [{"id": q.get("id"), "text": clip(q["text"], QUOTE_CHARS), "tags": q.get("tags") or []}
+                   for q in quotes[:MAX_QUOTES]],
+        "jobs": _jobs(session),
+    }
+
+
+def render(digest: dict) -> str:
+    """Текст дайджеста для промпта."""
+    head = " | ".join(str(v) for v in (digest.get("session_id"), digest.get("persona") or "-",
+                                        digest.get("product") or "-") if v)
+    lines = [f"{head} | tags: {', '.join(digest.get('tags', [])) or '-'}"]
+    if digest.get("summary"):
+        lines.append(f"  summary: {digest['summary']}")
+    if digest.get("jobs"):
+        lines.append(f"  jobs: {' / '.join(digest['jobs'])}")
+    for quote in digest.get("quotes", []):
+        lines.append(f"  {quote['id']} [{', '.join(quote['tags'])}] «{quote['text']}»")
+    return "\n".join(lines)
@@ -0,0 +1,169 @@
+"""
+Версионированные снимки извлечения лендинга и дифф между ними (step_02_extract).
+
+Лендинги перепроверяются еженедельно, а меняется обычно один-два блока. Снимок — то, что
+видят последующие шаги (контент-блоки, CTA, списки, заголовки, формы); дифф с предыдущим
+снимком того же URL говорит, какие блоки добавлены, удалены или изменены.
+
+Раскладка на диске (config.LANDING_SNAPSHOT_DIR):
+    <sha256(url)[:16]>/v0003.json                             — снимок
+    <sha256(url)[:16]>/v0003.step_03_offers_inventory.json    — результат шага по этому снимку
+Хранятся последние config.LANDING_SNAPSHOT_KEEP версий. Шаг, получивший дифф, перерабатывает
+только изменённые блоки и сливает результат с сохранённым по предыдущей версии (load_derived).
+"""
+
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import config
+from utils.http_cache import write_atomic
+
+VERSION_RE = re.compile(r"^v(\d+)\.json$")
+# Ключи извлечения, которые попадают в снимок (pages/crawl/fetch — нет)
+SNAPSHOT_KEYS = ("url", "title", "meta_description", "headings", "ctas", "blocks", "lists", "forms")
+# Непарный блок считается изменённым, если доля общих слов не ниже порога
+MODIFIED_MIN_SIMILARITY = 0.5
+
+
+class LandingSnapshots:
+    def __init__(self, root: str = None, keep: int = None):
+        self.root = Path(root or config.LANDING_SNAPSHOT_DIR)
+        self.keep = keep or config.LANDING_SNAPSHOT_KEEP
+
+    def _dir(self, url: str) -> Path:
+        return self.root / hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+
+    def versions(self, url: str) -> List[str]:
+        directory = self._dir(url)
+        if not directory.exists():
+            return []
+        numbers = sorted(int(m.group(1)) for m in map(VERSION_RE.match, (p.name for p in directory.iterdir())) if m)
+        return [f"v{n:04d}" for n in numbers]
+
+    def load(self, url: str, version: str) -> Optional[dict]:
+        path = self._dir(url) / f"{version}.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def latest(self, url: str) -> Optional[dict]:
+        versions = self.versions(url)
+        return self.load(url, versions[-1]) if versions else None
+
+    def save(self, url: str, extraction: dict) -> str:
+        """Сохраняет новую версию снимка, удаляет старые сверх keep; возвращает id версии."""
+        versions = self.versions(url)
+        version = f"v{int(versions[-1][1:]) + 1 if versions else 1:04d}"
+        snapshot = {k: extraction.get(k) for k in SNAPSHOT_KEYS}
+        snapshot.update({"url": url, "version": version, "created_at": time.time()})
+        directory = self._dir(url)
+        directory.mkdir(parents=True, exist_ok=True)
+        write_atomic(directory / f"{version}.json",
+                     json.dumps(snapshot, ensure_ascii=False).encode("utf-8"))
+        for old in versions[: max(0, len(versions) + 1 - self.keep)]:
+            for path in directory.glob(f"{old}.*"):
+                path.unlink(missing_ok=True)
+        return version
+
+    def save_derived(self, url: str, version: str, step_name: str, data: dict) -> None:
+        """Результат шага, посчитанный по версии снимка — база для инкрементального прогона."""
+        directory = self._dir(url)
+        directory.mkdir(parents=True, exist_ok=True)
+        write_atomic(directory / f"{version}.{step_name}.json",
+                     json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def load_derived(self, url: str, version: str, step_name: str) -> Optional[dict]:
+        path = self._dir(url) / f"{version}.{step_name}.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r"\w+", text.lower()))
+
+
+def _similarity(a: str, b: str) -> float:
+    wa, wb = _words(a), _words(b)
+    return len(wa & wb) / max(1, len(wa | wb))
+
+
+def _diff_blocks(old: List[dict], new: List[dict]) -> dict:
+    """Блоки сопоставляются по id (хэш текста); непарные — по заголовку, затем по сходству слов."""
+    old_ids = {b["id"] for b in old}
+    new_ids = {b["id"] for b in new}
+    removed = [b for b in old if b["id"] not in new_ids]
+    added = [b for b in new if b["id"] not in old_ids]
+
+    modified = []
+    for block in list(added):
+        match = next((b for b in removed if block["heading"] and b["heading"] == block["heading"]), None)
+        if match is None:
+            scored = [(_similarity(b["text"], block["text"]), i) for i, b in enumerate(removed)]
+            best = max(scored, default=(0.0, -1))
+            if best[0] >= MODIFIED_MIN_SIMILARITY:
+                match = removed[best[1]]
+        if match is not None:
+            removed.remove(match)
+            added.remove(block)
+            modified.append({"id": block["id"], "previous_id": match["id"], "heading": block["heading"],
+                             "previous_text": match["text"]})
+
+    return {
+        "added": [{"id": b["id"], "heading": b["heading"]} for b in added],
+        "removed": [{"id": b["id"], "heading": b["heading"], "text": b["text"]} for b in removed],
+        "modified": modified,
+        "unchanged": [b["id"] for b in new if b["id"] in old_ids],
+    }
+
+
+def _diff_items(old: List[dict], new: List[dict], key) -> dict:
+    old_keys = {key(item) for item in old}
+    new_keys = {key(item) for item in new}
+    return {
+        "added": [item for item in new if key(item) not in old_keys],
+        "removed": [item for item in old if key(item) not in new_keys],
+    }
+
+
+def diff_landing(previous: dict, current: dict) -> dict:
+    """Дифф двух снимков: блоки (added/removed/modified/unchanged), CTA, списки, заголовки, формы."""
+    diff = {
+        "base_version": previous.get("version"),
+        "blocks": _diff_blocks(previous.get("blocks") or [], current.get("blocks") or []),
+        "ctas": _diff_items(previous.get("ctas") or [], current.get("ctas") or [],
+                            lambda c: (c["text"], c.get("href"))),
+        "lists": _diff_items(previous.get("lists") or [], current.get("lists") or [],
+                             lambda lst: tuple(lst["items"])),
+        "headings": _diff_items(previous.get("headings") or [], current.get("headings") or [],
+                                lambda h: (h["level"], h["text"])),
+        "forms": _diff_items(previous.get("forms") or [], current.get("forms") or [],
+                             lambda f: (f.get("action"), tuple(f.get("inputs", [])))),
+        "title_changed": previous.get("title") != current.get("title"),
+    }
+    blocks = diff["blocks"]
+    diff["changed"] = bool(
+        blocks["added"] or blocks["removed"] or blocks["modified"] or diff["title_changed"]
+        or any(diff[k]["added"] or diff[k]["removed"] for k in ("ctas", "lists", "headings", "forms"))
+    )
+    return diff
+
+
+def changed_block_ids(diff: dict) -> set:
+    """id блоков текущего снимка, которые нужно переработать (добавленные и изменённые)."""
+    blocks = diff["blocks"]
+    return {b["id"] for b in blocks["added"]} | {b["id"] for b in blocks["modified"]}
+
+
+def stale_texts(diff: dict) -> List[str]:
+    """Тексты прошлого снимка, которых больше нет: удалённые/изменённые блоки, CTA, пункты списков."""
+    blocks = diff["blocks"]
+    texts = [b["text"] for b in blocks["removed"]] + [b["previous_text"] for b in blocks["modified"]]
+    texts += [c["text"] for c in diff["ctas"]["removed"]]
+    texts += [item for lst in diff["lists"]["removed"] for item in lst["items"]]
+    texts += [h["text"] for h in diff["headings"]["removed"]]
+    return texts
@@ -0,0 +1,368 @@
+"""
+Потоковое чтение VOC-источников (step_03_interview_collect, режимы ingest/both).
+
+Каждый файл читается по записи, а не целиком: CSV/TSV — построчно (csv.DictReader),
+JSONL — по строке, JSON — инкрементальным разбором (массив верхнего уровня или
+объект, в котором массивы записей — например {"jtbd_seeds": [...]}; скаляры объекта
+идут в метаданные каждой записи), прочий текст — абзацами до MAX_TEXT_CHARS.
+Память ограничена одной записью (и буфером чтения), размер файла не важен.
+
+Нормализованная запись (Projection — проекция колонок, считается раз на заголовок):
+    {"source": имя файла, "kind": "ticket"|"review"|"lead"|..., "id": ..., "date": ...,
+     "text": VOC-текст записи, "tags": ["industry:Healthcare", ...], "metadata": {хэши, keep-поля}}
+В промпты уходят только информативные поля: контакты и сотрудники выбрасываются, имена
+клиентов хэшируются, категории сжимаются в теги. Правила по источнику — ingest.projections.
+"""
+
+import csv
+import hashlib
+import json
+import re
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import config
+from collectors.near_duplicates import NearDuplicateIndex
+
+# Поля по приоритету (сравнение без регистра)
+ID_FIELDS = ("id", "ticket_id", "review_id", "lead_id", "record_id", "uuid")
+DATE_FIELDS = ("date", "created_date", "created_at", "created", "timestamp", "submitted_at", "updated_at")
+# VOC-текст записи — все непустые поля из списка, в этом порядке
+TEXT_FIELDS = ("subject", "title", "review_text", "text", "description", "comment", "message", "body",
+               "content", "notes", "feedback", "job_statement", "context", "pain_points", "desired_outcomes")
+KIND_BY_ID = {"ticket_id": "ticket", "review_id": "review", "lead_id": "lead"}
+
+# Проекция колонок по умолчанию; per-source правила — ingest.projections в configs/ajtd.yaml.
+# Контакты и сотрудники не несут JTBD-сигнала — выбрасываются; имена клиентов и их id хэшируются
+# (группировка по клиенту остаётся, имя в промпт не попадает); категориальные поля — компактные теги.
+DROP_RE = re.compile(r"e-?mail|phone|телефон|почта|contact_person|agent|address|адрес|passport|паспорт|^ip(?:_address)?$", re.I)
+HASH_RE = re.compile(r"customer_name|company_name|client|user_?name|^name$|фио|^(?:customer|user|account)_id$", re.I)
+TAG_FIELDS = ("industry", "product", "priority", "status", "sentiment", "platform", "user_type", "rating",
+              "company_size", "revenue_range", "lead_source", "source", "language", "country", "segment",
+              "frequency", "channel", "plan", "tier", "category", "project")
+# колонка без правила: короткое значение — тег, длинное — выбрасывается
+TAG_MAX_CHARS = 40
+HASH_CHARS = 12
+MAX_PLANS = 64
+
+MAX_TEXT_CHARS = 10000  # на запись (раньше — на файл целиком)
+# все записи с id кластера почти-дублей (с dedup в ingest.jsonl — только представители)
+RECORDS_FILE = "voc_records.jsonl"
+MAX_MEMBERS = 20  # id участников на представителя (полная связь — поле cluster в RECORDS_FILE); frequency считает всех
+READ_CHUNK = 1 << 16
+
+
+def _text_value(value) -> str:
+    if isinstance(value, list):
+        return "; ".join(_text_value(v) for v in value if v not in (None, ""))
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value).strip()
+
+
+def _hash(value) -> str:
+    digest = hashlib.sha1(f"{config.INGEST_HASH_SALT}:{value}".encode("utf-8")).hexdigest()
+    return "h:" + digest[:HASH_CHARS]
+
+
+def projection_rules(path: Path, overrides: dict = None) -> dict:
+    """
+    Правила источника: все записи ingest.projections (YAML) и input.ingest_projections,
+    чья маска совпала с именем файла или путём: {text: [...], tags, hash, drop, keep}.
+    """
+    rules: dict = {}
+    for projections in (config.get_config_ingest("projections", {}) or {}, overrides or {}):
+        for pattern, rule in projections.items():
+            if not (fnmatch(path.name, pattern) or fnmatch(str(path), pattern)):
+                continue
+            for action, columns in (rule or {}).items():
+                target = rules.setdefault(action, [])
+                target.extend(c.lower() for c in columns or [] if c.lower() not in target)
+    return rules
+
+
+class Projection:
+    """
+    План проекции для набора колонок: действие по каждой колонке считается один раз
+    на заголовок (CSV) или форму записи (JSON), дальше запись — выборка по готовым спискам.
+    """
+
+    def __init__(self, columns: tuple, rules: dict):
+        names = {str(c).strip().lower(): c for c in columns if c is not None}
+        explicit = {name: action for action in ("drop", "hash", "tags", "keep") for name in rules.get(action, [])}
+        text_order = rules.get("text") or TEXT_FIELDS
+
+        self.id_col = next((names[f] for f in ID_FIELDS if f in names), None) or next(
+            (names[f] for f in names if f.endswith("_id") and f not in explicit and not HASH_RE.search(f)), None)
+        self.date_col = next((names[f] for f in DATE_FIELDS if f in names and f not in explicit), None)
+        self.kind = KIND_BY_ID.get(str(self.id_col).lower(), "record")
+        self.text_cols = [names[f] for f in text_order if f in names and f not in explicit]
+
+        self.tag_cols, self.hash_cols, self.keep_cols, self.auto_cols, self.drop_cols = [], [], [], [], []
+        assigned = {self.id_col, self.date_col, *self.text_cols}
+        for name, column in names.items():
+            if column in assigned:
+                continue
+            action = explicit.get(name) or (
+                "drop" if DROP_RE.search(name) else
+                "hash" if HASH_RE.search(name) else
+                "tags" if name in TAG_FIELDS else "auto")
+            {"tags": self.tag_cols, "hash": self.hash_cols, "keep": self.keep_cols,
+             "auto": self.auto_cols, "drop": self.drop_cols}[action].append(column)
+
+    def apply(self, raw: dict, source: str, index: int, kind: str = None) -> Optional[dict]:
+        """Запись источника → {source, kind, id, date, text, tags, metadata}; None, если текста нет."""
+        text = "\n".join(_text_value(raw[c]) for c in self.text_cols if raw[c] not in (None, "", []))
+        if not text.strip():
+            return None
+        tags = [f"{c}:{raw[c]}" for c in self.tag_cols if raw[c] not in (None, "")]
+        tags += [f"{c}:{raw[c]}" for c in self.auto_cols
+                 if raw[c] not in (None, "") and not isinstance(raw[c], (dict, list))
+                 and len(str(raw[c])) <= TAG_MAX_CHARS]
+        metadata = {c: _hash(raw[c]) for c in self.hash_cols if raw[c] not in (None, "")}
+        metadata.update((c, raw[c]) for c in self.keep_cols)
+        record_id = raw[self.id_col] if self.id_col else None
+        return {
+            "source": source,
+            "kind": kind or self.kind,
+            "id": str(record_id) if record_id not in (None, "") else str(index),
+            "date": raw[self.date_col] if self.date_col else None,
+            "text": text[:MAX_TEXT_CHARS],
+            "tags": tags,
+            "metadata": metadata,
+        }
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id_col, "date": self.date_col, "text": self.text_cols, "tags": self.tag_cols + self.auto_cols,
+            "hash": self.hash_cols, "keep": self.keep_cols, "drop": self.drop_cols,
+        }
+
+
+def _singular(name: str) -> str:
+    return name[:-1] if name.endswith("s") else name
+
+
+class _JsonStream:
+    """Инкрементальный разбор JSON поверх файла: буфер растёт только до размера одного значения."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(READ_CHUNK)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Следующий непробельный символ ('' в конце файла)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def take(self, expected: str) -> None:
+        if self.peek() != expected:
+            raise ValueError(f"Expected {expected!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # число на границе буфера может продолжаться в следующем чанке
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self) -> Iterator:
+        """Элементы массива; открывающая '[' ещё не прочитана."""
+        self.take("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' at offset {self.pos - 1}")
+
+
+def _iter_json(path: Path) -> Iterator[Tuple[dict, Optional[str], dict]]:
+    """(запись, kind, метаданные файла) из JSON: массив верхнего уровня или массивы внутри объекта."""
+    with path.open("r", encoding="utf-8-sig") as f:
+        stream = _JsonStream(f)
+        if stream.peek() == "[":
+            for item in stream.items():
+                yield item, None, {}
+            return
+        stream.take("{")
+        header: dict = {}
+        while stream.peek() not in ("}", ""):
+            key = stream.value()
+            stream.take(":")
+            if stream.peek() == "[":
+                for item in stream.items():
+                    yield item, _singular(key), dict(header)
+            else:
+                value = stream.value()
+                if not isinstance(value, (dict, list)):
+                    header[key] = value
+            if stream.peek() == ",":
+                stream.pos += 1
+
+
+def _iter_text(path: Path) -> Iterator[Tuple[dict, Optional[str], dict]]:
+    """Абзацы текста, склеенные в записи до MAX_TEXT_CHARS."""
+    with path.open("r", encoding="utf-8", errors="replace") as f:
+        parts, size = [], 0
+        for line in f:
+            # режем по пустой строке после лимита, без пустых строк — по лимиту
+            if parts and (size + len(line) > MAX_TEXT_CHARS and not line.strip() or size >= MAX_TEXT_CHARS):
+                yield {"text": "".join(parts)}, "text", {}
+                parts, size = [], 0
+            parts.append(line)
+            size += len(line)
+        if "".join(parts).strip():
+            yield {"text": "".join(parts)}, "text", {}
+
+
+def iter_raw(path: Path) -> Iterator[Tuple[dict, Optional[str], dict]]:
+    suffix = path.suffix.lower()
+    if suffix in (".csv", ".tsv"):
+        with path.open("r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f, delimiter="\t" if suffix == ".tsv" else ","):
+                yield row, None, {}
+    elif suffix in (".jsonl", ".ndjson"):
+        with path.open("r", encoding="utf-8-sig") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    raw = json.loads(line)
+                except ValueError:
+                    continue  # битая строка экспорта не должна терять остальные
+                yield raw, None, {}
+    elif suffix == ".json":
+        yield from _iter_json(path)
+    else:
+        yield from _iter_text(path)
+
+
+def iter_records(path: Path, rules: dict = None, plans: dict = None) -> Iterator[dict]:
+    """
+    Нормализованные записи файла; записи без текста пропускаются. Скаляры заголовка JSON
+    проецируются вместе с записью (project → тег, created_date → дата, если у записи своей нет).
+    plans — кэш планов проекции по набору колонок (для статистики снаружи).
+    """
+    source = path.name  # полный путь — в статистике ingest; в каждой записи он только тратит токены
+    rules = projection_rules(path) if rules is None else rules
+    plans = {} if plans is None else plans
+    for index, (raw, kind, extra) in enumerate(iter_raw(path), 1):
+        if not isinstance(raw, dict):
+            raw = {"text": _text_value(raw)}
+        if extra:
+            raw = {**extra, **raw}
+        columns = tuple(raw)
+        plan = plans.get(columns)
+        if plan is None:
+            if len(plans) >= MAX_PLANS:
+                plans.clear()
+            plan = plans[columns] = Projection(columns, rules)
+        record = plan.apply(raw, source, index, kind)
+        if record is not None:
+            yield record
+
+
+def ingest_files(files: List[str], out_path: Path, projections: dict = None, dedup: bool = None) -> dict:
+    """
+    Записи всех файлов пишутся по мере чтения. С dedup (по умолчанию config.VOC_DEDUP_ENABLED)
+    почти-дубли схлопываются (collectors.near_duplicates): все записи с id своего кластера —
+    в RECORDS_FILE рядом с out_path, в out_path — представители кластеров с frequency и members
+    (source:id участников), самые частые первыми. Без dedup в out_path — все записи.
+
+    Возвращает статистику по файлам (записи, символы, проекция колонок) и dedup; выборку
+    для промпта из out_path делает collectors.voc_sampler. projections — input.ingest_projections поверх YAML.
+    """
+    dedup = config.VOC_DEDUP_ENABLED if dedup is None else dedup
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    existing = [Path(fp) for fp in files if Path(fp).exists()]
+    stats = {"files": [], "missing": [fp for fp in files if not Path(fp).exists()], "records": 0}
+    index = NearDuplicateIndex(config.VOC_DEDUP_THRESHOLD) if dedup else None
+    clusters: List[dict] = []
+    with (out_path.with_name(RECORDS_FILE) if dedup else out_path).open("w", encoding="utf-8") as out:
+        for path in existing:
+            entry = {"source": str(path), "records": 0, "chars": 0, "kinds": {}}
+            plans: dict = {}
+            try:
+                for record in iter_records(path, projection_rules(path, projections), plans):
+                    if index is not None:
+                        cluster, new = index.add(record["text"])
+                        ref = f"{record['source']}:{record['id']}"
+                        if new:
+                            clusters.append({**record, "frequency": 0, "members": []})
+                        representative = clusters[cluster]
+                        representative["frequency"] += 1
+                        if len(representative["members"]) < MAX_MEMBERS:
+                            representative["members"].append(ref)
+                        record["cluster"] = representative["members"][0]
+                    line = json.dumps(record, ensure_ascii=False)
+                    out.write(line + "\n")
+                    entry["records"] += 1
+                    entry["chars"] += len(line)
+                    entry["kinds"][record["kind"]] = entry["kinds"].get(record["kind"], 0) + 1
+            except (ValueError, csv.Error, UnicodeDecodeError) as e:
+                # битый файл не роняет ingest — прочитанное до ошибки остаётся
+                entry["error"] = str(e)
+            if plans:
+                entry["projection"] = next(iter(plans.values())).summary()
+            stats["files"].append(entry)
+            stats["records"] += entry["records"]
+
+    if index is not None:
+        clusters.sort(key=lambda c: -c["frequency"])
+        chars = 0
+        with out_path.open("w", encoding="utf-8") as out:
+            for representative in clusters:
+                line = json.dumps(representative, ensure_ascii=False)
+                out.write(line + "\n")
+                chars += len(line)
+        stats["dedup"] = {
+            "threshold": config.VOC_DEDUP_THRESHOLD,
+            "clusters": len(clusters),
+            "duplicates": stats["records"] - len(clusters),
+            "max_frequency": clusters[0]["frequency"] if clusters else 0,
+            "chars_before": sum(f["chars"] for f in stats["files"]),
+            "chars_after": chars,
+            "records_file": str(out_path.with_name(RECORDS_FILE)),
+        }
+    return stats
+
+
+def read_records(path: Path) -> Iterator[dict]:
+    """Построчное чтение out_path ingest_files (представители или все записи)."""
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,145 @@
+"""
+Выборка VOC-фрагментов для gap analysis (step_03_interview_collect, режим both).
+
+Раньше в промпт шли первые 8 записей по 1000 символов — то есть первые файлы списка.
+Теперь из всего корпуса (interviews/ingest.jsonl) берётся набор в бюджете токенов,
+одновременно репрезентативный и разнообразный:
+
+1. пул — взвешенная по frequency резервуарная выборка (Efraimidis–Spirakis) до POOL_MAX
+   записей: память ограничена, частые жалобы попадают в пул чаще;
+2. векторизация — TF-IDF по основам слов, векторы нормированы (косинус = скалярное произведение);
+3. релевантность — близость к центроиду пула (типичность) и log(frequency);
+4. выбор — maximal marginal relevance: λ·релевантность − (1−λ)·макс. сходство с уже выбранными;
+   сначала по одной записи на страту (источник × продукт × отрасль, крупные страты первыми),
+   затем MMR по всему пулу, пока не кончится бюджет.
+
+Случайность только в пуле и с фиксированным seed — выборка воспроизводима.
+"""
+
+import heapq
+import math
+import random
+import re
+from collections import Counter
+from typing import Callable, Iterable, List
+
+import config
+
+WORD_RE = re.compile(r"[^\W\d_]{3,}")
+STEM_CHARS = 6
+POOL_MAX = 2000
+MMR_LAMBDA = 0.6
+EXCERPT_CHARS = 1000
+STRATA_TAGS = ("product", "industry")
+
+
+def _tokens(text: str) -> List[str]:
+    return [w[:STEM_CHARS] for w in WORD_RE.findall(text.lower().replace("ё", "е"))]
+
+
+def stratum(record: dict) -> tuple:
+    """(источник, продукт, отрасль) — из тегов проекции ingest."""
+    tags = dict(t.split(":", 1) for t in record.get("tags", []) if ":" in t)
+    return (record.get("source"),) + tuple(tags.get(name) for name in STRATA_TAGS)
+
+
+def _pool(records: Iterable[dict], size: int, rng: random.Random) -> List[dict]:
+    """Взвешенный резервуар: ключ u^(1/w), остаются size записей с наибольшими ключами."""
+    heap: list = []
+    for order, record in enumerate(records):
+        key = rng.random() ** (1.0 / max(1, record.get("frequency", 1)))
+        if len(heap) < size:
+            heapq.heappush(heap, (key, order, record))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, order, record))
+    return [record for _, _, record in sorted(heap, key=lambda item: item[1])]
+
+
+def _vectorize(texts: List[str]) -> List[dict]:
+    docs = [Counter(_tokens(text)) for text in texts]
+    df = Counter(term for doc in docs for term in doc)
+    n = len(docs)
+    vectors = []
+    for doc in docs:
+        vector = {term: (1 + math.log(tf)) * math.log((1 + n) / (1 + df[term])) for term, tf in doc.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        vectors.append({term: v / norm for term, v in vector.items()})
+    return vectors
+
+
+def _dot(a: dict, b: dict) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(term, 0.0) for term, v in a.items())
+
+
+def excerpt(record: dict) -> str:
+    """Фрагмент для промпта: вид, id, частота, теги и текст."""
+    frequency = record.get("frequency", 1)
+    head = f"[{record.get('kind', 'record')} {record.get('id', '')}" + (f" ×{frequency}" if frequency > 1 else "")
+    tags = ", ".join(record.get("tags", []))
+    return f"{head}{' | ' + tags if tags else ''}] {record.get('text', '')[:EXCERPT_CHARS]}"
+
+
+def sample_records(records: Iterable[dict], estimate_tokens: Callable[[str], int], budget_tokens: int = None,
+                   seed: int = None, mmr_lambda: float = MMR_LAMBDA) -> dict:
+    """
+    Выбирает записи в бюджете токенов (по excerpt). Возвращает
+    {"records": [...], "strata": {всего, покрыто}, "pool": размер пула, "tokens": потрачено}.
+    """
+    budget_tokens = budget_tokens or config.VOC_SAMPLE_TOKENS
+    rng = random.Random(config.VOC_SAMPLE_SEED if seed is None else seed)
+    pool = _pool(records, POOL_MAX, rng)
+    if not pool:
+        return {"records": [], "strata": {"total": 0, "covered": 0}, "pool": 0, "tokens": 0}
+
+    vectors = _vectorize([r.get("text", "") for r in pool])
+    centroid: Counter = Counter()
+    for vector in vectors:
+        centroid.update(vector)
+    norm = math.sqrt(sum(v * v for v in centroid.values())) or 1.0
+    centroid = {term: v / norm for term, v in centroid.items()}
+    max_log_freq = max(math.log1p(r.get("frequency", 1)) for r in pool)
+    relevance = [0.5 * _dot(vector, centroid) + 0.5 * math.log1p(r.get("frequency", 1)) / max_log_freq
+                 for vector, r in zip(vectors, pool)]
+    costs = [estimate_tokens(excerpt(r)) for r in pool]
+
+    strata = [stratum(r) for r in pool]
+    by_stratum = Counter(strata)
+    # максимальное сходство каждого кандидата с уже выбранными — пересчитывается инкрементально
+    max_sim = [0.0] * len(pool)
+    chosen: List[int] = []
+    remaining = set(range(len(pool)))
+    spent = 0
+
+    def mmr(i: int) -> float:
+        return mmr_lambda * relevance[i] - (1 - mmr_lambda) * max_sim[i]
+
+    def take(i: int) -> None:
+        nonlocal spent
+        chosen.append(i)
+        remaining.discard(i)
+        spent += costs[i]
+        for j in remaining:
+            similarity = _dot(vectors[i], vectors[j])
+            if similarity > max_sim[j]:
+                max_sim[j] = similarity
+
+    # 1) покрытие страт: лучший по MMR кандидат каждой страты, крупные страты первыми
+    for key, _ in sorted(by_stratum.items(), key=lambda item: (-item[1], str(item[0]))):
+        fits = [i for i in remaining if strata[i] == key and spent + costs[i] <= budget_tokens]
+        if fits:
+            take(max(fits, key=lambda i: (mmr(i), -i)))
+    # 2) MMR по всему пулу до исчерпания бюджета
+    while True:
+        fits = [i for i in remaining if spent + costs[i] <= budget_tokens]
+        if not fits:
+            break
+        take(max(fits, key=lambda i: (mmr(i), -i)))
+
+    return {
+        "records": [pool[i] for i in chosen],
+        "strata": {"total": len(by_stratum), "covered": len({strata[i] for i in chosen})},
+        "pool": len(pool),
+        "tokens": round(spent),
+    }
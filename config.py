@@ -54,6 +54,18 @@ def get_config_orchestration(key, default=None):
     """Get orchestration configuration from YAML"""
     return YAML_CONFIG.get('orchestration', {}).get(key, default)
 
+def get_config_reflection(key, default=None):
+    """Get adaptive reflection policy configuration from YAML"""
+    return YAML_CONFIG.get('reflection', {}).get(key, default)
+
+def get_config_ingest(key, default=None):
+    """Get VOC ingest configuration (column projections per source) from YAML"""
+    return YAML_CONFIG.get('ingest', {}).get(key, default)
+
+def get_config_keywords(key, default=None):
+    """Get CTA / offer keyword dictionaries from YAML"""
+    return YAML_CONFIG.get('keywords', {}).get(key, default)
+
 # --- Core Settings ---
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4o")
@@ -62,15 +74,100 @@ MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4o")
 QUALITY_THRESHOLD = float(os.getenv("QUALITY_THRESHOLD", 0.75))
 MAX_REFLECTION_LOOPS = int(os.getenv("MAX_REFLECTION_LOOPS", 1))
 
+# --- Adaptive Reflection Policy ---
+# Бюджеты на прогон: после их исчерпания шаги ниже порога принимаются без повторов
+REFLECTION_TOKEN_BUDGET = int(os.getenv("REFLECTION_TOKEN_BUDGET", 200000))
+REFLECTION_LATENCY_BUDGET_SEC = float(os.getenv("REFLECTION_LATENCY_BUDGET_SEC", 1800))
+# Повтор делается, только если ожидаемая вероятность успеха не ниже порога
+REFLECTION_MIN_SUCCESS_PROB = float(os.getenv("REFLECTION_MIN_SUCCESS_PROB", 0.35))
+# Модель для эскалации (пусто — эскалация выключена)
+ESCALATION_MODEL_NAME = os.getenv("ESCALATION_MODEL_NAME", "")
+
 # --- HITL Thresholds ---
 UNCERTAINTY_THRESHOLD_ASK = float(os.getenv("UNCERTAINTY_THRESHOLD_ASK", 0.6))
 HITL_UNCERTAINTY_TRIGGER = float(os.getenv("HITL_UNCERTAINTY_TRIGGER", 0.3))
 HITL_SCORE_BUFFER = float(os.getenv("HITL_SCORE_BUFFER", 0.1))
 
+# --- HTTP Cache (step_02_extract и другие загрузки страниц) ---
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "artifacts/_http_cache")
+# 0 — всегда ревалидировать условным запросом; >0 — отдавать снимок без запроса в течение TTL
+HTTP_CACHE_TTL_SEC = float(os.getenv("HTTP_CACHE_TTL_SEC", 0))
+HTTP_MAX_BODY_BYTES = int(os.getenv("HTTP_MAX_BODY_BYTES", 5 * 1024 * 1024))
+HTTP_OFFLINE = os.getenv("HTTP_OFFLINE", "false").lower() in ("1", "true", "yes")
+# Парсер BeautifulSoup для лендингов: lxml (быстрый, C) или html.parser (чистый Python, запасной)
+HTML_PARSER = os.getenv("HTML_PARSER", "lxml")
+# Бюджет символов на текст страницы в промптах: берутся лучшие контент-блоки (без шаблонов)
+LANDING_BLOCK_BUDGET_CHARS = int(os.getenv("LANDING_BLOCK_BUDGET_CHARS", 3000))
+
+# --- Site Crawl (step_02_extract, режим crawl) ---
+CRAWL_ENABLED = os.getenv("CRAWL_ENABLED", "false").lower() in ("1", "true", "yes")
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", 10))
+CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", 2))
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", 4))
+# минимальный интервал между запросами к одному хосту (Crawl-delay из robots.txt, если больше)
+CRAWL_HOST_DELAY_SEC = float(os.getenv("CRAWL_HOST_DELAY_SEC", 0.5))
+# --- Снимки лендинга (step_02_extract): версии по URL и дифф с предыдущим прогоном ---
+LANDING_SNAPSHOT_DIR = os.getenv("LANDING_SNAPSHOT_DIR", "artifacts/_landing_snapshots")
+LANDING_SNAPSHOT_KEEP = int(os.getenv("LANDING_SNAPSHOT_KEEP", 10))
+# шаги, зависящие от лендинга, перерабатывают только изменённые блоки (input.incremental переопределяет)
+LANDING_INCREMENTAL = os.getenv("LANDING_INCREMENTAL", "true").lower() in ("1", "true", "yes")
+
+# step_02d_landing_audit: критерии, требующие оценки текста, — одним запросом к LLM (input.audit_llm переопределяет)
+LANDING_AUDIT_LLM = os.getenv("LANDING_AUDIT_LLM", "true").lower() in ("1", "true", "yes")
+
+# step_02b_initial_classification: локальная разметка типов офферов по блокам (collectors.offer_classifier).
+# Блок с уверенностью не ниже порога не отправляется в LLM на step_03 (input.local_classifier переопределяет)
+OFFER_CLASSIFIER_ENABLED = os.getenv("OFFER_CLASSIFIER_ENABLED", "true").lower() in ("1", "true", "yes")
+OFFER_CLASSIFIER_THRESHOLD = float(os.getenv("OFFER_CLASSIFIER_THRESHOLD", 0.9))
+# модели доверяют, если примеров-офферов достаточно и уверенные ответы точны на отложенной выборке
+OFFER_CLASSIFIER_MIN_SAMPLES = int(os.getenv("OFFER_CLASSIFIER_MIN_SAMPLES", 50))
+OFFER_CLASSIFIER_MIN_PRECISION = float(os.getenv("OFFER_CLASSIFIER_MIN_PRECISION", 0.9))
+OFFER_CLASSIFIER_HISTORY_RUNS = int(os.getenv("OFFER_CLASSIFIER_HISTORY_RUNS", 50))
+# каталог прошлых прогонов (<run_id>/step_03_offers_inventory.json), на которых обучается модель
+OFFER_CLASSIFIER_HISTORY_DIR = os.getenv("OFFER_CLASSIFIER_HISTORY_DIR", "artifacts")
+OFFER_CLASSIFIER_MODEL = os.getenv("OFFER_CLASSIFIER_MODEL", "artifacts/_offer_classifier/model.json")
+
+# step_03_offers_inventory: map-reduce по всему контенту — бюджет чанка (≈токены) и параллельные вызовы LLM
+OFFERS_CHUNK_TOKENS = int(os.getenv("OFFERS_CHUNK_TOKENS", 1500))
+OFFERS_MAP_CONCURRENCY = int(os.getenv("OFFERS_MAP_CONCURRENCY", 4))
+
+# step_03_interview_collect, ingest: соль для хэширования идентификаторов клиентов (collectors.voc)
+INGEST_HASH_SALT = os.getenv("INGEST_HASH_SALT", "")
+
+# ingest: почти-дубли VOC (MinHash/LSH по 4-граммам) схлопываются в представителя с частотой (input.voc_dedup переопределяет)
+VOC_DEDUP_ENABLED = os.getenv("VOC_DEDUP_ENABLED", "true").lower() in ("1", "true", "yes")
+VOC_DEDUP_THRESHOLD = float(os.getenv("VOC_DEDUP_THRESHOLD", 0.7))
+
+# step_03_interview_collect, режим both: выборка VOC для gap analysis (collectors.voc_sampler) — бюджет ≈токенов и seed
+VOC_SAMPLE_TOKENS = int(os.getenv("VOC_SAMPLE_TOKENS", 2000))
+VOC_SAMPLE_SEED = int(os.getenv("VOC_SAMPLE_SEED", 42))
+
+# step_03_interview_collect: разобранный гайд кэшируется в GUIDE_CACHE_DIR/<sha256>.json (input.guide_cache переопределяет)
+GUIDE_CACHE_ENABLED = os.getenv("GUIDE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+GUIDE_CACHE_DIR = os.getenv("GUIDE_CACHE_DIR", "artifacts/_guide_cache")
+
+# step_03_interview_collect, ingest: цитаты VOC извлекаются локально (collectors.quote_extractor), LLM только ставит
+# теги лучшим QUOTE_LABEL_MAX кандидатам пачками по QUOTE_LABEL_BATCH (input.quote_llm_labels переопределяет)
+QUOTE_LLM_LABELS = os.getenv("QUOTE_LLM_LABELS", "true").lower() in ("1", "true", "yes")
+QUOTE_LABEL_MAX = int(os.getenv("QUOTE_LABEL_MAX", 200))
+QUOTE_LABEL_BATCH = int(os.getenv("QUOTE_LABEL_BATCH", 50))
+
+# step_04_jtbd: бюджет (≈токены) на дайджесты сессий и VOC-записи в промпте
+JTBD_EVIDENCE_TOKENS = int(os.getenv("JTBD_EVIDENCE_TOKENS", 3000))
+
+# step_03_interview_collect: симуляция интервью шардами по (персона, продукт) — сессий в шарде и параллельные вызовы LLM
+INTERVIEW_SHARD_SESSIONS = int(os.getenv("INTERVIEW_SHARD_SESSIONS", 2))
+INTERVIEW_SIM_CONCURRENCY = int(os.getenv("INTERVIEW_SIM_CONCURRENCY", 4))
+
+# параллельные загрузки лендингов конкурентов (step_02c_competitors)
+COMPETITOR_CONCURRENCY = int(os.getenv("COMPETITOR_CONCURRENCY", 6))
+
 # --- Workflow Definition ---
 WORKFLOW_STEPS = [
     "step_00_compliance_check",
     "step_02_extract",
+    "step_02c_competitors",
+    "step_02d_landing_audit",
     "step_02b_initial_classification",
     "step_03_interview_collect",
     "step_04_jtbd",
@@ -1,13 +1,35 @@
+import contextvars
 import json
 import time
+from contextlib import contextmanager
 from openai import OpenAI
 from openai.types.chat import ChatCompletion
 import config
+from utils.tracing import tracer
 
 class LLMError(Exception):
     """Кастомное исключение для ошибок LLM."""
     pass
 
+
+# Переопределение модели для текущего контекста (эскалация в политике рефлексии)
+_model_override: contextvars.ContextVar = contextvars.ContextVar("llm_model_override", default=None)
+
+
+@contextmanager
+def use_model(model_name: str = None):
+    """Все вызовы LLM внутри блока идут в model_name (None — модель из конфига)."""
+    token = _model_override.set(model_name)
+    try:
+        yield
+    finally:
+        _model_override.reset(token)
+
+
+def current_model() -> str:
+    return _model_override.get() or config.MODEL_NAME
+
+
 class LLM:
     def __init__(self):
         if not config.OPENAI_API_KEY:
@@ -40,22 +62,27 @@ You MUST address this feedback in your new response.
 
         # Retry loop
         last_error = None
-        for attempt in range(self.max_retries):
-            try:
-                return self._make_api_call(full_system_prompt, user_prompt, attempt)
-                
-            except Exception as e:
-                last_error = e
-                print(f"🔄 [RETRY] Attempt {attempt + 1}/{self.max_retries} failed: {str(e)}")
-                
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay * (attempt + 1))  # Exponential backoff
-                    continue
-                else:
-                    break
-        
-        # Если все попытки провалились
-        error_message = f"LLM failed after {self.max_retries} attempts. Last error: {str(last_error)}"
+        with tracer.span("llm.call", kind="llm", model=current_model(),
+                         prompt_chars=len(full_system_prompt) + len(user_prompt)) as sp:
+            for attempt in range(self.max_retries):
+                sp.set(attempts=attempt + 1)
+                try:
+                    return self._make_api_call(full_system_prompt, user_prompt, attempt)
+
+                except Exception as e:
+                    last_error = e
+                    print(f"🔄 [RETRY] Attempt {attempt + 1}/{self.max_retries} failed: {str(e)}")
+
+                    if attempt < self.max_retries - 1:
+                        time.sleep(self.retry_delay * (attempt + 1))  # Exponential backoff
+                        continue
+                    else:
+                        break
+
+            # Если все попытки провалились
+            error_message = f"LLM failed after {self.max_retries} attempts. Last error: {str(last_error)}"
+            sp.status = "error"
+            sp.set(error=error_message)
         return {
             "data": {"error": error_message, "fallback_used": True},
             "score": 0.0,
@@ -99,7 +126,7 @@ STANDARD (JSON Schema for output format):
         """Выполняет API вызов к OpenAI с обработкой ошибок."""
         try:
             completion = self.client.chat.completions.create(
-                model=config.MODEL_NAME,
+                model=current_model(),
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
@@ -110,6 +137,13 @@ STANDARD (JSON Schema for output format):
                 timeout=60
             )
             
+            usage = getattr(completion, "usage", None)
+            span = tracer.current()
+            if usage is not None and span is not None:
+                span.add("prompt_tokens", usage.prompt_tokens or 0)
+                span.add("completion_tokens", usage.completion_tokens or 0)
+                span.add("total_tokens", usage.total_tokens or 0)
+
             response_text = completion.choices[0].message.content
             if not response_text:
                 raise LLMError("Empty response from LLM")
@@ -3,6 +3,7 @@ import json
 import sys
 import time
 import uuid
+from contextlib import nullcontext
 from datetime import datetime
 from pathlib import Path
 from utils.io import ensure_run_dir
@@ -10,18 +11,38 @@ from utils.io import ensure_run_dir
 
 # Импортируем все переменные из конфига
 from config import *
+from llm.client import use_model
 from memory.memory import Memory
+from utils.ids import IdAllocator
 from utils.io import (append_lesson, confirm_action, ensure_run_dir,
                     save_artifact, save_md)
+from utils.profiling import StepProfiler, format_profile_summary
+from utils.tracing import tracer
 from validators.standards_loader import (load_contract_schemas,
                                        load_md_standards,
                                        load_organizational_context,
                                        summarize_understanding)
 # Валидатор теперь будет принимать run_id для логирования инцидентов
 from validators.validate import validate_artifact
+from workflow.reflection_policy import ReflectionPolicy, classify_failure, repair_notes
 from workflow.registry import load_step
 
 
+def build_context(run_id: str, run_dir: Path, input_payload: dict) -> dict:
+    """Контекст прогона, общий для всех шагов (его же собирает bench.run_bench)."""
+    return {
+        "run_id": run_id,
+        # каталог прогона: шаги пишут сюда свои файлы (interviews/, отчёты) и читают файлы предыдущих
+        "run_dir": run_dir,
+        "input": input_payload,
+        "md_standards": load_md_standards(),
+        "schemas": load_contract_schemas(),
+        "org_context": load_organizational_context(),
+        # E-/SES-идентификаторы, уникальные на весь прогон (utils.ids)
+        "ids": IdAllocator()
+    }
+
+
 def main():
     if not OPENAI_API_KEY:
         print("FATAL: OPENAI_API_KEY is not set in your .env file.")
@@ -30,6 +51,8 @@ def main():
     parser = argparse.ArgumentParser(description="AI Marketing Agent")
     parser.add_argument("--input", required=True, help="Path to input JSON")
     parser.add_argument("--project-dir", required=False, help="Path to project/scenario dir")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile each step (cProfile + sampler), write results to <run_dir>/profile")
     args = parser.parse_args()
 
     
@@ -45,23 +68,21 @@ def main():
     with input_path.open("r", encoding="utf-8") as f:
         input_payload = json.load(f)
 
-    # Собираем весь контекст для прогона
-    md_standards = load_md_standards()
-    schemas = load_contract_schemas()
-    org_context = load_organizational_context()
+    context = build_context(run_id, run_dir, input_payload)
 
-    context = {
-        "run_id": run_id,
-        "input": input_payload,
-        "md_standards": md_standards,
-        "schemas": schemas,
-        "org_context": org_context
-    }
-    
     save_md(run_dir / "step_00_understanding.md", summarize_understanding(context))
     print("✅ STEP-0: Context, standards, and schemas loaded.")
 
     mem = Memory(run_dir)
+    tracer.configure(run_dir / "trace.jsonl")
+    run_span = tracer.start_span("run", kind="run", run_id=run_id, input=str(input_path))
+    run_started = time.monotonic()
+    policy = ReflectionPolicy.from_artifacts(run_dir.parent)
+    profiler = StepProfiler(run_dir / "profile") if args.profile else None
+
+    def profiled(name: str):
+        return profiler.section(name) if profiler else nullcontext()
+
     artifacts = {}
     step_index = 0
 
@@ -78,21 +99,35 @@ def main():
             continue
 
         start_time = time.monotonic()
+        step_span = tracer.start_span(step_name, kind="step", step=step_name)
         
         context["current_standard_text"] = context["md_standards"].get(step_name, "")
         context["current_schema"] = context["schemas"].get(step_name, {})
         context.pop("reflection_notes", None)
+        max_attempts = policy.max_attempts(step_name)
+        escalate_to = None
 
         # Цикл попыток с рефлексией
-        for attempt in range(MAX_REFLECTION_LOOPS + 1):
+        for attempt in range(max_attempts):
+            attempt_span = tracer.start_span("attempt", kind="attempt", step=step_name, attempt=attempt)
+            attempt_started = time.monotonic()
+            tokens_before = tracer.totals(kind="llm", attr="total_tokens")
             try:
-                result = step.run(context, artifacts)
-                
-                # Валидация результата
-                schema_score, checklist_score, validation_notes = validate_artifact(
-                    step_name, result.data, context["schemas"]
-                )
+                with profiled(step_name), use_model(escalate_to):
+                    result = step.run(context, artifacts)
+
+                    # Валидация результата
+                    schema_score, checklist_score, validation_notes = validate_artifact(
+                        step_name, result.data, context["schemas"]
+                    )
                 final_score = min(schema_score, checklist_score, result.score)
+                attempt_tokens = int(tracer.totals(kind="llm", attr="total_tokens") - tokens_before)
+                failure_kind = None if final_score >= QUALITY_THRESHOLD else classify_failure(
+                    schema_score, checklist_score, validation_notes, result.data
+                )
+                attempt_span.set(score=final_score, schema_score=schema_score,
+                                 checklist_score=checklist_score, uncertainty=result.uncertainty,
+                                 tokens=attempt_tokens, failure_kind=failure_kind)
                 
                 # Проверяем тригеры для HITL
                 hitl_triggered = False
@@ -119,7 +154,9 @@ def main():
                 if hitl_triggered:
                     print(f"🕹️ [HITL] Approval required: {trigger_reason}.")
                     print(json.dumps(result.data, indent=2, ensure_ascii=False))
-                    if not confirm_action("Approve this result?"):
+                    with tracer.span("hitl.confirm", kind="hitl", reason=trigger_reason):
+                        approved = confirm_action("Approve this result?")
+                    if not approved:
                         user_feedback = input("   Please provide brief feedback for reflection: ")
                         context["reflection_notes"] = f"User rejected the output. Feedback: '{user_feedback}'. Self-critique was: {result.notes}"
                         print("   User rejected. Triggering reflection...")
@@ -128,7 +165,8 @@ def main():
                 # Проверяем качество результата
                 if final_score >= QUALITY_THRESHOLD:
                     artifacts[step_name] = result.data
-                    save_artifact(run_dir, step_name, result, time.monotonic() - start_time)
+                    with profiled(step_name):
+                        save_artifact(run_dir, step_name, result, time.monotonic() - start_time)
                     
                     # промоут для гайда
                     if step_name == "step_02a_guide_compile":
@@ -138,20 +176,41 @@ def main():
                             promote_guide_artifacts(artifacts[step_name], promote_to, run_dir)
                             print(f"[PROMOTED] Guide saved to: {promote_to}")
                     
+                    mem.log_event(f"{step_name}_ATTEMPT", {
+                        "step": step_name, "attempt": attempt, "score": final_score, "passed": True,
+                        "failure_kind": None, "tokens": attempt_tokens, "model": escalate_to,
+                    })
                     mem.log_event(f"{step_name}_SUCCESS", result.model_dump())
                     step_index += 1
                     break
                 else:
                     notes = f"Score {final_score:.2f} < {QUALITY_THRESHOLD}. {validation_notes}. Self-critique: {result.notes}"
-                    if attempt < MAX_REFLECTION_LOOPS:
-                        print(f"🤔 [REFLECT] {notes}. Retrying (attempt {attempt + 2}/{MAX_REFLECTION_LOOPS + 1})...")
-                        context["reflection_notes"] = notes
+                    decision = policy.decide(
+                        step_name, attempt, final_score, failure_kind,
+                        run_tokens=tracer.totals(kind="llm", attr="total_tokens"),
+                        run_elapsed_sec=time.monotonic() - run_started,
+                        attempt_tokens=attempt_tokens,
+                        attempt_sec=time.monotonic() - attempt_started,
+                    )
+                    attempt_span.set(decision=decision.action, decision_reason=decision.reason)
+                    mem.log_event(f"{step_name}_ATTEMPT", {
+                        "step": step_name, "attempt": attempt, "score": final_score, "passed": False,
+                        "failure_kind": failure_kind, "tokens": attempt_tokens, "model": escalate_to,
+                        "decision": decision.model_dump(),
+                    })
+                    if decision.action != "accept":
+                        print(f"🤔 [REFLECT:{decision.action.upper()}] {notes}. {decision.reason}. "
+                              f"Retrying (attempt {attempt + 2}/{max_attempts})...")
+                        context["reflection_notes"] = repair_notes(validation_notes) if decision.action == "repair" else notes
+                        if decision.action == "escalate":
+                            escalate_to = decision.model
                         append_lesson(f"Lesson from {step_name} (reflection): {notes}")
                     else:
-                        print(f"❌ [FAIL] Max reflections reached. {notes}.")
+                        print(f"❌ [FAIL] Accepting below threshold ({decision.reason}). {notes}.")
                         print("   Saving failed artifact and moving to the next step.")
                         artifacts[step_name] = result.data
-                        save_artifact(run_dir, f"{step_name}_FAILED", result, time.monotonic() - start_time)
+                        with profiled(step_name):
+                            save_artifact(run_dir, f"{step_name}_FAILED", result, time.monotonic() - start_time)
                         mem.log_event(f"{step_name}_FAIL", result.model_dump())
                         step_index += 1
                         break
@@ -159,10 +218,28 @@ def main():
             except Exception as e:
                 print(f"❌ [ERROR] Step {step_name} failed with exception: {e}")
                 mem.log_event(f"{step_name}_ERROR", {"error": str(e), "attempt": attempt})
-                if attempt >= MAX_REFLECTION_LOOPS:
+                mem.log_event(f"{step_name}_ATTEMPT", {
+                    "step": step_name, "attempt": attempt, "score": 0.0, "passed": False,
+                    "failure_kind": "exception", "tokens": 0, "model": escalate_to,
+                })
+                attempt_span.status = "error"
+                attempt_span.set(error=str(e))
+                if attempt + 1 >= max_attempts:
                     print("   Max attempts reached. Moving to next step.")
                     step_index += 1
                     break
+            finally:
+                tracer.end_span(attempt_span)
+
+        tracer.end_span(step_span)
+
+    tracer.end_span(run_span)
+    tracer.export_chrome(run_dir / "trace.chrome.json")
+
+    if profiler:
+        summary = profiler.dump()
+        print(f"\n📊 Profile (per step) saved in: {run_dir / 'profile'}")
+        print(format_profile_summary(summary))
 
     print(f"\n✅ Workflow finished. Artifacts saved in: {run_dir}")
 
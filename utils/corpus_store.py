@@ -0,0 +1,262 @@
+"""
+Корпус интервью прогона: interviews/corpus.sqlite рядом с JSONL-файлами step_03_interview_collect.
+
+JSONL (simulated / ingest / after_ingest) остаются как читаемые артефакты, а шаги читают корпус
+из SQLite адресно — «цитаты pain_point по продукту X» — вместо того чтобы парсить все файлы
+в память и обрезать. Таблицы:
+
+  sessions — сессия интервью (SES-id, источник, персона, продукт, резюме, JSON сессии
+             и её компактный дайджест — collectors.session_digest)
+  quotes   — цитата (E-id, сессия или VOC-запись «файл:id», текст, контекст)
+  records  — VOC-запись ingest (представитель кластера почти-дублей, частота)
+  tags     — тег сессии / цитаты / записи (owner = SES-, E- или id записи)
+  fts      — полнотекстовый индекс FTS5 по транскриптам, цитатам и записям
+
+Если sqlite собран без FTS5, search() ищет через LIKE.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from collectors.session_digest import compact_session
+
+CORPUS_FILE = "corpus.sqlite"
+JSONL_SOURCES = ("simulated", "ingest", "after_ingest")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY, source TEXT, persona TEXT, product TEXT, summary TEXT, data TEXT,
+    digest TEXT);
+CREATE TABLE IF NOT EXISTS quotes (
+    evidence_id TEXT PRIMARY KEY, session_id TEXT, local_id TEXT, text TEXT, context TEXT);
+CREATE TABLE IF NOT EXISTS records (
+    record_id TEXT, source TEXT, kind TEXT, date TEXT, text TEXT, frequency INTEGER, data TEXT);
+CREATE TABLE IF NOT EXISTS tags (owner TEXT, tag TEXT);
+CREATE INDEX IF NOT EXISTS sessions_persona ON sessions (persona);
+CREATE INDEX IF NOT EXISTS sessions_product ON sessions (product);
+CREATE INDEX IF NOT EXISTS quotes_session ON quotes (session_id);
+CREATE INDEX IF NOT EXISTS records_id ON records (record_id);
+CREATE INDEX IF NOT EXISTS records_frequency ON records (frequency);
+CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag, owner);
+CREATE INDEX IF NOT EXISTS tags_owner ON tags (owner);
+"""
+
+
+def _transcript_text(session: dict) -> str:
+    turns = session.get("transcript") if isinstance(session.get("transcript"), list) else []
+    parts = []
+    for turn in turns:
+        if isinstance(turn, dict):
+            parts.extend(str(v) for v in turn.values() if v)
+        elif turn:
+            parts.append(str(turn))
+    return "\n".join(parts)
+
+
+class CorpusStore:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(_SCHEMA)
+        try:
+            self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS fts USING fts5("
+                              "owner UNINDEXED, kind UNINDEXED, text, tokenize='unicode61 remove_diacritics 2')")
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS fts (owner TEXT, kind TEXT, text TEXT)")
+            self.fts = False
+
+    @classmethod
+    def create(cls, interviews_dir: Path) -> "CorpusStore":
+        """Новый пустой корпус (перезапуск шага перезаписывает и JSONL, и базу)."""
+        interviews_dir.mkdir(parents=True, exist_ok=True)
+        path = interviews_dir / CORPUS_FILE
+        if path.exists():
+            path.unlink()
+        return cls(path)
+
+    @classmethod
+    def open(cls, run_dir: Path) -> Optional["CorpusStore"]:
+        """
+        Корпус прогона; для прогонов до появления базы — собирается из interviews/*.jsonl.
+        None — интервью нет.
+        """
+        interviews_dir = Path(run_dir) / "interviews"
+        if (interviews_dir / CORPUS_FILE).exists():
+            return cls(interviews_dir / CORPUS_FILE)
+        files = [(source, interviews_dir / f"{source}.jsonl") for source in JSONL_SOURCES]
+        if not any(path.exists() for _, path in files):
+            return None
+        store = cls.create(interviews_dir)
+        for source, path in files:
+            if path.exists():
+                rows = store._read_jsonl(path)
+                if source == "ingest":
+                    store.add_records(rows)
+                else:
+                    store.add_sessions((row.get("session") or row for row in rows), source)
+        return store
+
+    @staticmethod
+    def _read_jsonl(path: Path) -> Iterable[dict]:
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(row, dict):
+                    yield row
+
+    def add_sessions(self, sessions: Iterable[dict], source: str) -> int:
+        """
+        Повторный id (сессии или цитаты) пропускается — побеждает первая запись. Дайджест сессии
+        строится при добавлении и хранится рядом с ней — шаги не пересчитывают его при каждом чтении.
+        """
+        added = 0
+        offset = self._count("sessions")
+        with self.conn:
+            for i, session in enumerate(sessions, 1):
+                if not isinstance(session, dict):
+                    continue
+                # сессии без глобального id (старые прогоны) получают id по порядку
+                session_id = session.get("session_id") or f"{source}:{offset + i}"
+                digest = {**compact_session(session), "session_id": session_id}
+                if not self._insert("sessions", (
+                        session_id, source, session.get("persona"), session.get("product"), session.get("summary"),
+                        json.dumps(session, ensure_ascii=False), json.dumps(digest, ensure_ascii=False))):
+                    continue
+                self._index(session_id, "session",
+                            "\n".join(filter(None, [session.get("summary"), _transcript_text(session)])),
+                            session.get("evidence_tags"))
+                for quote in session.get("quotes") if isinstance(session.get("quotes"), list) else []:
+                    if not isinstance(quote, dict) or not quote.get("id"):
+                        continue
+                    if self._insert("quotes", (quote["id"], session_id, quote.get("local_id"), quote.get("text"),
+                                               quote.get("context"))):
+                        self._index(quote["id"], "quote", quote.get("text") or "", quote.get("tags"))
+                added += 1
+        return added
+
+    def add_records(self, records: Iterable[dict]) -> int:
+        """id записи (файл:id) не уникален — без dedup одинаковые id из источника сохраняются все."""
+        added = 0
+        with self.conn:
+            for record in records:
+                record_id = f"{record.get('source')}:{record.get('id')}"
+                self._insert("records", (
+                    record_id, record.get("source"), record.get("kind"), record.get("date"), record.get("text"),
+                    record.get("frequency", 1), json.dumps(record, ensure_ascii=False)))
+                self._index(record_id, "record", record.get("text") or "", record.get("tags"))
+                added += 1
+        return added
+
+    def add_record_quotes(self, quotes: Iterable[dict]) -> int:
+        """Цитаты VOC-записей (collectors.quote_extractor): владелец — «файл:id» записи в поле source."""
+        added = 0
+        with self.conn:
+            for quote in quotes:
+                if self._insert("quotes", (quote["id"], quote.get("source"), None, quote.get("text"),
+                                           quote.get("context"))):
+                    self._index(quote["id"], "quote", quote.get("text") or "", quote.get("tags"))
+                    added += 1
+        return added
+
+    def _insert(self, table: str, values: tuple) -> bool:
+        cursor = self.conn.execute(f"INSERT OR IGNORE INTO {table} VALUES ({', '.join('?' * len(values))})", values)
+        return cursor.rowcount > 0
+
+    def _index(self, owner: str, kind: str, text: str, tags) -> None:
+        self.conn.executemany("INSERT INTO tags VALUES (?, ?)",
+                              [(owner, str(tag)) for tag in dict.fromkeys(tags or []) if tag])
+        if text:
+            self.conn.execute("INSERT INTO fts VALUES (?, ?, ?)", (owner, kind, text))
+
+    def _count(self, table: str) -> int:
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {"path": str(self.path), "sessions": self._count("sessions"), "quotes": self._count("quotes"),
+                "records": self._count("records"), "fts": self.fts}
+
+    def sessions(self, persona: str = None, product: str = None, tag: str = None, limit: int = None) -> List[dict]:
+        sql, args = "SELECT data FROM sessions s WHERE 1 = 1", []
+        for column, value in (("persona", persona), ("product", product)):
+            if value is not None:
+                sql += f" AND s.{column} = ?"
+                args.append(value)
+        if tag is not None:
+            sql += " AND EXISTS (SELECT 1 FROM tags t WHERE t.owner = s.session_id AND t.tag = ?)"
+            args.append(tag)
+        sql += " ORDER BY s.rowid" + (" LIMIT ?" if limit else "")
+        args += [limit] if limit else []
+        return [json.loads(row["data"]) for row in self.conn.execute(sql, args)]
+
+    def digests(self, persona: str = None, product: str = None, limit: int = None) -> List[dict]:
+        """Дайджесты сессий в порядке добавления (collectors.session_digest.render — текст для промпта)."""
+        sql, args = "SELECT digest FROM sessions s WHERE 1 = 1", []
+        for column, value in (("persona", persona), ("product", product)):
+            if value is not None:
+                sql += f" AND s.{column} = ?"
+                args.append(value)
+        sql += " ORDER BY s.rowid" + (" LIMIT ?" if limit else "")
+        args += [limit] if limit else []
+        return [json.loads(row["digest"]) for row in self.conn.execute(sql, args)]
+
+    def quotes(self, tag: str = None, product: str = None, persona: str = None, session_id: str = None,
+               limit: int = 50) -> List[dict]:
+        """
+        Цитаты с полями сессии (persona, product) и тегами; фильтры комбинируются через AND.
+        У цитат VOC-записей session_id — «файл:id» записи, source — "ingest", персоны и продукта нет.
+        """
+        sql = ("SELECT q.evidence_id, q.session_id, q.text, q.context, s.persona, s.product,"
+               " COALESCE(s.source, 'ingest') AS source,"
+               " (SELECT group_concat(tag, '\x1f') FROM tags t WHERE t.owner = q.evidence_id) AS tags"
+               " FROM quotes q LEFT JOIN sessions s ON s.session_id = q.session_id WHERE 1 = 1")
+        args: list = []
+        for column, value in (("s.product", product), ("s.persona", persona), ("q.session_id", session_id)):
+            if value is not None:
+                sql += f" AND {column} = ?"
+                args.append(value)
+        if tag is not None:
+            sql += " AND EXISTS (SELECT 1 FROM tags t WHERE t.owner = q.evidence_id AND t.tag = ?)"
+            args.append(tag)
+        sql += " ORDER BY q.rowid LIMIT ?"
+        args.append(limit)
+        return [{**dict(row), "tags": row["tags"].split("\x1f") if row["tags"] else []}
+                for row in self.conn.execute(sql, args)]
+
+    def records(self, tag: str = None, limit: int = 50) -> List[dict]:
+        """VOC-записи ingest, самые частые первыми."""
+        sql, args = "SELECT data FROM records r", []
+        if tag is not None:
+            sql += " WHERE EXISTS (SELECT 1 FROM tags t WHERE t.owner = r.record_id AND t.tag = ?)"
+            args.append(tag)
+        sql += " ORDER BY r.frequency DESC, r.rowid LIMIT ?"
+        args.append(limit)
+        return [json.loads(row["data"]) for row in self.conn.execute(sql, args)]
+
+    def search(self, query: str, kind: str = None, limit: int = 20) -> List[dict]:
+        """Полнотекстовый поиск: [{"owner", "kind", "text"}], лучшие совпадения первыми."""
+        if self.fts:
+            # слова запроса — отдельные термы FTS5 (кавычки экранируют синтаксис запроса)
+            terms = " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+            if not terms:
+                return []
+            sql, args = "SELECT owner, kind, text FROM fts WHERE fts MATCH ?", [terms]
+            order = " ORDER BY rank"
+        else:
+            sql, args = "SELECT owner, kind, text FROM fts WHERE text LIKE ?", [f"%{query}%"]
+            order = ""
+        if kind is not None:
+            sql += " AND kind = ?"
+            args.append(kind)
+        sql += order + " LIMIT ?"
+        args.append(limit)
+        return [dict(row) for row in self.conn.execute(sql, args)]
+
+    def close(self) -> None:
+        self.conn.close()
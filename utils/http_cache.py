@@ -0,0 +1,210 @@
+"""
+Дисковый HTTP-кэш для загрузки страниц (step_02_extract и всё, что фетчит лендинги).
+
+- ключ — sha256 URL; рядом лежат <key>.body (тело) и <key>.json (заголовки, ETag, Last-Modified);
+- повторный запрос идёт условным (If-None-Match / If-Modified-Since), 304 → отдаём снимок;
+- сжатые ответы (gzip/deflate/br) принимаются, тело читается потоково и обрезается по max_bytes;
+- при сетевой ошибке или 5xx отдаётся устаревший снимок (stale), если он есть;
+- offline-режим работает только из кэша.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+from utils.tracing import tracer
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+)
+
+try:  # brotli декодируется urllib3 только при установленном пакете
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+CHUNK_SIZE = 64 * 1024
+
+
+def pooled_session(pool_size: int) -> requests.Session:
+    """Session с пулом keep-alive соединений под pool_size параллельных загрузок."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def write_atomic(path: Path, payload: bytes) -> None:
+    # параллельные записи (потоки/процессы) не оставят полуфайлов
+    tmp = path.with_suffix(path.suffix + f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, path)
+
+
+class HttpCacheMiss(requests.RequestException):
+    """В offline-режиме URL отсутствует в кэше."""
+
+
+class CachedResponse:
+    def __init__(self, url: str, status_code: int, headers: dict, content: bytes,
+                 from_cache: bool = False, revalidated: bool = False, stale: bool = False,
+                 truncated: bool = False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.from_cache = from_cache
+        self.revalidated = revalidated
+        self.stale = stale
+        self.truncated = truncated
+
+    @property
+    def encoding(self) -> Optional[str]:
+        content_type = self.headers.get("Content-Type", "")
+        for part in content_type.split(";"):
+            part = part.strip()
+            if part.lower().startswith("charset="):
+                return part.split("=", 1)[1].strip("\"'") or None
+        return None
+
+    def cache_info(self) -> dict:
+        return {
+            "status": self.status_code,
+            "from_cache": self.from_cache,
+            "revalidated": self.revalidated,
+            "stale": self.stale,
+            "truncated": self.truncated,
+            "bytes": len(self.content),
+        }
+
+
+class HttpCache:
+    def __init__(self, cache_dir: Path = None, max_bytes: int = None, ttl_sec: float = None,
+                 offline: bool = None, timeout: float = 30, session: requests.Session = None):
+        self.cache_dir = Path(cache_dir or config.HTTP_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes if max_bytes is not None else config.HTTP_MAX_BODY_BYTES
+        self.ttl_sec = ttl_sec if ttl_sec is not None else config.HTTP_CACHE_TTL_SEC
+        self.offline = offline if offline is not None else config.HTTP_OFFLINE
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    # --- хранилище --------------------------------------------------------
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+        return self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.body"
+
+    def _load(self, url: str) -> Optional[dict]:
+        meta_path, body_path = self._paths(url)
+        if not meta_path.exists() or not body_path.exists():
+            return None
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except ValueError:
+            return None
+        meta["content"] = body_path.read_bytes()
+        return meta
+
+    def _store(self, url: str, meta: dict, content: bytes) -> None:
+        meta_path, body_path = self._paths(url)
+        write_atomic(body_path, content)
+        write_atomic(meta_path, json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    def _touch(self, url: str, entry: dict) -> None:
+        meta = {k: v for k, v in entry.items() if k != "content"}
+        meta["fetched_at"] = time.time()
+        meta_path, _ = self._paths(url)
+        write_atomic(meta_path, json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    def _from_entry(self, url: str, entry: dict, **flags) -> CachedResponse:
+        return CachedResponse(url, entry.get("status", 200), entry.get("headers", {}), entry["content"],
+                              from_cache=True, truncated=entry.get("truncated", False), **flags)
+
+    # --- загрузка ---------------------------------------------------------
+
+    def _read_body(self, response: requests.Response):
+        """Потоковое чтение с ограничением размера (после декомпрессии)."""
+        chunks, size, truncated = [], 0, False
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if not chunk:
+                continue
+            if size + len(chunk) > self.max_bytes:
+                chunks.append(chunk[: self.max_bytes - size])
+                truncated = True
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+        response.close()
+        return b"".join(chunks), truncated
+
+    def fetch(self, url: str, headers: dict = None) -> CachedResponse:
+        with tracer.span("http.fetch", kind="http", url=url) as sp:
+            response = self._fetch(url, headers or {})
+            sp.set(**{f"cache_{k}" if k in ("from_cache", "revalidated", "stale") else k: v
+                      for k, v in response.cache_info().items()})
+            return response
+
+    def _fetch(self, url: str, extra_headers: dict) -> CachedResponse:
+        entry = self._load(url)
+
+        if self.offline:
+            if entry:
+                return self._from_entry(url, entry)
+            raise HttpCacheMiss(f"Offline mode: {url} is not in HTTP cache ({self.cache_dir})")
+
+        if entry and self.ttl_sec and time.time() - entry.get("fetched_at", 0) < self.ttl_sec:
+            return self._from_entry(url, entry)
+
+        request_headers = {"User-Agent": DEFAULT_USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING, **extra_headers}
+        if entry:
+            if entry.get("etag"):
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = self.session.get(url, headers=request_headers, timeout=self.timeout, stream=True)
+        except requests.RequestException:
+            if entry:
+                return self._from_entry(url, entry, stale=True)
+            raise
+
+        if response.status_code == 304 and entry:
+            response.close()
+            self._touch(url, entry)
+            return self._from_entry(url, entry, revalidated=True)
+
+        if response.status_code >= 500 and entry:
+            response.close()
+            return self._from_entry(url, entry, stale=True)
+        response.raise_for_status()
+
+        content, truncated = self._read_body(response)
+        # тело хранится уже распакованным — заголовки транспорта к нему не относятся
+        response_headers = {k: v for k, v in response.headers.items()
+                            if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")}
+        meta = {
+            "url": url,
+            "final_url": response.url,
+            "status": response.status_code,
+            "headers": response_headers,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+            "truncated": truncated,
+            "sha256": hashlib.sha256(content).hexdigest(),
+        }
+        self._store(url, meta, content)
+        return CachedResponse(url, response.status_code, response_headers, content, truncated=truncated)
@@ -0,0 +1,34 @@
+"""
+Идентификаторы уровня прогона: E-0001 (доказательства/цитаты), SES-0001 (сессии интервью).
+Префикс S- занят сегментами (step_05_segments, artifacts/<run>/03_ljd/S-xxxx), поэтому у сессий свой.
+
+Раньше E-идентификаторы придумывала модель («E-001, E-002...» в каждом ответе), и при слиянии
+ответов id повторялись. Теперь модель ставит локальные метки, а глобальные id выдаёт один
+аллокатор на прогон (context["ids"]) — в том числе из параллельных потоков.
+"""
+
+import threading
+from collections import Counter
+
+ID_WIDTH = 4  # контракты требуют ^E-[A-Za-z0-9_-]{4,}$
+EVIDENCE_PREFIX = "E"
+SESSION_PREFIX = "SES"
+
+
+class IdAllocator:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Counter = Counter()
+
+    def next(self, prefix: str) -> str:
+        with self._lock:
+            self._counters[prefix] += 1
+            return f"{prefix}-{self._counters[prefix]:0{ID_WIDTH}d}"
+
+    def issued(self, prefix: str) -> int:
+        return self._counters[prefix]
+
+
+def run_ids(context: dict) -> IdAllocator:
+    """Аллокатор прогона; шаг, запущенный без main.py, получает свой."""
+    return context.setdefault("ids", IdAllocator())
@@ -4,6 +4,7 @@ import time
 import os
 import shutil
 from datetime import datetime
+from utils.tracing import tracer
 
 def promote_guide_artifacts(artifact: dict, promote_to_path: str, run_dir: Path):
     """
@@ -68,7 +69,10 @@ def save_artifact(run_dir: Path, step_name: str, result, execution_time: float)
         "data": getattr(result, 'data', {})
     }
     
-    artifact_path.write_text(json.dumps(artifact_data, ensure_ascii=False, indent=2), encoding="utf-8")
+    with tracer.span("artifact.write", kind="io", step=step_name, path=str(artifact_path)) as sp:
+        payload = json.dumps(artifact_data, ensure_ascii=False, indent=2)
+        artifact_path.write_text(payload, encoding="utf-8")
+        sp.set(bytes=len(payload.encode("utf-8")))
 
 
 def confirm_action(prompt: str) -> bool:
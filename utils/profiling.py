@@ -0,0 +1,233 @@
+"""
+Профилирование шагов workflow (режим `main.py --profile`).
+
+Для каждого шага пишет в <run_dir>/profile/:
+- <step>.pstats     — детерминированный профиль cProfile (смотреть через snakeviz/pstats);
+- <step>.collapsed  — collapsed-стеки сэмплера для flamegraph.pl / speedscope;
+- summary.json      — wall/CPU/ожидание по шагам и топ функций.
+
+On-CPU и ожидание (I/O, LLM) разделяются по CPU-времени процесса — с учётом потоков,
+которые шаг запускает в ThreadPoolExecutor: wall - cpu = время, когда шаг ждал сеть,
+диск или sleep. cProfile тоже охватывает эти потоки (до Python 3.12 — отдельный профиль
+на поток через threading.setprofile, затем профили суммируются).
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+# С 3.12 cProfile работает через sys.monitoring и сам видит все потоки
+PROFILES_ALL_THREADS = sys.version_info >= (3, 12)
+
+# Метка листа для сэмплов, снятых, пока поток не был на CPU
+WAIT_FRAME = "[wait]"
+
+# Классификация ожиданий по модулям в стеке (первое совпадение побеждает)
+WAIT_CATEGORIES = [
+    ("llm", ("openai", "httpx", "httpcore", "llm/client.py")),
+    ("http", ("requests", "urllib3", "http/client.py", "socket.py", "ssl.py")),
+    ("io", ("json/", "pathlib.py", "shutil.py")),
+]
+
+
+def _thread_cpu_clock(thread_id: int):
+    """
+    Возвращает функцию, читающую CPU-время конкретного потока (Linux/macOS),
+    либо None, если платформа этого не умеет.
+    """
+    try:
+        clock_id = time.pthread_getcpuclockid(thread_id)
+        time.clock_gettime(clock_id)
+    except (AttributeError, OSError):
+        return None
+    return lambda: time.clock_gettime(clock_id)
+
+
+def _thread_profile_hook(profiles: list):
+    """Хук threading.setprofile: в каждом новом потоке включает свой cProfile."""
+    def hook(frame, event, arg):
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        profiles.append(profile)
+        profile.enable()
+    return hook
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})"
+
+
+def _classify_wait(stack: list) -> str:
+    for category, markers in WAIT_CATEGORIES:
+        for filename in stack:
+            if any(marker in filename for marker in markers):
+                return category
+    return "other"
+
+
+class _Sampler(threading.Thread):
+    """Сэмплирующий профайлер одного потока: снимает стек раз в `interval` секунд."""
+
+    def __init__(self, target_thread_id: int, interval: float):
+        super().__init__(name="step-profiler-sampler", daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.wait_samples: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+        self._cpu_clock = _thread_cpu_clock(target_thread_id)
+
+    def run(self):
+        last_cpu = self._cpu_clock() if self._cpu_clock else None
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+
+            labels, filenames = [], []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                filenames.append(frame.f_code.co_filename.replace("\\", "/"))
+                frame = frame.f_back
+            labels.reverse()
+
+            # Поток считается ждущим, если за интервал потратил < половины интервала CPU
+            waiting = False
+            if self._cpu_clock:
+                cpu_now = self._cpu_clock()
+                waiting = (cpu_now - last_cpu) < self.interval * 0.5
+                last_cpu = cpu_now
+
+            if waiting:
+                labels.append(WAIT_FRAME)
+                self.wait_samples[_classify_wait(filenames)] += 1
+            self.stacks[";".join(labels)] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class StepProfiler:
+    """
+    Накопительный профайлер шагов. Один шаг может профилироваться несколько раз
+    (попытки рефлексии) — результаты суммируются до вызова dump().
+    """
+
+    def __init__(self, out_dir: Path, sample_interval: float = 0.005, top_n: int = 15):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+        self._steps: dict = {}
+
+    def _state(self, name: str) -> dict:
+        if name not in self._steps:
+            self._steps[name] = {
+                "profile": cProfile.Profile(),
+                "thread_profiles": [],
+                "wall_sec": 0.0,
+                "cpu_sec": 0.0,
+                "calls": 0,
+                "stacks": Counter(),
+                "wait_samples": Counter(),
+                "samples": 0,
+            }
+        return self._steps[name]
+
+    @contextmanager
+    def section(self, name: str):
+        """Профилирует блок кода и добавляет результат к шагу `name`."""
+        state = self._state(name)
+        sampler = _Sampler(threading.get_ident(), self.sample_interval)
+        sampler.start()
+
+        if not PROFILES_ALL_THREADS:
+            threading.setprofile(_thread_profile_hook(state["thread_profiles"]))
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        state["profile"].enable()
+        try:
+            yield
+        finally:
+            state["profile"].disable()
+            if not PROFILES_ALL_THREADS:
+                threading.setprofile(None)
+            state["cpu_sec"] += time.process_time() - cpu_start
+            state["wall_sec"] += time.perf_counter() - wall_start
+            state["calls"] += 1
+            sampler.stop()
+            state["stacks"].update(sampler.stacks)
+            state["wait_samples"].update(sampler.wait_samples)
+            state["samples"] += sampler.samples
+
+    def _stats(self, state: dict) -> pstats.Stats:
+        """Профиль шага вместе с профилями его потоков."""
+        stats = pstats.Stats(state["profile"], stream=io.StringIO())
+        for profile in state["thread_profiles"]:
+            stats.add(profile)
+        return stats
+
+    def _top_functions(self, stats: pstats.Stats) -> list:
+        rows = []
+        for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+            rows.append({
+                "function": f"{func} ({Path(filename).name}:{line})",
+                "calls": nc,
+                "tottime": round(tt, 4),
+                "cumtime": round(ct, 4),
+            })
+        rows.sort(key=lambda r: r["tottime"], reverse=True)
+        return rows[: self.top_n]
+
+    def dump(self) -> dict:
+        """Записывает .pstats, .collapsed и summary.json. Возвращает summary."""
+        summary = {}
+        for name, state in self._steps.items():
+            stats = self._stats(state)
+            stats.dump_stats(str(self.out_dir / f"{name}.pstats"))
+
+            collapsed = "\n".join(f"{stack} {count}" for stack, count in state["stacks"].most_common())
+            (self.out_dir / f"{name}.collapsed").write_text(collapsed + "\n", encoding="utf-8")
+
+            wall, cpu = state["wall_sec"], state["cpu_sec"]
+            wait_total = sum(state["wait_samples"].values())
+            wait_sec = max(0.0, wall - cpu)
+            summary[name] = {
+                "wall_sec": round(wall, 4),
+                "cpu_sec": round(cpu, 4),
+                "wait_sec": round(wait_sec, 4),
+                "cpu_ratio": round(cpu / wall, 3) if wall else 0.0,
+                "attempts": state["calls"],
+                "samples": state["samples"],
+                # распределяем wait-время пропорционально wait-сэмплам по категориям
+                "wait_breakdown_sec": {
+                    category: round(wait_sec * count / wait_total, 4)
+                    for category, count in state["wait_samples"].items()
+                } if wait_total else {},
+                "top_functions": self._top_functions(stats),
+            }
+
+        (self.out_dir / "summary.json").write_text(
+            json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        return summary
+
+
+def format_profile_summary(summary: dict) -> str:
+    """Короткая таблица для вывода в консоль в конце прогона."""
+    lines = [f"{'step':<36} {'wall,s':>8} {'cpu,s':>8} {'wait,s':>8}  wait breakdown"]
+    for name, s in summary.items():
+        breakdown = ", ".join(f"{k}={v:.2f}" for k, v in sorted(s["wait_breakdown_sec"].items()))
+        lines.append(f"{name:<36} {s['wall_sec']:>8.2f} {s['cpu_sec']:>8.2f} {s['wait_sec']:>8.2f}  {breakdown}")
+    return "\n".join(lines)
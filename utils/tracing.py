@@ -0,0 +1,189 @@
+"""
+Лёгкий трейсинг прогона: вложенные спаны run → step → attempt → llm/http/validation/io.
+
+Использование:
+    from utils.tracing import tracer
+
+    with tracer.span("llm.call", kind="llm", model="gpt-4o") as sp:
+        ...
+        sp.set(prompt_tokens=123)
+
+Экспорт:
+- JSONL (по строке на закрытый спан, пишется сразу — переживает падение прогона);
+- Chrome trace-event JSON (открывается в chrome://tracing или ui.perfetto.dev).
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "kind", "span_id", "parent_id", "start_ns", "end_ns",
+                 "thread_id", "attrs", "status", "_token")
+
+    def __init__(self, name: str, kind: str, parent_id: Optional[str], attrs: dict):
+        self.name = name
+        self.kind = kind
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.thread_id = threading.get_ident()
+        self.attrs = dict(attrs)
+        self.status = "ok"
+        self._token = None
+
+    def set(self, **attrs) -> "Span":
+        """Добавляет/обновляет атрибуты спана (токены, байты, cache hit и т.п.)."""
+        self.attrs.update(attrs)
+        return self
+
+    def add(self, key: str, value: float) -> "Span":
+        """Накопительно увеличивает числовой атрибут."""
+        self.attrs[key] = self.attrs.get(key, 0) + value
+        return self
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end - self.start_ns) / 1e6
+
+
+class Tracer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: list = []
+        self._jsonl_path: Optional[Path] = None
+        # Привязка perf_counter к wall-clock, чтобы отдавать абсолютные таймстемпы
+        self._epoch_wall = time.time()
+        self._epoch_ns = time.perf_counter_ns()
+
+    def configure(self, jsonl_path: Optional[Path] = None) -> None:
+        """Начинает новую трассу; закрытые спаны будут дописываться в jsonl_path."""
+        with self._lock:
+            self._spans = []
+            self._jsonl_path = Path(jsonl_path) if jsonl_path else None
+            if self._jsonl_path:
+                self._jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attrs):
+        parent = _current_span.get()
+        sp = Span(name, kind, parent.span_id if parent else None, attrs)
+        token = _current_span.set(sp)
+        try:
+            yield sp
+        except BaseException as e:
+            sp.status = "error"
+            sp.attrs.setdefault("error", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            sp.end_ns = time.perf_counter_ns()
+            _current_span.reset(token)
+            self._finish(sp)
+
+    def start_span(self, name: str, kind: str = "internal", **attrs) -> Span:
+        """
+        Открывает спан без with-блока (для оркестратора с break/continue).
+        Обязательно закрыть через end_span в обратном порядке.
+        """
+        parent = _current_span.get()
+        sp = Span(name, kind, parent.span_id if parent else None, attrs)
+        sp._token = _current_span.set(sp)
+        return sp
+
+    def end_span(self, sp: Span, status: Optional[str] = None) -> None:
+        if sp.end_ns is not None:
+            return
+        sp.end_ns = time.perf_counter_ns()
+        if status:
+            sp.status = status
+        if sp._token is not None:
+            _current_span.reset(sp._token)
+            sp._token = None
+        self._finish(sp)
+
+    def current(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def annotate(self, **attrs) -> None:
+        """Добавляет атрибуты к текущему спану (если он есть)."""
+        sp = _current_span.get()
+        if sp is not None:
+            sp.set(**attrs)
+
+    def wrap(self, fn):
+        """
+        Привязывает fn к текущему контексту трассы — для ThreadPoolExecutor.submit,
+        иначе спаны из рабочих потоков теряют родителя.
+        """
+        ctx = contextvars.copy_context()
+        return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+    def _to_record(self, sp: Span) -> dict:
+        return {
+            "name": sp.name,
+            "kind": sp.kind,
+            "span_id": sp.span_id,
+            "parent_id": sp.parent_id,
+            "start": self._epoch_wall + (sp.start_ns - self._epoch_ns) / 1e9,
+            "duration_ms": round(sp.duration_ms, 3),
+            "thread_id": sp.thread_id,
+            "status": sp.status,
+            "attrs": sp.attrs,
+        }
+
+    def _finish(self, sp: Span) -> None:
+        with self._lock:
+            self._spans.append(sp)
+            if self._jsonl_path:
+                with self._jsonl_path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(self._to_record(sp), ensure_ascii=False, default=str) + "\n")
+
+    def spans(self) -> list:
+        with self._lock:
+            return [self._to_record(sp) for sp in self._spans]
+
+    def totals(self, kind: Optional[str] = None, attr: Optional[str] = None) -> float:
+        """Сумма атрибута (или длительности в мс) по закрытым спанам заданного вида."""
+        with self._lock:
+            selected = [sp for sp in self._spans if kind is None or sp.kind == kind]
+            if attr is None:
+                return sum(sp.duration_ms for sp in selected)
+            return sum(sp.attrs.get(attr, 0) or 0 for sp in selected)
+
+    def export_chrome(self, path: Path) -> None:
+        """Chrome trace-event format: complete events (ph=X) с ts/dur в микросекундах."""
+        pid = os.getpid()
+        events = []
+        with self._lock:
+            spans = list(self._spans)
+        for sp in spans:
+            events.append({
+                "name": sp.name,
+                "cat": sp.kind,
+                "ph": "X",
+                "ts": (sp.start_ns - self._epoch_ns) / 1e3,
+                "dur": ((sp.end_ns or sp.start_ns) - sp.start_ns) / 1e3,
+                "pid": pid,
+                "tid": sp.thread_id,
+                "args": {**sp.attrs, "status": sp.status, "span_id": sp.span_id, "parent_id": sp.parent_id},
+            })
+        events.sort(key=lambda e: e["ts"])
+        Path(path).write_text(
+            json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, ensure_ascii=False, default=str),
+            encoding="utf-8",
+        )
+
+
+# Процессный трейсер: main.py настраивает его на run_dir, остальные модули просто пишут спаны
+tracer = Tracer()
@@ -0,0 +1,316 @@
+"""
+Детерминированный аудит лендинга по стандарту prompts/standards/landing_v1_6.md.
+
+Список критериев компилируется из самого стандарта — блока «Output Contract Hints»
+(lp_audit.<раздел>.<критерий>) плюс проверки из раздела Heuristics, которых там нет.
+Каждый критерий проверяется одним из способов:
+- rule        — правило над структурой step_02_extract (заголовки, CTA и их позиции,
+                формы, контент-блоки и их метки офферов); миллисекунды, без LLM;
+- llm         — нужна оценка текста (ясность VP, атрибуция отзывов, тон под сегмент):
+                все такие критерии уходят одним коротким запросом (judgment_prompt);
+- unavailable — требует рендера/замеров в браузере (LCP, CLS, события аналитики).
+"""
+
+import json
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+STANDARD_FILE = "landing_v1_6.md"
+
+# Проверки из разделов 1 и 6 стандарта, которых нет в Output Contract Hints
+EXTRA_CRITERIA = ["above_the_fold.trust_visible", "ux.heading_hierarchy"]
+
+DESCRIPTIONS = {
+    "above_the_fold.vp_clear": "Ясный Value Proposition за 5–7 слов, без жаргона",
+    "above_the_fold.one_primary_cta": "Один основной CTA на первом экране",
+    "above_the_fold.subhead_specific": "Subhead конкретизирует эффект/категорию",
+    "above_the_fold.trust_visible": "На первом экране видны элементы доверия или снижения риска",
+    "message_segment_fit.has_segment_specific_copy": "Для приоритетных сегментов есть своя формулировка выгоды",
+    "message_segment_fit.late_stage_path": "Быстрый путь для готовых купить (цены + CTA/форма)",
+    "proof_stack.has_cases": "Кейсы/отзывы/логотипы клиентов",
+    "proof_stack.has_metrics": "Цифровые метрики в доказательствах",
+    "proof_stack.attribution_complete": "Полные атрибуции отзывов (имя/роль/компания)",
+    "risk_reducers.has_guarantee": "Гарантия/рефанд/пилот",
+    "risk_reducers.has_faq": "FAQ, снимающий страхи",
+    "risk_reducers.cancellation_clear": "Понятные правила отмены/возврата",
+    "ux.form_short": "Формы короткие",
+    "ux.cta_repeated": "CTA повторяется контекстно (fold + mid + end)",
+    "ux.mobile_ok": "Мобильная версия не ломает аргументацию",
+    "ux.heading_hierarchy": "Иерархия заголовков: один H1, уровни без пропусков",
+    "perf_access.lcp_sec": "LCP < 2.5s",
+    "perf_access.cls": "CLS < 0.1",
+    "analytics_seo.events_set": "События по CTA/формам",
+    "analytics_seo.basics_ok": "Тайтл, метаописание и один H1",
+}
+
+# Критерии, где нужна оценка текста — одним запросом к LLM
+JUDGMENT = {
+    "above_the_fold.vp_clear",
+    "above_the_fold.subhead_specific",
+    "message_segment_fit.has_segment_specific_copy",
+    "proof_stack.attribution_complete",
+}
+
+# Не измеряются по HTML: нужен браузер или исполнение скриптов
+UNAVAILABLE = {
+    "ux.mobile_ok": "requires rendering at mobile viewport",
+    "perf_access.lcp_sec": "requires in-browser measurement",
+    "perf_access.cls": "requires in-browser measurement",
+    "analytics_seo.events_set": "scripts are not extracted",
+}
+
+TRUST_TAGS = {"social_proof", "guarantee", "free_trial", "security"}
+FORM_MAX_INPUTS = 5
+CASES_RE = re.compile(r"кейс|отзыв|истори[яи] клиент|нам доверяют|клиент[ыа]? о нас|case|testimonial|review|customers",
+                      re.IGNORECASE)
+FAQ_RE = re.compile(r"faq|вопрос|questions", re.IGNORECASE)
+CANCEL_RE = re.compile(r"отмен|возврат|верн[её]м|расторг|выгруз|cancel|refund", re.IGNORECASE)
+METRIC_RE = re.compile(r"\d+(?:[.,]\d+)?\s?%|\d+\s?(?:x|раз)\b|\d[\d\s]*\+|в \d+ раз", re.IGNORECASE)
+QUOTE_RE = re.compile(r"[«“\"]")
+CONTRACT_JSON_RE = re.compile(r"Output Contract Hints.*?```json\s*(\{.*?\})\s*```", re.DOTALL)
+
+
+class _Facts:
+    """Производные от извлечения, общие для правил: первый экран, позиции CTA, метки блоков."""
+
+    def __init__(self, extraction: dict):
+        self.extraction = extraction
+        self.text = extraction.get("full_text", "")
+        self.blocks = extraction.get("blocks") or []
+        self.headings = extraction.get("headings") or []
+        self.ctas = extraction.get("ctas") or []
+        self.forms = extraction.get("forms") or []
+        self.h1 = [h["text"] for h in self.headings if h["level"] == 1]
+
+        # первый экран ≈ текст до первого H2 (иначе первые 20% страницы)
+        h2 = next((h["text"] for h in self.headings if h["level"] == 2), None)
+        h2_at = self.text.find(h2) if h2 else -1
+        self.fold_end = h2_at if h2_at > 0 else len(self.text) // 5
+
+        # позиции CTA в full_text; одинаковые тексты ищутся последовательно
+        self.cta_positions: List[Tuple[int, dict]] = []
+        cursor: Dict[str, int] = {}
+        for cta in self.ctas:
+            at = self.text.find(cta["text"], cursor.get(cta["text"], 0)) if cta["text"] else -1
+            if at >= 0:
+                cursor[cta["text"]] = at + len(cta["text"])
+                self.cta_positions.append((at, cta))
+
+    def fold_blocks(self) -> List[dict]:
+        return [b for b in self.blocks if b["start"] < self.fold_end]
+
+    def tagged(self, tag: str) -> List[dict]:
+        return [b for b in self.blocks if tag in b.get("offer_tags", [])]
+
+
+Rule = Callable[[_Facts], Tuple[Optional[bool], str]]
+RULES: Dict[str, Rule] = {}
+
+
+def rule(criterion: str):
+    def register(fn: Rule) -> Rule:
+        RULES[criterion] = fn
+        return fn
+    return register
+
+
+@rule("above_the_fold.one_primary_cta")
+def _one_primary_cta(facts: _Facts):
+    fold = list(dict.fromkeys(c["text"] for at, c in facts.cta_positions if at < facts.fold_end))
+    if not fold:
+        return False, "no CTA above the fold"
+    return len(fold) == 1, f"CTA above the fold: {fold}"
+
+
+@rule("above_the_fold.trust_visible")
+def _trust_visible(facts: _Facts):
+    tags = sorted({t for b in facts.fold_blocks() for t in b.get("offer_tags", [])} & TRUST_TAGS)
+    return bool(tags), f"trust markers above the fold: {tags}" if tags else "no trust/risk markers above the fold"
+
+
+@rule("message_segment_fit.late_stage_path")
+def _late_stage_path(facts: _Facts):
+    pricing = facts.tagged("pricing")
+    ready = bool(pricing) and bool(facts.ctas or facts.forms)
+    return ready, (f"pricing block '{pricing[0]['heading'] or pricing[0]['id']}' with CTA/form" if ready
+                   else "no pricing block with a CTA or form")
+
+
+@rule("proof_stack.has_cases")
+def _has_cases(facts: _Facts):
+    headings = [h["text"] for h in facts.headings if CASES_RE.search(h["text"])]
+    quoted = [b for b in facts.tagged("social_proof") if QUOTE_RE.search(b["text"])]
+    found = headings or [b["heading"] or b["id"] for b in quoted]
+    return bool(found), f"proof: {found[:3]}" if found else "no cases/testimonials found"
+
+
+@rule("proof_stack.has_metrics")
+def _has_metrics(facts: _Facts):
+    proof = facts.tagged("social_proof") + [b for b in facts.blocks if QUOTE_RE.search(b["text"])]
+    metrics = [m.group(0).strip() for b in proof for m in METRIC_RE.finditer(b["text"])]
+    return bool(metrics), f"metrics in proof: {list(dict.fromkeys(metrics))[:5]}" if metrics else "proof without numbers"
+
+
+@rule("risk_reducers.has_guarantee")
+def _has_guarantee(facts: _Facts):
+    blocks = facts.tagged("guarantee") + facts.tagged("free_trial")
+    return bool(blocks), (f"guarantee/trial in '{blocks[0]['heading'] or blocks[0]['id']}'" if blocks
+                          else "no guarantee, refund or trial")
+
+
+@rule("risk_reducers.has_faq")
+def _has_faq(facts: _Facts):
+    faq = [h["text"] for h in facts.headings if FAQ_RE.search(h["text"])]
+    questions = [h["text"] for h in facts.headings if h["text"].rstrip().endswith("?")]
+    found = faq or (questions if len(questions) >= 2 else [])
+    return bool(found), f"FAQ: {found[:3]}" if found else "no FAQ section"
+
+
+@rule("risk_reducers.cancellation_clear")
+def _cancellation_clear(facts: _Facts):
+    match = next((m for b in facts.blocks for m in [CANCEL_RE.search(b["text"])] if m), None)
+    return bool(match), f"cancellation/refund terms mention '{match.group(0)}'" if match else "no cancellation/refund terms"
+
+
+@rule("ux.form_short")
+def _form_short(facts: _Facts):
+    if not facts.forms:
+        return None, "no forms"
+    longest = max(len(f["inputs"]) for f in facts.forms)
+    return longest <= FORM_MAX_INPUTS, f"longest form has {longest} inputs (max {FORM_MAX_INPUTS})"
+
+
+@rule("ux.cta_repeated")
+def _cta_repeated(facts: _Facts):
+    length = max(1, len(facts.text))
+    zones = set()
+    for at, _ in facts.cta_positions:
+        zones.add("fold" if at < facts.fold_end else "end" if at >= length * 2 / 3 else "mid")
+    return zones == {"fold", "mid", "end"}, f"CTA zones: {sorted(zones)}"
+
+
+@rule("ux.heading_hierarchy")
+def _heading_hierarchy(facts: _Facts):
+    levels = sorted({h["level"] for h in facts.headings})
+    skipped = [lvl for lvl in range(1, levels[-1] + 1) if lvl not in levels] if levels else []
+    ok = len(facts.h1) == 1 and not skipped
+    return ok, f"{len(facts.h1)} H1, levels {levels}" + (f", skipped {skipped}" if skipped else "")
+
+
+@rule("analytics_seo.basics_ok")
+def _basics_ok(facts: _Facts):
+    data = facts.extraction
+    missing = [name for name, ok in (("title", data.get("title")), ("meta_description", data.get("meta_description")),
+                                     ("single H1", len(facts.h1) == 1)) if not ok]
+    return not missing, f"missing: {missing}" if missing else "title, meta description and single H1 present"
+
+
+def _contract_criteria(standard_text: str) -> List[str]:
+    match = CONTRACT_JSON_RE.search(standard_text or "")
+    if not match:
+        return []
+    try:
+        hints = json.loads(match.group(1))
+    except ValueError:
+        return []
+    return [f"{section}.{name}" for section, fields in (hints.get("lp_audit") or {}).items()
+            if isinstance(fields, dict) for name in fields]
+
+
+@lru_cache(maxsize=8)
+def compile_standard(standard_text: str) -> Tuple[Tuple[str, str], ...]:
+    """(критерий, метод) по стандарту; без блока Output Contract Hints — все известные критерии."""
+    criteria = _contract_criteria(standard_text) or list(DESCRIPTIONS)
+    criteria += [c for c in EXTRA_CRITERIA if c not in criteria]
+    return tuple(
+        (c, "rule" if c in RULES else "llm" if c in JUDGMENT else "unavailable")
+        for c in criteria
+    )
+
+
+def run_rules(extraction: dict, standard_text: str) -> dict:
+    """Детерминированная часть аудита; критерии llm остаются pending (passed=None)."""
+    facts = _Facts(extraction)
+    checks = []
+    for criterion, method in compile_standard(standard_text):
+        check = {"id": criterion, "description": DESCRIPTIONS.get(criterion, criterion), "method": method,
+                 "passed": None, "evidence": ""}
+        if method == "rule":
+            check["passed"], check["evidence"] = RULES[criterion](facts)
+        elif method == "unavailable":
+            check["evidence"] = UNAVAILABLE.get(criterion, "no rule for this criterion")
+        checks.append(check)
+    return {"standard": STANDARD_FILE, "checks": checks}
+
+
+def judgment_prompt(report: dict, extraction: dict, segments: List[str]) -> Optional[str]:
+    """Короткий промпт только по критериям method=llm; None, если таких нет."""
+    pending = [c for c in report["checks"] if c["method"] == "llm"]
+    if not pending:
+        return None
+    facts = _Facts(extraction)
+    fold_text = "\n".join(b["text"] for b in facts.fold_blocks())[:800]
+    quoted = [b for b in facts.blocks if QUOTE_RE.search(b["text"])] or facts.tagged("social_proof")
+    proof = "\n".join(b["text"] for b in quoted[:3])[:800]
+    lines = [f"- {c['id']}: {c['description']}" for c in pending]
+    return (
+        "Judge ONLY these landing page criteria (true/false each, with a short quote as evidence):\n"
+        + "\n".join(lines)
+        + f"\n\nH1: {facts.h1[0] if facts.h1 else 'N/A'}\n"
+        + f"ABOVE THE FOLD:\n{fold_text}\n\n"
+        + f"TESTIMONIALS / PROOF:\n{proof or 'N/A'}\n\n"
+        + f"TARGET SEGMENTS: {', '.join(segments) or 'N/A'}\n"
+    )
+
+
+JUDGMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "judgments": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "passed": {"type": "boolean"},
+                    "evidence": {"type": "string"},
+                },
+                "required": ["id", "passed", "evidence"],
+            },
+        },
+    },
+    "required": ["judgments"],
+}
+
+
+def apply_judgments(report: dict, judgments: List[dict]) -> None:
+    by_id = {j.get("id"): j for j in judgments or [] if isinstance(j, dict)}
+    for check in report["checks"]:
+        judged = by_id.get(check["id"])
+        if check["method"] == "llm" and judged is not None:
+            check["passed"] = bool(judged.get("passed"))
+            check["evidence"] = str(judged.get("evidence", ""))
+
+
+def finalize(report: dict) -> dict:
+    """Баллы по разделам и общий, red flags и lp_audit в форме Output Contract Hints."""
+    sections: Dict[str, list] = {}
+    lp_audit: Dict[str, dict] = {}
+    for check in report["checks"]:
+        section, name = check["id"].split(".", 1)
+        lp_audit.setdefault(section, {})[name] = check["passed"]
+        if check["passed"] is not None:
+            sections.setdefault(section, []).append(check["passed"])
+    red_flags = [f"{c['description']} — {c['evidence']}" for c in report["checks"] if c["passed"] is False]
+    lp_audit["notes"] = "; ".join(red_flags)
+    evaluated = [passed for values in sections.values() for passed in values]
+    report.update({
+        "lp_audit": lp_audit,
+        "section_scores": {s: round(sum(v) / len(v), 3) for s, v in sections.items()},
+        "score": round(sum(evaluated) / len(evaluated), 3) if evaluated else 0.0,
+        # доля проверяемых критериев с вердиктом: unavailable (браузерные замеры) не учитываются
+        "coverage": round(len(evaluated) / max(1, sum(1 for c in report["checks"] if c["method"] != "unavailable")), 3),
+        "red_flags": red_flags,
+    })
+    return report
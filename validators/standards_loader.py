@@ -2,9 +2,14 @@
 from __future__ import annotations
 from pathlib import Path
 from typing import Dict, Optional, Tuple
+import hashlib
+import json
 import re
 import yaml
 
+import config
+from utils.http_cache import write_atomic
+
 REPO_ROOT = Path(__file__).resolve().parents[1]
 GLOBAL_STANDARDS_DIR = REPO_ROOT / "prompts" / "standards"
 GLOBAL_GUIDES_DIR = REPO_ROOT / "prompts" / "guides"
@@ -123,6 +128,46 @@ def parse_guide_markdown(md_text: str) -> Tuple[dict, dict]:
     return meta, sections
 
 
+# версия формата скомпилированного гайда: при смене промпта/нормализации в step_03 — увеличить
+COMPILED_GUIDE_VERSION = 1
+
+
+def guide_sha256(md_text: str) -> str:
+    return hashlib.sha256(md_text.encode("utf-8")).hexdigest()
+
+
+def compiled_guide_path(sha256: str) -> Path:
+    """Файл кэша в GUIDE_CACHE_DIR: ключ — sha256 текста гайда, projects/ не трогается."""
+    return Path(config.GUIDE_CACHE_DIR) / f"{sha256}.json"
+
+
+def load_compiled_guide(sha256: str) -> Optional[dict]:
+    """
+    Скомпилированный гайд (meta, нормализованные секции, core_questions) из кэша,
+    если он построен по этому же тексту гайда (sha256) и текущей версии формата; иначе None.
+    """
+    try:
+        compiled = json.loads(compiled_guide_path(sha256).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if (isinstance(compiled, dict) and compiled.get("sha256") == sha256
+            and compiled.get("version") == COMPILED_GUIDE_VERSION):
+        return compiled
+    return None
+
+
+def save_compiled_guide(sha256: str, compiled: dict) -> bool:
+    """Пишет скомпилированный гайд в кэш. False — не удалось записать."""
+    path = compiled_guide_path(sha256)
+    payload = {"sha256": sha256, "version": COMPILED_GUIDE_VERSION, **compiled}
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8"))
+    except OSError:
+        return False
+    return True
+
+
 def contracts_dir() -> Path:
     return CONTRACTS_DIR
 
@@ -189,7 +234,8 @@ def get_standard_for_step(step_name: str, project_dir: Optional[Path], md_standa
         "step_12_funnel_design": "funnel_design.md",
         "step_04_jtbd": "jtbd.md",
         "step_03_interview_collect": "interview_ajtbd.md",
-        "step_02a_guide_compile": "guide_standard.md"
+        "step_02a_guide_compile": "guide_standard.md",
+        "step_02d_landing_audit": "landing_v1_6.md",
     }
     
     standard_file = step_to_standard.get(step_name)
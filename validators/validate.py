@@ -1,6 +1,7 @@
 import json
 from pathlib import Path
 from jsonschema import validate, ValidationError
+from utils.tracing import tracer
 
 CONTRACTS_PATH = Path(__file__).resolve().parents[1] / "contracts"
 
@@ -28,12 +29,14 @@ def validate_artifact(step_name: str, data: dict, standards: dict) -> tuple[floa
     """
     Возвращает (schema_score, checklist_score, notes)
     """
-    schema_score, schema_notes = _validate_schema(step_name, data)
-    checklist_score, checklist_notes = _validate_checklist(step_name, data)
-    
-    # after schema validation result:
-    # HARD rule: require at least one evidence_ref for clean, verifiable data
-    evidence_score, evidence_notes = _evidence_rule(step_name, data)
+    with tracer.span("validation", kind="validation", step=step_name) as sp:
+        schema_score, schema_notes = _validate_schema(step_name, data)
+        checklist_score, checklist_notes = _validate_checklist(step_name, data)
+
+        # after schema validation result:
+        # HARD rule: require at least one evidence_ref for clean, verifiable data
+        evidence_score, evidence_notes = _evidence_rule(step_name, data)
+        sp.set(schema_score=schema_score, checklist_score=checklist_score, evidence_score=evidence_score)
     
     notes = f"Schema: {schema_notes} | Checklist: {checklist_notes} | Evidence: {evidence_notes}"
     return min(schema_score, 1.0), min(checklist_score, evidence_score), notes
@@ -0,0 +1,190 @@
+"""
+Адаптивная политика рефлексии: решает, что делать с результатом ниже QUALITY_THRESHOLD.
+
+Действия:
+- retry    — обычный повтор с заметками рефлексии;
+- repair   — повтор с точечными указаниями исправить структуру (провал схемы/evidence);
+- escalate — повтор на более сильной модели (ESCALATION_MODEL_NAME);
+- accept   — больше не тратить токены: сохранить результат как _FAILED и идти дальше.
+
+Решение учитывает историю прошлых прогонов (события *_ATTEMPT в artifacts/*/run_log.jsonl),
+размер разрыва до порога, вид провала валидации и бюджет прогона по токенам и времени.
+"""
+
+import json
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel
+
+import config
+
+# Априорные «успех/неудача» повтора (Beta(1, 1)) — пока истории нет, p = 0.5
+PRIOR_SUCCESS = 1.0
+PRIOR_FAILURE = 1.0
+
+# Повтор, давший ту же оценку (±SAME_SCORE_EPS), считаем бесполезным
+SAME_SCORE_EPS = 0.01
+
+# Виды провала, которые лечатся исправлением формата, а не переосмыслением
+REPAIRABLE_KINDS = {"schema", "evidence"}
+
+
+class ReflectionDecision(BaseModel):
+    action: str
+    reason: str
+    model: Optional[str] = None
+    success_prob: float = 0.0
+
+
+def classify_failure(schema_score: float, checklist_score: float, validation_notes: str, data: dict) -> str:
+    """Грубая классификация причины низкой оценки по результатам validate_artifact."""
+    if isinstance(data, dict) and (data.get("fallback_used") or "error" in data):
+        return "llm_error"
+    if schema_score < 1.0:
+        return "schema"
+    if "No evidence_refs" in validation_notes:
+        return "evidence"
+    if checklist_score < 1.0:
+        return "checklist"
+    return "self_score"
+
+
+def load_attempt_history(artifacts_root: Path, max_runs: int = 50) -> dict:
+    """
+    Собирает статистику повторов из прошлых прогонов:
+    {step: {failure_kind: {"n": повторов, "ok": успешных, "tokens": суммарно токенов}}}
+    Ключ "*" агрегирует все виды провала шага.
+    """
+    stats: dict = defaultdict(lambda: defaultdict(lambda: {"n": 0, "ok": 0, "tokens": 0}))
+    root = Path(artifacts_root)
+    if not root.exists():
+        return stats
+
+    logs = sorted(root.glob("*/run_log.jsonl"), key=lambda p: p.stat().st_mtime, reverse=True)[:max_runs]
+    for log_path in logs:
+        # вид провала предыдущей попытки шага — повтор «лечит» именно его
+        previous_kind: dict = {}
+        try:
+            lines = log_path.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            continue
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if not event.get("event", "").endswith("_ATTEMPT"):
+                continue
+            data = event.get("data", {})
+            step = data.get("step")
+            if not step:
+                continue
+            if data.get("attempt", 0) > 0 and step in previous_kind:
+                for kind in (previous_kind[step], "*"):
+                    bucket = stats[step][kind]
+                    bucket["n"] += 1
+                    bucket["ok"] += 1 if data.get("passed") else 0
+                    bucket["tokens"] += data.get("tokens", 0)
+            previous_kind[step] = data.get("failure_kind") or "self_score"
+    return stats
+
+
+class ReflectionPolicy:
+    def __init__(self, history: Optional[dict] = None,
+                 token_budget: int = config.REFLECTION_TOKEN_BUDGET,
+                 latency_budget_sec: float = config.REFLECTION_LATENCY_BUDGET_SEC,
+                 min_success_prob: float = config.REFLECTION_MIN_SUCCESS_PROB,
+                 escalation_model: str = config.ESCALATION_MODEL_NAME,
+                 quality_threshold: float = config.QUALITY_THRESHOLD):
+        self.history = history or {}
+        self.token_budget = token_budget
+        self.latency_budget_sec = latency_budget_sec
+        self.min_success_prob = min_success_prob
+        self.escalation_model = escalation_model
+        self.quality_threshold = quality_threshold
+        # оценки попыток шагов в текущем прогоне — для детекта «повтор дал то же самое»
+        self._scores: dict = defaultdict(list)
+        self._escalated: set = set()
+
+    @classmethod
+    def from_artifacts(cls, artifacts_root: Path = Path("artifacts"), **kwargs) -> "ReflectionPolicy":
+        max_runs = int(config.get_config_reflection("history_runs", 50))
+        return cls(history=load_attempt_history(artifacts_root, max_runs), **kwargs)
+
+    def max_attempts(self, step_name: str) -> int:
+        overrides = config.get_config_reflection("max_loops", {}) or {}
+        return int(overrides.get(step_name, config.MAX_REFLECTION_LOOPS)) + 1
+
+    def success_prob(self, step_name: str, failure_kind: str, score: float) -> float:
+        """
+        Сглаженная доля успешных повторов шага для данного вида провала,
+        скорректированная на разрыв до порога: чем дальше от порога, тем меньше шансов.
+        """
+        step_stats = self.history.get(step_name, {})
+        bucket = step_stats.get(failure_kind) or step_stats.get("*") or {"n": 0, "ok": 0}
+        p = (bucket["ok"] + PRIOR_SUCCESS) / (bucket["n"] + PRIOR_SUCCESS + PRIOR_FAILURE)
+        gap = max(0.0, self.quality_threshold - score)
+        return p * (1.0 - min(1.0, gap / max(self.quality_threshold, 1e-6)) * 0.5)
+
+    def expected_tokens(self, step_name: str, last_attempt_tokens: int) -> float:
+        bucket = self.history.get(step_name, {}).get("*")
+        if bucket and bucket["n"]:
+            return max(last_attempt_tokens, bucket["tokens"] / bucket["n"])
+        return last_attempt_tokens
+
+    def decide(self, step_name: str, attempt: int, score: float, failure_kind: str,
+               run_tokens: float, run_elapsed_sec: float,
+               attempt_tokens: int = 0, attempt_sec: float = 0.0) -> ReflectionDecision:
+        scores = self._scores[step_name]
+        scores.append(score)
+
+        if attempt + 1 >= self.max_attempts(step_name):
+            return ReflectionDecision(action="accept", reason="max attempts reached")
+
+        # Бюджет: следующая попытка должна в него поместиться
+        if run_tokens + self.expected_tokens(step_name, attempt_tokens) > self.token_budget:
+            return ReflectionDecision(action="accept", reason=f"token budget {self.token_budget} exhausted")
+        if run_elapsed_sec + attempt_sec > self.latency_budget_sec:
+            return ReflectionDecision(action="accept", reason=f"latency budget {self.latency_budget_sec:.0f}s exhausted")
+
+        # Транзиентные ошибки LLM лечатся обычным повтором
+        if failure_kind == "llm_error":
+            return ReflectionDecision(action="retry", reason="LLM fallback/error — transient", success_prob=1.0)
+
+        p = self.success_prob(step_name, failure_kind, score)
+        stalled = len(scores) >= 2 and abs(scores[-1] - scores[-2]) < SAME_SCORE_EPS
+        can_escalate = bool(self.escalation_model) and step_name not in self._escalated
+
+        if stalled:
+            if can_escalate:
+                self._escalated.add(step_name)
+                return ReflectionDecision(action="escalate", model=self.escalation_model, success_prob=p,
+                                          reason=f"previous retry gave the same score {score:.2f}")
+            return ReflectionDecision(action="accept", success_prob=p,
+                                      reason=f"previous retry gave the same score {score:.2f}")
+
+        if failure_kind in REPAIRABLE_KINDS:
+            return ReflectionDecision(action="repair", success_prob=p,
+                                      reason=f"{failure_kind} validation failure is usually fixable in place")
+
+        if p >= self.min_success_prob:
+            return ReflectionDecision(action="retry", success_prob=p,
+                                      reason=f"retry success probability {p:.2f} ≥ {self.min_success_prob:.2f}")
+        if can_escalate:
+            self._escalated.add(step_name)
+            return ReflectionDecision(action="escalate", model=self.escalation_model, success_prob=p,
+                                      reason=f"retry success probability {p:.2f} too low for the same model")
+        return ReflectionDecision(action="accept", success_prob=p,
+                                  reason=f"retry success probability {p:.2f} < {self.min_success_prob:.2f}")
+
+
+def repair_notes(validation_notes: str) -> str:
+    """Заметки для действия repair: исправить структуру, не переписывая содержание."""
+    return (
+        "Your previous output FAILED automatic validation:\n"
+        f"{validation_notes}\n"
+        "Keep the substance of your previous answer, but fix the structure so it strictly matches the JSON Schema "
+        "and includes every required field (including evidence_refs where the schema requires them)."
+    )
@@ -1,8 +1,12 @@
 import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-import time
 from .base import BaseStep, StepResult
+from collectors.crawler import CrawlSettings, SiteCrawler
+from collectors.keywords import cta_matcher
+from collectors.landing import extract_landing, parse_html
+from collectors.snapshots import LandingSnapshots, diff_landing
+from utils.http_cache import HttpCache
+from utils.tracing import tracer
 
 class Step(BaseStep):
     name = "step_02_extract"
@@ -23,29 +27,60 @@ class Step(BaseStep):
             )
         
         try:
-            # Получаем контент страницы
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
+            # Получаем контент страницы (через дисковый HTTP-кэш с условными запросами)
+            # input.offline=true — работать только со снимком из кэша
+            http_cache = HttpCache(offline=input_data.get("offline"))
             print(f"Fetching content from: {landing_url}")
-            response = requests.get(landing_url, headers=headers, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            response = http_cache.fetch(landing_url)
+            if response.from_cache:
+                state = "stale snapshot" if response.stale else "revalidated" if response.revalidated else "cached snapshot"
+                print(f"   Using {state} from HTTP cache")
             
-            # Извлекаем структурированные данные
-            extracted_data = self._extract_structured_content(soup, landing_url)
+            with tracer.span("html.extract", kind="parse", url=landing_url):
+                # парсер — config.HTML_PARSER (lxml с откатом на html.parser)
+                soup = parse_html(response.content)
+
+                # Извлекаем структурированные данные
+                ctas_matcher = cta_matcher(input_data.get("project") or input_data.get("company"))
+                extracted_data = self._extract_structured_content(soup, landing_url, ctas_matcher)
+            extracted_data["fetch"] = response.cache_info()
+
+            # Режим crawl: тарифы, продукт, FAQ и т.п. — страницы того же сайта
+            crawl_settings = CrawlSettings.from_input(input_data.get("crawl"))
+            if crawl_settings:
+                print(f"Crawling site from {landing_url} (max {crawl_settings.max_pages} pages, depth {crawl_settings.max_depth})")
+                crawler = SiteCrawler(crawl_settings, offline=input_data.get("offline"), ctas_matcher=ctas_matcher)
+                crawl = crawler.crawl(landing_url, start_soup=soup, start_extraction=extracted_data)
+                extracted_data["pages"] = crawl["pages"]
+                extracted_data["site"] = crawl["site"]
+                extracted_data["crawl"] = crawl["stats"]
+
+            # Версионированный снимок и дифф с прошлым прогоном — последующие шаги
+            # перерабатывают только изменённые блоки
+            self._snapshot(landing_url, extracted_data, crawled=bool(crawl_settings), context=context)
             
             # Оценка качества извлечения
             score = self._assess_extraction_quality(extracted_data)
             uncertainty = self._assess_uncertainty(extracted_data)
             
+            if response.stale:
+                # сайт недоступен, работаем по старому снимку — результат может быть неактуален
+                uncertainty = min(1.0, uncertainty + 0.2)
+
+            notes = f"Successfully extracted content from {landing_url}. Found {len(extracted_data.get('sections', []))} sections."
+            if crawl_settings:
+                notes += f" Crawled {extracted_data['crawl']['pages']} pages ({extracted_data['crawl']['errors']} errors)."
+            diff = extracted_data["diff"]
+            if diff:
+                blocks = diff["blocks"]
+                notes += (f" Since {diff['base_version']}: {len(blocks['added'])} added, {len(blocks['modified'])} modified, "
+                          f"{len(blocks['removed'])} removed blocks." if diff["changed"] else f" Unchanged since {diff['base_version']}.")
+
             return StepResult(
                 data=extracted_data,
                 score=score,
                 uncertainty=uncertainty,
-                notes=f"Successfully extracted content from {landing_url}. Found {len(extracted_data.get('sections', []))} sections."
+                notes=notes
             )
             
         except requests.RequestException as e:
@@ -63,88 +98,39 @@ class Step(BaseStep):
                 notes=f"Unexpected error during extraction: {str(e)}"
             )
 
-    def _extract_structured_content(self, soup: BeautifulSoup, base_url: str) -> dict:
-        """Извлекает структурированный контент со страницы."""
-        
-        # Удаляем скрипты и стили
-        for element in soup(["script", "style", "nav", "footer"]):
-            element.decompose()
-        
-        # Извлекаем основные элементы
-        title = soup.find('title')
-        meta_description = soup.find('meta', attrs={'name': 'description'})
-        
-        # Извлекаем заголовки
-        headings = []
-        for level in range(1, 7):
-            for heading in soup.find_all(f'h{level}'):
-                if heading.get_text(strip=True):
-                    headings.append({
-                        "level": level,
-                        "text": heading.get_text(strip=True),
-                        "tag": f"h{level}"
-                    })
-        
-        # Извлекаем CTA (кнопки и ссылки)
-        ctas = []
-        for element in soup.find_all(['a', 'button']):
-            text = element.get_text(strip=True)
-            href = element.get('href', '')
-            if text and (
-                any(keyword in text.lower() for keyword in ['купить', 'заказать', 'попробовать', 'получить', 'скачать', 'начать', 'подписаться', 'регистрация', 'buy', 'order', 'try', 'get', 'download', 'start', 'subscribe', 'sign up']) 
-                or element.get('type') == 'submit'
-            ):
-                ctas.append({
-                    "text": text,
-                    "href": urljoin(base_url, href) if href else "",
-                    "type": element.name
-                })
-        
-        # Извлекаем текстовые блоки
-        sections = []
-        for element in soup.find_all(['div', 'section', 'article']):
-            text = element.get_text(strip=True)
-            if text and len(text) > 50:  # Игнорируем короткие блоки
-                # Проверяем, не является ли это дублем
-                if not any(text in section['content'] for section in sections):
-                    sections.append({
-                        "content": text[:1000],  # Ограничиваем длину
-                        "word_count": len(text.split()),
-                        "tag": element.name
-                    })
-        
-        # Извлекаем списки (features, benefits)
-        lists = []
-        for ul in soup.find_all(['ul', 'ol']):
-            items = [li.get_text(strip=True) for li in ul.find_all('li')]
-            if items and len(items) > 1:
-                lists.append({
-                    "items": items[:10],  # Ограничиваем количество элементов
-                    "type": ul.name
-                })
-        
-        # Извлекаем формы
-        forms = []
-        for form in soup.find_all('form'):
-            inputs = [inp.get('name', inp.get('placeholder', '')) for inp in form.find_all('input')]
-            if inputs:
-                forms.append({
-                    "action": form.get('action', ''),
-                    "method": form.get('method', 'get'),
-                    "inputs": inputs
-                })
-        
-        return {
-            "url": base_url,
-            "title": title.get_text(strip=True) if title else "",
-            "meta_description": meta_description.get('content', '') if meta_description else "",
-            "headings": headings,
-            "ctas": ctas,
-            "sections": sections,
-            "lists": lists,
-            "forms": forms,
-            "extraction_timestamp": time.time()
-        }
+    def _snapshot(self, landing_url: str, extracted_data: dict, crawled: bool, context: dict = None) -> None:
+        """
+        Сравнивает извлечение с последним снимком этого URL, сделанным до прогона, и сохраняет новую версию.
+        Без изменений новая версия не создаётся — шаги переиспользуют результаты по прежней.
+        База запоминается в context на весь прогон: повтор шага (рефлексия) сравнивает с тем же
+        снимком, а не с версией, которую только что сохранила неудачная попытка.
+        """
+        key = f"{landing_url}#site" if crawled else landing_url  # сводный вид crawl — отдельная история
+        view = extracted_data.get("site") or extracted_data
+        snapshots = LandingSnapshots()
+        run_state = (context if context is not None else {}).setdefault("landing_snapshots", {})
+        if key not in run_state:
+            latest = snapshots.latest(key)
+            run_state[key] = {"base": latest["version"] if latest else None, "saved": None}
+        state = run_state[key]
+        previous = snapshots.load(key, state["base"]) if state["base"] else None
+        diff = diff_landing(previous, view) if previous else None
+        if diff and not diff["changed"]:
+            version = previous["version"]
+        else:
+            # версия этого прогона уже есть и совпадает — второй раз не сохраняем
+            saved = snapshots.load(key, state["saved"]) if state["saved"] else None
+            if saved and not diff_landing(saved, view)["changed"]:
+                version = saved["version"]
+            else:
+                version = state["saved"] = snapshots.save(key, view)
+        extracted_data["snapshot"] = {"key": key, "version": version,
+                                      "previous_version": previous["version"] if previous else None}
+        extracted_data["diff"] = diff
+
+    def _extract_structured_content(self, soup: BeautifulSoup, base_url: str, ctas_matcher=None) -> dict:
+        """Извлекает структурированный контент со страницы (один проход по DOM, см. collectors.landing)."""
+        return extract_landing(soup, base_url, ctas_matcher)
     
     def _assess_extraction_quality(self, data: dict) -> float:
         """Оценивает качество извлеченных данных."""
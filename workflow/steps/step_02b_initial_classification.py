@@ -1,7 +1,58 @@
+from pathlib import Path
+
+import config
 from .base import BaseStep, StepResult
+from collectors.offer_classifier import OfferClassifier
+
 
 class Step(BaseStep):
     name = "step_02b_initial_classification"
 
     def run(self, context: dict, artifacts: dict) -> StepResult:
-        return StepResult(data={"status": f"placeholder for {self.name}"})
+        """
+        Локальная разметка контент-блоков step_02_extract типами офферов (collectors.offer_classifier):
+        правила по словарю и шаблонам + модель, обученная на принятых ответах LLM прошлых прогонов.
+        Решённые блоки (уверенность не ниже OFFER_CLASSIFIER_THRESHOLD) step_03_offers_inventory
+        берёт как есть, в LLM уходят только неуверенные.
+
+        input:
+          "local_classifier": false   — не размечать локально (все блоки уходят в LLM)
+        """
+        input_data = context.get("input", {})
+        extracted = artifacts.get("step_02_extract", {})
+        blocks = (extracted.get("site") or extracted).get("blocks")
+        if not input_data.get("local_classifier", config.OFFER_CLASSIFIER_ENABLED) or not blocks:
+            reason = "disabled" if blocks else "no content blocks in step_02_extract"
+            return StepResult(
+                data={"status": "skipped", "blocks": [], "decided": [], "uncertain": []},
+                notes=f"Local offer classification skipped: {reason}"
+            )
+
+        classifier = OfferClassifier.load(Path(config.OFFER_CLASSIFIER_HISTORY_DIR), input_data.get("project") or input_data.get("company"))
+        labelled = [classifier.classify_block(block) for block in blocks]
+        decided = [b["id"] for b in labelled if b["decided"]]
+        uncertain = [b["id"] for b in labelled if not b["decided"]]
+
+        method = "model" if classifier.trusted else "rules (no trusted model yet)"
+        notes = (f"{len(decided)}/{len(labelled)} blocks classified locally by {method}, "
+                 f"{len(uncertain)} left for LLM. Model: {classifier.stats.get('samples', 0)} samples")
+        if "holdout_precision" in classifier.stats:
+            notes += f", holdout precision {classifier.stats['holdout_precision']:.2f}"
+
+        return StepResult(
+            data={
+                "status": "ok",
+                "method": "model" if classifier.trusted else "rules",
+                "threshold": classifier.threshold,
+                "model": classifier.stats,
+                "blocks": labelled,
+                "decided": decided,
+                "uncertain": uncertain,
+                "llm_blocks": len(uncertain),
+                "offers": [{**offer, "sources": [b["id"]]} for b in labelled if b["decided"]
+                           for offer in classifier.offers(b)],
+            },
+            # неуверенные блоки не ошибка шага: их разметит LLM на step_03 (число — в llm_blocks)
+            uncertainty=0.0,
+            notes=notes + "."
+        )
@@ -0,0 +1,67 @@
+from .base import BaseStep, StepResult
+from collectors.competitors import (diff_profiles, extract_competitors, find_competitors_file,
+                                    landing_profile, parse_competitors)
+
+
+class Step(BaseStep):
+    name = "step_02c_competitors"
+
+    def run(self, context: dict, artifacts: dict) -> StepResult:
+        """
+        Извлекает лендинги конкурентов из sources/competitors.txt проекта (параллельно, через HTTP-кэш)
+        и сохраняет по каждому компактный профиль и дифф с нашим лендингом из step_02_extract.
+
+        input:
+          "competitors_file": "projects/<proj>/AJTBD_A/sources/competitors.txt"  (иначе ищется рядом с input.files)
+          "competitor_urls": {"Zapier": "https://zapier.com", ...}              (дополняет/переопределяет URL из файла)
+        """
+        input_data = context.get("input", {})
+        competitors = []
+        source = find_competitors_file(input_data)
+        if source and source.exists():
+            competitors = parse_competitors(source.read_text(encoding="utf-8"))
+
+        by_name = {c["name"].lower(): c for c in competitors}
+        for name, url in (input_data.get("competitor_urls") or {}).items():
+            if name.lower() in by_name:
+                by_name[name.lower()]["url"] = url
+            else:
+                competitors.append({"name": name, "category": "", "url": url, "notes": {}})
+
+        if not competitors:
+            return StepResult(
+                data={"status": "skipped", "source": str(source) if source else None, "competitors": []},
+                notes="No competitors file or competitor_urls in input — nothing to extract"
+            )
+
+        print(f"Extracting {sum(1 for c in competitors if c['url'])} competitor landings "
+              f"({len(competitors)} competitors in {source or 'input'})")
+        results = extract_competitors(competitors, offline=input_data.get("offline"),
+                                      project=input_data.get("project") or input_data.get("company"))
+
+        # Наш профиль — для диффа; при crawl берём сводный вид по сайту
+        extracted = artifacts.get("step_02_extract", {})
+        ours = landing_profile(extracted.get("site") or extracted) if extracted and "error" not in extracted else None
+        for entry in results:
+            if ours and entry["status"] == "ok":
+                entry["diff"] = diff_profiles(ours, entry["profile"])
+
+        ok = sum(1 for r in results if r["status"] == "ok")
+        with_url = sum(1 for r in results if r["url"])
+        errors = [r["name"] for r in results if r["status"] == "error"]
+        notes = f"Extracted {ok}/{with_url} competitor landings; {len(results) - with_url} without URL (desk notes only)."
+        if errors:
+            notes += f" Failed: {', '.join(errors)}."
+
+        return StepResult(
+            data={
+                "status": "ok",
+                "source": str(source) if source else None,
+                "our_profile": ours,
+                "competitors": results,
+            },
+            score=1.0 if not with_url else 0.5 + 0.5 * ok / with_url,
+            # без URL конкурентов сравнение держится только на заметках из файла
+            uncertainty=0.0 if with_url and ok == with_url else 0.2,
+            notes=notes
+        )
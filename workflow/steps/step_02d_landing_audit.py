@@ -0,0 +1,63 @@
+import config
+from .base import BaseStep, StepResult
+from llm.client import LLM
+from validators.landing_audit import (JUDGMENT_SCHEMA, apply_judgments, finalize, judgment_prompt,
+                                      run_rules)
+from validators.standards_loader import get_standard_for_step
+
+
+class Step(BaseStep):
+    name = "step_02d_landing_audit"
+
+    def __init__(self):
+        super().__init__()
+        self.llm = LLM()
+
+    def run(self, context: dict, artifacts: dict) -> StepResult:
+        """
+        Аудит лендинга по landing_v1_6.md: критерии стандарта проверяются правилами над
+        step_02_extract (validators.landing_audit), LLM — только для критериев, требующих оценки текста.
+        input.audit_llm=false — только детерминированная часть.
+        """
+        extracted = artifacts.get("step_02_extract", {})
+        if not extracted or "error" in extracted:
+            return StepResult(
+                data={"error": "No extracted content available"},
+                score=0.0,
+                uncertainty=1.0,
+                notes="Cannot audit the landing without extracted content"
+            )
+
+        standard = get_standard_for_step(self.name, None, context.get("md_standards", {}))
+        report = run_rules(extracted, standard)
+
+        input_data = context.get("input", {})
+        use_llm = input_data.get("audit_llm", config.LANDING_AUDIT_LLM)
+        notes = ""
+        # step_05_segments идёт позже — сегменты для тона берутся из входных персон
+        prompt = judgment_prompt(report, extracted, list(input_data.get("personas", [])))
+        if prompt and use_llm:
+            llm_result = self.llm.generate_json(
+                system_prompt="You are a landing page auditor. Answer strictly by the criteria and quote the page as evidence.",
+                user_prompt=prompt,
+                org_context="",
+                standard_schema=JUDGMENT_SCHEMA,
+                reflection_notes=context.get("reflection_notes", "")
+            )
+            apply_judgments(report, llm_result["data"].get("judgments", []))
+            judged = [c for c in report["checks"] if c["method"] == "llm"]
+            notes = f" LLM judged {sum(1 for c in judged if c['passed'] is not None)}/{len(judged)} criteria."
+
+        report = finalize(report)
+        rules = sum(1 for c in report["checks"] if c["method"] == "rule")
+        # Качество шага — не качество лендинга: доля критериев, которые шаг должен был проверить
+        # (правила + LLM, если он включён) и проверил. Балл аудита остаётся в data["score"].
+        expected = [c for c in report["checks"] if c["method"] == "rule" or (c["method"] == "llm" and use_llm)]
+        quality = round(sum(1 for c in expected if c["passed"] is not None) / max(1, len(expected)), 3)
+        return StepResult(
+            data=report,
+            score=quality,
+            uncertainty=round(1.0 - quality, 3),
+            notes=f"Landing audit: score {report['score']}, {len(report['red_flags'])} red flags, "
+                  f"{rules} rule checks.{notes}"
+        )
@@ -2,13 +2,24 @@
 from __future__ import annotations
 from pathlib import Path
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any, Optional
 
+import config
 from .base import BaseStep, StepResult
+from collectors.quote_extractor import LEXICONS, extract_candidates
+from collectors.voc import ingest_files, read_records
+from collectors.voc_sampler import excerpt, sample_records
+from utils.corpus_store import CorpusStore
+from utils.ids import EVIDENCE_PREFIX, SESSION_PREFIX, IdAllocator, run_ids
 from utils.io import ensure_run_dir, save_md
+from utils.tracing import tracer
 from validators.standards_loader import (
     load_guide_markdown,
     parse_guide_markdown,
+    guide_sha256,
+    load_compiled_guide,
+    save_compiled_guide,
     contracts_dir,
 )
 from validators.validate import validate_artifact
@@ -22,32 +33,102 @@ def _write_jsonl(path: Path, rows: List[dict]) -> None:
             f.write(json.dumps(r, ensure_ascii=False) + "\n")
 
 
-def _read_text_file(path: Path) -> str:
-    try:
-        return path.read_text(encoding="utf-8")
-    except Exception:
-        return ""
+def _append_jsonl(path: Path, rows: List[dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        for r in rows:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
 
+def _label(value) -> Optional[str]:
+    """Персона/продукт из input: строка или объект {"id", "persona"|"name"}."""
+    if isinstance(value, dict):
+        return value.get("persona") or value.get("name") or value.get("id")
+    return str(value) if value is not None else None
 
-def _ingest_sources(files: List[str]) -> List[dict]:
+
+def _plan_shards(n: int, personas: list, products: list, shard_size: int) -> List[dict]:
     """
-    Простейший ingest: читаем тексты из файлов и кладём как сырой VOC-ряд.
-    Можно расширить парсинг CSV/JSON при необходимости.
+    n сессий раскладываются по кругу по ячейкам (персона × продукт), ячейка режется
+    на шарды по shard_size сессий. Без персон/продуктов ячейка одна — просто батчи.
     """
-    rows = []
-    for fp in files:
-        p = Path(fp)
-        if not p.exists():
+    cells = [(p, pr) for p in (personas or [None]) for pr in (products or [None])]
+    counts = [n // len(cells) + (1 if i < n % len(cells) else 0) for i in range(len(cells))]
+    shards = []
+    for (persona, product), count in zip(cells, counts):
+        for start in range(0, count, shard_size):
+            shards.append({"persona": persona, "product": product, "n": min(shard_size, count - start)})
+    return shards
+
+
+# цитаты модель не копирует: их извлекает collectors.quote_extractor из ответов, модель только ставит теги ходам
+SESSION_FORMAT = """
+Do NOT copy quotes into the answer and do NOT invent evidence identifiers: key quotes are extracted
+from the answers and get global ids in the pipeline. Tag each answer turn instead.
+
+Each session has:
+- persona (string)
+- product (string|null)
+- transcript (array of turns: {"q": question, "a": answer, "tags": evidence tags of this answer,
+  e.g. pain_point, motivation, barrier, trigger})
+- evidence_tags (array of strings)
+- summary (string)
+"""
+SESSION_QUOTES = 5
+QUOTE_TAGS = sorted(LEXICONS) + ["trigger", "desired_outcome", "workaround"]
+
+
+def _session_quotes(session: dict) -> List[dict]:
+    """Цитаты-кандидаты из ответов транскрипта: теги хода от модели + теги словарей."""
+    candidates = []
+    turns = session.get("transcript") if isinstance(session.get("transcript"), list) else []
+    for index, turn in enumerate(turns, 1):
+        if not isinstance(turn, dict):
             continue
-        content = _read_text_file(p)
-        if not content.strip():
+        turn_tags = [str(t) for t in turn.get("tags") or []]
+        for candidate in extract_candidates(turn.get("a") or turn.get("answer") or ""):
+            candidates.append({"local_id": f"t{index}", "text": candidate["text"],
+                               "context": turn.get("q") or turn.get("question") or "",
+                               "tags": list(dict.fromkeys(turn_tags + candidate["tags"])),
+                               "score": candidate["score"] + len(turn_tags)})
+    best = sorted(range(len(candidates)), key=lambda i: (-candidates[i]["score"], i))[:SESSION_QUOTES]
+    return [candidates[i] for i in sorted(best)]
+
+
+def _record_quotes(records, ids: IdAllocator) -> List[dict]:
+    """Цитаты-кандидаты VOC-записей ingest с E-id; source — «файл:id» записи."""
+    quotes = []
+    for record in records:
+        for candidate in extract_candidates(record.get("text", "")):
+            quotes.append({"id": ids.next(EVIDENCE_PREFIX), "source": f"{record.get('source')}:{record.get('id')}",
+                           "context": record.get("kind"), "frequency": record.get("frequency", 1),
+                           "labelled_by": "lexicon", **candidate})
+    return quotes
+
+
+def _assign_ids(sessions: List[dict], ids: IdAllocator, defaults: dict = None) -> List[dict]:
+    """
+    Глобальные id вместо придуманных моделью: SES-xxxx на сессию, E-xxxx на цитату
+    (метка модели сохраняется в local_id). Если модель цитат не вернула — они извлекаются
+    из ответов транскрипта локально.
+    """
+    result = []
+    for session in sessions:
+        if not isinstance(session, dict):
             continue
-        rows.append({
-            "source": str(p),
-            "kind": "text",
-            "content": content[:10000]  # safety cap
-        })
-    return rows
+        for key, value in (defaults or {}).items():
+            if value is not None and not session.get(key):
+                session[key] = value
+        session["session_id"] = ids.next(SESSION_PREFIX)
+        quotes = session.get("quotes") if isinstance(session.get("quotes"), list) else []
+        if not quotes:
+            session["quotes"] = [{"id": ids.next(EVIDENCE_PREFIX), **quote} for quote in _session_quotes(session)]
+        for quote in quotes:
+            if isinstance(quote, dict):
+                quote["local_id"] = quote.get("id")
+                quote["id"] = ids.next(EVIDENCE_PREFIX)
+        result.append(session)
+    return result
 
 
 class Step(BaseStep):
@@ -117,74 +198,144 @@ CORE QUESTIONS SECTION:
             "schema_notes": schema_notes
         }
 
-    def _simulate_interviews(self, guide_obj: dict, n: int, personas: List[str], products: List[str], context: dict) -> List[dict]:
-        system = "You are an expert qualitative researcher simulating AJTBD interviews. Extract key quotes and assign E-identifiers for evidence tracking."
+    def _simulate_shard(self, guide_json: str, shard: dict, products: list, context: dict) -> List[dict]:
+        """Один шард: shard["n"] сессий для одной ячейки (персона, продукт)."""
+        system = "You are an expert qualitative researcher simulating AJTBD interviews. Tag answers for evidence tracking."
+        persona, product = _label(shard["persona"]), _label(shard["product"])
+        product_line = (f"Product: {product}" if product
+                        else f"Vary products (if relevant): {[_label(p) for p in products]}" if products
+                        else "Product: not specified (null)")
         prompt = f"""
-Using this guide (meta + sections), simulate {n} interview sessions.
-Vary personas: {personas}
-Vary products (if relevant): {products}
-
-IMPORTANT: For each session, extract 3-5 key quotes and assign unique E-identifiers (E-001, E-002, etc.)
-
-Return a JSON object with "sessions": an array, each session has:
-- persona (string)
-- product (string|null)
-- transcript (array of Q/A turns)
-- evidence_tags (array of strings)
-- summary (string)
-- quotes (array of objects with: id, text, context, tags)
-
-QUOTE STRUCTURE:
-- id: "E-001", "E-002", etc. (unique across all sessions)
-- text: the actual quote from the transcript
-- context: brief description of when/why this quote was said
-- tags: relevant evidence tags (pain_point, motivation, barrier, etc.)
+Using this guide (meta + sections), simulate {shard["n"]} interview session(s).
+Persona: {persona or "vary realistic personas for this product"}
+{product_line}
 
+Return a JSON object with "sessions": an array of sessions.
+{SESSION_FORMAT}
 GUIDE (JSON):
-{json.dumps(guide_obj, ensure_ascii=False)}
+{guide_json}
 """
         schema = (context.get("schemas") or {}).get("step_03_interview_collect", {})
         std_text = (context.get("md_standards") or {}).get("interview_ajtbd.md", "")
-        llm_json = self.llm.generate_json(
-            system_prompt=system,
-            user_prompt=prompt,
-            org_context="",
-            standard_schema=schema,
-            standard_text=std_text,
-            reflection_notes=context.get("reflection_notes","")
-        )
+        with tracer.span("interview.shard", kind="map", persona=persona, product=product, sessions=shard["n"]):
+            llm_json = self.llm.generate_json(
+                system_prompt=system,
+                user_prompt=prompt,
+                org_context="",
+                standard_schema=schema,
+                standard_text=std_text,
+                reflection_notes=context.get("reflection_notes","")
+            )
         sessions = llm_json.get("data", {}).get("sessions", [])
         # safety
-        sessions = sessions if isinstance(sessions, list) else []
-        return sessions
+        return sessions if isinstance(sessions, list) else []
+
+    def _simulate_interviews(self, guide_obj: dict, n: int, personas: list, products: list, context: dict,
+                             out: Path, store: CorpusStore) -> dict:
+        """
+        Симуляция шардами по (персона, продукт) параллельно; готовый шард сразу дописывается в out
+        и в корпус с глобальными id сессий и цитат. Возвращает статистику шардов.
+        """
+        ids = run_ids(context)
+        shards = _plan_shards(n, personas, products, max(1, config.INTERVIEW_SHARD_SESSIONS))
+        guide_json = json.dumps(guide_obj, ensure_ascii=False)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text("", encoding="utf-8")
+
+        sessions_written, failed = 0, []
+        with ThreadPoolExecutor(max_workers=config.INTERVIEW_SIM_CONCURRENCY, thread_name_prefix="interview") as pool:
+            futures = {pool.submit(tracer.wrap(self._simulate_shard), guide_json, shard, products, context): i
+                       for i, shard in enumerate(shards)}
+            for future in as_completed(futures):
+                index, shard = futures[future], shards[futures[future]]
+                sessions = future.result()
+                if not sessions:
+                    failed.append(index)
+                    continue
+                sessions = _assign_ids(sessions, ids, {"persona": _label(shard["persona"]),
+                                                       "product": _label(shard["product"])})
+                _append_jsonl(out, [{"session": s, "shard": index} for s in sessions])
+                store.add_sessions(sessions, "simulated")
+                sessions_written += len(sessions)
+        return {"shards": len(shards), "failed_shards": sorted(failed), "sessions": sessions_written}
+
+    def _label_batch(self, batch: List[dict], context: dict) -> Optional[Dict[str, list]]:
+        """Теги для пачки кандидатов: модель возвращает только id и теги. None — ответа нет."""
+        system = "You label customer-feedback quotes with evidence tags. Reply with ids and tags only, never repeat quote text."
+        candidates = "\n".join(f"{q['id']}: {q['text']}" for q in batch)
+        prompt = f"""
+Label each candidate quote below with evidence tags from: {", ".join(QUOTE_TAGS)}.
+Omit candidates that are not meaningful evidence (noise, boilerplate, off-topic).
+
+Return JSON {{"labels": [{{"id": "<candidate id>", "tags": ["..."]}}]}}.
+
+CANDIDATES:
+{candidates}
+"""
+        with tracer.span("interview.quote_labels", kind="map", candidates=len(batch)):
+            llm_json = self.llm.generate_json(
+                system_prompt=system,
+                user_prompt=prompt,
+                org_context="",
+                standard_schema={},
+                standard_text="",
+                reflection_notes=""
+            )
+        labels = llm_json.get("data", {}).get("labels")
+        if not isinstance(labels, list) or not labels:
+            return None
+        return {str(item.get("id")): [str(t) for t in item.get("tags") or [] if t in QUOTE_TAGS]
+                for item in labels if isinstance(item, dict)}
+
+    def _label_quotes(self, quotes: List[dict], context: dict) -> dict:
+        """
+        LLM-разметка лучших кандидатов (QUOTE_LABEL_MAX по оценке словарей и частоте) пачками по
+        QUOTE_LABEL_BATCH параллельно. Пропущенные моделью кандидаты отбрасываются; если ответа нет —
+        остаются теги словарей.
+        """
+        top = sorted(quotes, key=lambda q: (-q["score"], -q["frequency"]))[:config.QUOTE_LABEL_MAX]
+        batches = [top[i:i + config.QUOTE_LABEL_BATCH] for i in range(0, len(top), config.QUOTE_LABEL_BATCH)]
+        dropped = set()
+        with ThreadPoolExecutor(max_workers=config.INTERVIEW_SIM_CONCURRENCY, thread_name_prefix="quotes") as pool:
+            futures = {pool.submit(tracer.wrap(self._label_batch), batch, context): batch for batch in batches}
+            for future in as_completed(futures):
+                labels = future.result()
+                if labels is None:
+                    continue
+                for quote in futures[future]:
+                    if quote["id"] not in labels:
+                        dropped.add(quote["id"])
+                    elif labels[quote["id"]]:
+                        quote["tags"], quote["labelled_by"] = labels[quote["id"]], "llm"
+        quotes[:] = [q for q in quotes if q["id"] not in dropped]
+        return {"labelled": sum(q["labelled_by"] == "llm" for q in quotes), "dropped": len(dropped),
+                "batches": len(batches)}
+
+    def _ingest_quotes(self, out_ingest: Path, store: CorpusStore, context: dict, input_cfg: dict) -> dict:
+        """Цитаты VOC-записей: локальные кандидаты с E-id → (опционально) LLM-теги → файл и корпус."""
+        quotes = _record_quotes(read_records(out_ingest), run_ids(context))
+        stats = {"candidates": len(quotes)}
+        if quotes and input_cfg.get("quote_llm_labels", config.QUOTE_LLM_LABELS):
+            stats.update(self._label_quotes(quotes, context))
+        out = out_ingest.with_name("ingest_quotes.jsonl")
+        _write_jsonl(out, quotes)
+        store.add_record_quotes(quotes)
+        return {**stats, "quotes": len(quotes), "file": str(out)}
 
     def _gap_analysis_and_followups(self, guide_obj: dict, corpus_rows: List[dict], n: int, context: dict) -> List[dict]:
         """
         Попросим LLM оценить пробелы покрытия и сгенерировать догон-интервью.
+        corpus_rows — выборка collectors.voc_sampler по всему корпусу (в бюджете VOC_SAMPLE_TOKENS).
         """
-        system = "You analyze existing VOC and design targeted follow-up interviews to close coverage gaps. Extract key quotes and assign E-identifiers for evidence tracking."
-        corpus_preview = "\n---\n".join(r.get("content", "")[:1000] for r in corpus_rows[:8])
+        system = "You analyze existing VOC and design targeted follow-up interviews to close coverage gaps. Tag answers for evidence tracking."
+        corpus_preview = "\n---\n".join(excerpt(r) for r in corpus_rows)
         prompt = f"""
 Given the existing VOC corpus excerpts below, and the interview guide JSON,
 perform a brief gap analysis: identify 3-5 major unanswered aspects relative to the guide.
 Then simulate {n} focused interviews to close those gaps.
 
-IMPORTANT: For each session, extract 3-5 key quotes and assign unique E-identifiers (E-001, E-002, etc.)
-
-Return JSON with key "sessions" (same structure as earlier), each session must include:
-- persona (string)
-- product (string|null)
-- transcript (array of Q/A turns)
-- evidence_tags (array of strings)
-- summary (string)
-- quotes (array of objects with: id, text, context, tags)
-
-QUOTE STRUCTURE:
-- id: "E-001", "E-002", etc. (unique across all sessions)
-- text: the actual quote from the transcript
-- context: brief description of when/why this quote was said
-- tags: relevant evidence tags (pain_point, motivation, barrier, etc.)
-
+Return JSON with key "sessions": an array of sessions.
+{SESSION_FORMAT}
 GUIDE (JSON):
 {json.dumps(guide_obj, ensure_ascii=False)}
 
@@ -203,7 +354,7 @@ VOC EXCERPTS:
         )
         sessions = llm_json.get("data", {}).get("sessions", [])
         sessions = sessions if isinstance(sessions, list) else []
-        return sessions
+        return _assign_ids(sessions, run_ids(context))
 
     def run(self, context: dict, artifacts: dict) -> StepResult:
         """
@@ -215,7 +366,7 @@ VOC EXCERPTS:
         
         Конфигурация через input.interview_mode или data_availability (для обратной совместимости)
         """
-        run_dir: Path = context.get("run_dir") or ensure_run_dir()
+        run_dir: Path = context.get("run_dir") or ensure_run_dir(context.get("run_id"))
         input_cfg: dict = context.get("input", {})
         project_dir: Optional[Path] = context.get("project_dir")
 
@@ -230,7 +381,17 @@ VOC EXCERPTS:
         except Exception as e:
             return StepResult(score=0.0, notes=f"Guide not found: {e}")
 
-        val = self._validate_guide(guide_md, context)
+        # скомпилированный гайд кэшируется в GUIDE_CACHE_DIR по sha256 текста —
+        # LLM-разбор Core Questions только при изменении гайда
+        guide_sha = guide_sha256(guide_md)
+        use_cache = input_cfg.get("guide_cache", config.GUIDE_CACHE_ENABLED)
+        val = load_compiled_guide(guide_sha) if use_cache else None
+        guide_cache = "hit" if val else "off" if not use_cache else "miss"
+        if not val:
+            val = self._validate_guide(guide_md, context)
+            # пустой список вопросов — сбой LLM, такой разбор не кэшируем
+            if use_cache and val["guide"]["sections"]["core_questions"]:
+                save_compiled_guide(guide_sha, val)
         guide_obj = val["guide"]
         guide_schema_score = val["schema_score"]
 
@@ -251,64 +412,105 @@ VOC EXCERPTS:
 
         interviews_dir = Path(run_dir) / "interviews"
         produced_files = []
+        simulation = ingest = None
+        if interview_mode not in ("simulate", "ingest", "both"):
+            return StepResult(score=0.0, notes=f"Unknown interview mode: {interview_mode}. Supported: simulate, ingest, both")
+        if interview_mode != "simulate" and not input_cfg.get("files"):
+            return StepResult(score=0.0, notes=f"No files specified for {interview_mode} mode")
+        # корпус прогона (interviews/corpus.sqlite) — для адресных запросов следующих шагов
+        store = CorpusStore.create(interviews_dir)
 
         # 3) Выполняем в зависимости от режима
         if interview_mode == "simulate":
             n = int(input_cfg.get("n_interviews", 6))
-            sessions = self._simulate_interviews(guide_obj, n, personas, products, context)
             out = interviews_dir / "simulated.jsonl"
-            rows = [{"session": s} for s in sessions]
-            _write_jsonl(out, rows)
-            produced_files.append(str(out))
+            simulation = self._simulate_interviews(guide_obj, n, personas, products, context, out, store)
+            if simulation["sessions"]:
+                produced_files.append(str(out))
 
         elif interview_mode == "ingest":
-            files = input_cfg.get("files", [])
-            if not files:
-                return StepResult(score=0.0, notes="No files specified for ingest mode")
-            corpus_rows = _ingest_sources(files)
             out_ingest = interviews_dir / "ingest.jsonl"
-            _write_jsonl(out_ingest, corpus_rows)
+            ingest = ingest_files(input_cfg["files"], out_ingest, projections=input_cfg.get("ingest_projections"),
+                                  dedup=input_cfg.get("voc_dedup"))
+            store.add_records(read_records(out_ingest))
+            ingest["quotes"] = self._ingest_quotes(out_ingest, store, context, input_cfg)
             produced_files.append(str(out_ingest))
 
-        elif interview_mode == "both":
+        else:
             # Сначала ingest
-            files = input_cfg.get("files", [])
-            if not files:
-                return StepResult(score=0.0, notes="No files specified for both mode")
-            corpus_rows = _ingest_sources(files)
             out_ingest = interviews_dir / "ingest.jsonl"
-            _write_jsonl(out_ingest, corpus_rows)
+            ingest = ingest_files(input_cfg["files"], out_ingest, projections=input_cfg.get("ingest_projections"),
+                                  dedup=input_cfg.get("voc_dedup"))
+            store.add_records(read_records(out_ingest))
+            ingest["quotes"] = self._ingest_quotes(out_ingest, store, context, input_cfg)
             produced_files.append(str(out_ingest))
 
             # Потом догон-симуляция
             n_follow = int(input_cfg.get("n_interviews_after_ingest", 2))
-            sessions = self._gap_analysis_and_followups(guide_obj, corpus_rows, n_follow, context)
+            sample = sample_records(read_records(out_ingest), self.llm.estimate_tokens,
+                                    budget_tokens=input_cfg.get("voc_sample_tokens"))
+            ingest["sample"] = {"records": len(sample["records"]), "pool": sample["pool"],
+                                "tokens": sample["tokens"], "strata": sample["strata"]}
+            sessions = self._gap_analysis_and_followups(guide_obj, sample["records"], n_follow, context)
             out = interviews_dir / "after_ingest.jsonl"
             rows = [{"session": s} for s in sessions]
             _write_jsonl(out, rows)
+            store.add_sessions(sessions, "after_ingest")
             produced_files.append(str(out))
 
-        else:
-            return StepResult(score=0.0, notes=f"Unknown interview mode: {interview_mode}. Supported: simulate, ingest, both")
+        corpus = store.stats()
+        store.close()
 
         # отчёт
         report = [
             f"- Interview mode: {interview_mode}",
-            f"- Guide schema score: {guide_schema_score:.2f}",
-            f"- Produced: {produced_files}"
+            f"- Guide schema score: {guide_schema_score:.2f} (compiled guide cache: {guide_cache})",
+            f"- Produced: {produced_files}",
+            f"- Corpus: {corpus['path']} ({corpus['sessions']} sessions, {corpus['quotes']} quotes, {corpus['records']} VOC records)"
         ]
+        if ingest:
+            report.append(f"- Ingested: {ingest['records']} records from {len(ingest['files'])} files"
+                          f" (missing: {ingest['missing'] or 'none'})")
+            if "dedup" in ingest:
+                report.append(f"- Dedup: {ingest['dedup']['clusters']} clusters, {ingest['dedup']['duplicates']} duplicates"
+                              f" (all records: {ingest['dedup']['records_file']})")
+            report.append(f"- VOC quotes: {ingest['quotes']['quotes']} of {ingest['quotes']['candidates']} candidates"
+                          f" ({ingest['quotes'].get('labelled', 0)} labelled by LLM, {ingest['quotes'].get('dropped', 0)} dropped)")
+            if "sample" in ingest:
+                report.append(f"- Gap analysis sample: {ingest['sample']['records']} of {ingest['sample']['pool']} records,"
+                              f" ~{ingest['sample']['tokens']} tokens, strata {ingest['sample']['strata']['covered']}"
+                              f"/{ingest['sample']['strata']['total']}")
+        if simulation:
+            report.append(f"- Simulation: {simulation['sessions']} sessions from {simulation['shards']} shards"
+                          f" (failed shards: {simulation['failed_shards'] or 'none'})")
         save_md(Path(run_dir) / "step_03_report.md", "\n".join(report))
 
         # простая эвристика для score
         score = 0.9 if produced_files else 0.3
         notes = f"Interview collection completed in {interview_mode} mode." if produced_files else "No interview files produced."
+        data = {
+            "produced_files": produced_files, 
+            "guide_schema_score": guide_schema_score,
+            "guide_cache": guide_cache,
+            "interview_mode": interview_mode,
+            "corpus": corpus
+        }
+        uncertainty = 0.0
+        if ingest:
+            data["ingest"] = ingest
+            notes += f" Ingested {ingest['records']} VOC records from {len(ingest['files'])} files."
+            if "dedup" in ingest:
+                notes += (f" Near-duplicates collapsed into {ingest['dedup']['clusters']} representatives"
+                          f" (max frequency {ingest['dedup']['max_frequency']}).")
+        if simulation:
+            data["simulation"] = simulation
+            # несработавшие шарды — часть ячеек (персона × продукт) без интервью
+            uncertainty = len(simulation["failed_shards"]) / max(1, simulation["shards"])
+            notes += f" Simulated {simulation['sessions']} sessions in {simulation['shards']} parallel shards."
 
         return StepResult(
-            data={
-                "produced_files": produced_files, 
-                "guide_schema_score": guide_schema_score,
-                "interview_mode": interview_mode
-            },
+            data=data,
             score=score,
+            uncertainty=uncertainty,
             notes=notes
         )
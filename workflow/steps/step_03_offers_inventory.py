@@ -1,5 +1,42 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import config
 from .base import BaseStep, StepResult
 from llm.client import LLM
+from collectors.keywords import offer_matcher
+from collectors.snapshots import LandingSnapshots, changed_block_ids, stale_texts
+from utils.tracing import tracer
+
+# Офферы считаются одним, если совпадает нормализованный текст, наборы слов почти равны
+# или один текст содержит другой и они близки по длине
+NEAR_DUPLICATE_JACCARD = 0.8
+NEAR_DUPLICATE_CONTAINMENT = 0.7
+
+
+def _norm(text) -> str:
+    return re.sub(r"\s+", " ", str(text)).strip().lower()
+
+
+def _offer_key(text) -> str:
+    """Ключ для сравнения офферов: регистр, ё/е, пунктуация, кавычки и пробелы не важны."""
+    return " ".join(re.findall(r"\w+", _norm(text).replace("ё", "е")))
+
+
+def _reusable(result: dict) -> bool:
+    """В снимок и из снимка идут только успешные результаты: неудача не должна закрепляться."""
+    return "error" not in result["data"] and result["score"] >= config.QUALITY_THRESHOLD
+
+
+def _near_duplicate(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    short, long_ = sorted((a, b), key=len)
+    if short and short in long_ and len(short) / len(long_) >= NEAR_DUPLICATE_CONTAINMENT:
+        return True
+    wa, wb = set(a.split()), set(b.split())
+    return bool(wa and wb) and len(wa & wb) / len(wa | wb) >= NEAR_DUPLICATE_JACCARD
+
 
 class Step(BaseStep):
     name = "step_03_offers_inventory"
@@ -7,6 +44,7 @@ class Step(BaseStep):
     def __init__(self):
         super().__init__()
         self.llm = LLM()
+        self.offer_tagger = offer_matcher()
 
     def run(self, context: dict, artifacts: dict) -> StepResult:
         """
@@ -23,8 +61,31 @@ class Step(BaseStep):
                 notes="Cannot create offers inventory without extracted content"
             )
         
-        user_prompt = self._build_offers_prompt(extracted_content)
-        
+        # В режиме crawl берём сводный вид по всем страницам сайта
+        input_data = context.get("input", {})
+        self.offer_tagger = offer_matcher(input_data.get("project") or input_data.get("company"))
+        view = extracted_content.get("site") or extracted_content
+
+        # Инкрементальный прогон: результат по прошлому снимку лендинга + только изменённые блоки
+        snapshot, diff = extracted_content.get("snapshot"), extracted_content.get("diff")
+        snapshots = LandingSnapshots()
+        prior = None
+        # повтор после рефлексии должен дойти до LLM с reflection_notes, а не вернуть прошлый ответ
+        if (snapshot and diff and input_data.get("incremental", config.LANDING_INCREMENTAL)
+                and not context.get("reflection_notes")):
+            prior = snapshots.load_derived(snapshot["key"], diff["base_version"], self.name)
+            if prior is not None and not _reusable(prior):
+                prior = None
+        if prior is not None and not diff["changed"]:
+            return StepResult(
+                data=prior["data"],
+                score=prior["score"],
+                uncertainty=prior["uncertainty"],
+                notes=f"Landing unchanged since {diff['base_version']}; offers inventory reused without LLM call"
+            )
+        if prior is not None:
+            view = self._changed_view(view, diff)
+
         system_prompt = """You are an expert in marketing psychology and offer analysis. 
 Your task is to identify ALL offers, promises, and value propositions on a landing page.
 
@@ -43,67 +104,286 @@ Your response must include meta-fields for self-assessment:
 - uncertainty_score: float (0.0-1.0)  
 - reasoning: string (brief explanation)"""
 
+        competitors_block = self._build_competitors_block(artifacts.get("step_02c_competitors", {}))
         org_context = self._format_org_context(context.get("org_context", {}))
-        
-        llm_result = self.llm.generate_json(
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            org_context=org_context,
-            standard_schema=context.get("current_schema", {}),
-            standard_text=context.get("current_standard_text", ""),
-            reflection_notes=context.get("reflection_notes", "")
-        )
-        
+
+        # Блоки, уверенно размеченные локально (step_02b_initial_classification), в LLM не идут
+        view, local = self._apply_prelabels(view, artifacts.get("step_02b_initial_classification", {}))
+
+        # Map: весь контент страницы режется на чанки по бюджету токенов, офферы извлекаются
+        # параллельно; reduce: нормализация, слияние дублей, источники (id блоков)
+        units = self._content_units(view)
+        if not units and local:
+            return self._local_only(local, prior, diff, snapshot, snapshots)
+        chunks = self._chunk_units(units)
+        prompts = [self._build_offers_prompt(view.get("title", ""), chunk, i, len(chunks), incremental=prior is not None)
+                   + (competitors_block if i == 0 else "")
+                   for i, chunk in enumerate(chunks)]
+        with ThreadPoolExecutor(max_workers=config.OFFERS_MAP_CONCURRENCY, thread_name_prefix="offers") as pool:
+            futures = [pool.submit(tracer.wrap(self._map_chunk), i, system_prompt, prompt, org_context, context)
+                       for i, prompt in enumerate(prompts)]
+            results = [f.result() for f in futures]
+        # в режиме crawl блоки сводного вида знают свою страницу
+        urls = {b["id"]: b["source_url"] for b in view.get("blocks") or [] if b.get("source_url")}
+        llm_result = self._reduce(results, chunks, urls)
+
+        data, notes = llm_result["data"], llm_result["notes"]
+        if local:
+            data = self._add_local(data, local)
+            notes = f"{data['prelabelled']['offers']} offers from {len(data['prelabelled']['blocks'])} locally classified blocks. {notes}"
+        if prior is not None:
+            data = self._merge_with_prior(prior["data"], data, diff)
+            notes = (f"Incremental since {diff['base_version']}: {len(view.get('blocks', []))} changed blocks reprocessed, "
+                     f"{data['incremental']['reused']} offers reused. {notes}")
+        derived = {"data": data, "score": llm_result["score"], "uncertainty": llm_result["uncertainty"]}
+        if snapshot and _reusable(derived):
+            snapshots.save_derived(snapshot["key"], snapshot["version"], self.name, derived)
+
         return StepResult(
-            data=llm_result["data"],
+            data=data,
             score=llm_result["score"],
             uncertainty=llm_result["uncertainty"],
-            notes=llm_result["notes"]
+            notes=notes
         )
+
+    def _apply_prelabels(self, view: dict, prelabels: dict) -> tuple:
+        """
+        Убирает из вида решённые локально блоки. Возвращает (вид, None) или
+        (вид, {"blocks": id решённых блоков, "offers": их офферы, "confidence": минимальная уверенность}).
+        """
+        decided = set(prelabels.get("decided") or [])
+        blocks = view.get("blocks")
+        if not decided or blocks is None:
+            return view, None
+        present = [b["id"] for b in blocks if b["id"] in decided]
+        if not present:
+            return view, None
+        local = {
+            "blocks": present,
+            "offers": [o for o in prelabels.get("offers", []) if o["sources"][0] in decided],
+            "confidence": min(b["confidence"] for b in prelabels.get("blocks", []) if b["id"] in present),
+        }
+        return {**view, "blocks": [b for b in blocks if b["id"] not in decided]}, local
+
+    def _add_local(self, data: dict, local: dict) -> dict:
+        """Офферы решённых блоков — в общий инвентарь; почти-дубли ответа LLM не добавляются."""
+        keys = [_offer_key(o.get("text", "")) for o in data.get("offers", [])]
+        added = []
+        for offer in local["offers"]:
+            key = _offer_key(offer["text"])
+            if not any(_near_duplicate(k, key) for k in keys):
+                keys.append(key)
+                added.append(offer)
+        return {**data, "offers": data.get("offers", []) + added,
+                "prelabelled": {"blocks": local["blocks"], "offers": len(added)}}
+
+    def _local_only(self, local: dict, prior, diff, snapshot, snapshots) -> StepResult:
+        """Весь контент размечен локально — LLM не вызывается; оценка — уверенность классификатора."""
+        data = self._add_local({"offers": []}, local)
+        score, uncertainty = local["confidence"], round(1.0 - local["confidence"], 3)
+        notes = (f"All {len(local['blocks'])} content blocks classified locally: "
+                 f"{data['prelabelled']['offers']} offers, no LLM call")
+        if prior is not None:
+            data = self._merge_with_prior(prior["data"], data, diff)
+        derived = {"data": data, "score": score, "uncertainty": uncertainty}
+        if snapshot and _reusable(derived):
+            snapshots.save_derived(snapshot["key"], snapshot["version"], self.name, derived)
+        return StepResult(data=data, score=score, uncertainty=uncertainty, notes=notes)
+
+    def _changed_view(self, view: dict, diff: dict) -> dict:
+        """Только то, что появилось или изменилось со времени прошлого снимка."""
+        changed = changed_block_ids(diff)
+        return {
+            "title": view.get("title", ""),
+            "headings": diff["headings"]["added"],
+            "ctas": diff["ctas"]["added"],
+            "blocks": [b for b in view.get("blocks", []) if b["id"] in changed],
+            "lists": diff["lists"]["added"],
+        }
+
+    def _merge_with_prior(self, prior: dict, fresh: dict, diff: dict) -> dict:
+        """Офферы прошлого прогона минус исчезнувшие с лендинга + офферы из изменённых блоков."""
+        stale = [_norm(text) for text in stale_texts(diff)]
+        kept = [o for o in prior.get("offers", [])
+                if not any(_norm(o.get("text", "")) in text for text in stale)]
+        seen = {_norm(o.get("text", "")) for o in kept}
+        added = [o for o in fresh.get("offers", []) if _norm(o.get("text", "")) not in seen]
+        return {
+            **fresh,
+            "offers": kept + added,
+            "incremental": {
+                "base_version": diff["base_version"],
+                "reused": len(kept),
+                "dropped": len(prior.get("offers", [])) - len(kept),
+                "new": len(added),
+            },
+        }
     
-    def _build_offers_prompt(self, extracted_content: dict) -> str:
-        """Формирует промпт для анализа предложений."""
-        
-        prompt = f"""Extract ALL offers and value propositions from this landing page content:
+    def _content_units(self, view: dict) -> list:
+        """
+        Весь контент страницы фрагментами (id, текст) в порядке документа: CTA одним фрагментом,
+        затем контент-блоки; для извлечений без блоков — заголовки, секции и списки.
+        """
+        units = []
+        ctas = list(dict.fromkeys(c["text"] for c in view.get("ctas", []) if c.get("text")))
+        if ctas:
+            units.append(("CTA", "\n".join(ctas)))
+        blocks = view.get("blocks")
+        if blocks is not None:
+            units += [(b["id"], b["text"]) for b in blocks]
+            return units
+        headings = [f"H{h['level']}: {h['text']}" for h in view.get("headings", [])]
+        if headings:
+            units.append(("H", "\n".join(headings)))
+        units += [(f"S-{i + 1}", s["content"]) for i, s in enumerate(view.get("sections", []))]
+        units += [(f"L-{i + 1}", "\n".join(lst["items"])) for i, lst in enumerate(view.get("lists", []))]
+        return units
+
+    def _chunk_units(self, units: list) -> list:
+        """Жадная упаковка фрагментов в чанки по OFFERS_CHUNK_TOKENS; длинный фрагмент режется по строкам."""
+        budget = config.OFFERS_CHUNK_TOKENS
+        pieces = []
+        for unit_id, text in units:
+            if self.llm.estimate_tokens(text) <= budget:
+                pieces.append((unit_id, text))
+                continue
+            part = []
+            for line in text.split("\n"):
+                if part and self.llm.estimate_tokens("\n".join(part + [line])) > budget:
+                    pieces.append((unit_id, "\n".join(part)))
+                    part = []
+                part.append(line)
+            if part:
+                pieces.append((unit_id, "\n".join(part)))
+
+        chunks, current, used = [], [], 0
+        for unit_id, text in pieces:
+            tokens = self.llm.estimate_tokens(text)
+            if current and used + tokens > budget:
+                chunks.append(current)
+                current, used = [], 0
+            current.append((unit_id, text))
+            used += tokens
+        if current or not chunks:
+            chunks.append(current)
+        return chunks
+
+    def _map_chunk(self, index: int, system_prompt: str, user_prompt: str, org_context: str, context: dict) -> dict:
+        with tracer.span("offers.chunk", kind="map", chunk=index):
+            return self.llm.generate_json(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                org_context=org_context,
+                standard_schema=context.get("current_schema", {}),
+                standard_text=context.get("current_standard_text", ""),
+                reflection_notes=context.get("reflection_notes", "")
+            )
+
+    def _reduce(self, results: list, chunks: list, urls: dict = None) -> dict:
+        """Слияние офферов чанков: дубли и почти-дубли объединяются, источники (id фрагментов) копятся."""
+        merged, raw, failed = [], 0, []
+        for index, (result, chunk) in enumerate(zip(results, chunks)):
+            if "error" in result["data"]:
+                failed.append(index)
+                continue
+            unit_ids = [unit_id for unit_id, _ in chunk]
+            for offer in result["data"].get("offers", []):
+                if not isinstance(offer, dict) or not offer.get("text"):
+                    continue
+                raw += 1
+                key = _offer_key(offer["text"])
+                source = offer.get("source_id")
+                if source not in unit_ids:
+                    # источник не указан или указан неверно — ищем текст оффера во фрагментах чанка
+                    source = next((unit_id for unit_id, text in chunk if key and key in _offer_key(text)), None)
+                existing = next((m for m in merged if _near_duplicate(m["_key"], key)), None)
+                if existing is None:
+                    existing = {**{k: v for k, v in offer.items() if k != "source_id"}, "sources": [], "_key": key}
+                    merged.append(existing)
+                else:
+                    existing["strength"] = max(existing.get("strength", 1), offer.get("strength", 1))
+                if source and source not in existing["sources"]:
+                    existing["sources"].append(source)
+
+        ok = [r for i, r in enumerate(results) if i not in failed]
+        offers = [{k: v for k, v in m.items() if k != "_key"} for m in merged]
+        if urls:
+            for offer in offers:
+                offer["source_urls"] = list(dict.fromkeys(urls[s] for s in offer["sources"] if s in urls))
+        data = {
+            "offers": offers,
+            "map_reduce": {"chunks": len(chunks), "failed_chunks": failed, "raw_offers": raw, "merged_offers": len(offers)},
+        }
+        if not ok:
+            data["error"] = results[0]["data"].get("error", "All chunks failed") if results else "No content"
+        notes = (f"Map-reduce over {len(chunks)} chunks ({len(failed)} failed): {raw} offers extracted, "
+                 f"{len(offers)} after dedupe. " + " ".join(r["notes"] for r in ok[:1]))
+        return {
+            "data": data,
+            "score": sum(r["score"] for r in ok) / len(ok) if ok else 0.0,
+            # непрочитанные чанки — часть страницы не разобрана
+            "uncertainty": min(1.0, max([r["uncertainty"] for r in ok], default=1.0) + len(failed) / max(1, len(chunks))),
+            "notes": notes.strip(),
+        }
 
-TITLE: {extracted_content.get('title', 'N/A')}
+    def _build_offers_prompt(self, title: str, chunk: list, index: int = 0, total: int = 1,
+                             incremental: bool = False) -> str:
+        """Формирует промпт для анализа предложений одного чанка контента."""
 
-HEADINGS:
+        scope = ("Only the parts of the landing page that CHANGED since the previous analysis are shown below; "
+                 "extract the offers they contain.\n\n") if incremental else ""
+        part = f" (part {index + 1} of {total})" if total > 1 else ""
+        prompt = f"""{scope}Extract ALL offers and value propositions from this landing page content{part}:
+
+TITLE: {title or 'N/A'}
+
+CONTENT FRAGMENTS:
 """
-        
-        for heading in extracted_content.get('headings', []):
-            prompt += f"H{heading['level']}: {heading['text']}\n"
-        
-        prompt += "\nCTAs:\n"
-        for cta in extracted_content.get('ctas', []):
-            prompt += f"- {cta['text']}\n"
-        
-        prompt += "\nCONTENT SECTIONS:\n"
-        for i, section in enumerate(extracted_content.get('sections', [])[:7]):
-            prompt += f"{i+1}. {section['content'][:400]}...\n\n"
-        
-        prompt += "\nFEATURE LISTS:\n"
-        for lst in extracted_content.get('lists', []):
-            for item in lst['items'][:8]:
-                prompt += f"• {item}\n"
-        
-        prompt += """
+        tag = self._offer_tags
+        for unit_id, text in chunk:
+            prompt += f"[{unit_id}] {tag(text)}{text}\n\n"
 
+        prompt += """
 Instructions:
 1. Find EVERY offer, promise, benefit, or value proposition in the content above
 2. Extract the EXACT text as it appears (don't paraphrase)
 3. Classify each offer by type
 4. Be comprehensive - don't miss subtle offers in headings, CTAs, or body text
 5. If you see "бесплатно", "скидка", "%", numbers, testimonials - these are likely offers
+6. Lines may be pre-tagged with [offer hints] by a keyword matcher — use them as hints, not as the final type
+7. For each offer set "source_id" to the [id] of the fragment it was taken from
 
 Remember: We want a complete inventory, not an evaluation. Just extract and classify."""
 
         return prompt
     
+    def _offer_tags(self, text: str) -> str:
+        """Подсказки типов офферов из словаря collectors.keywords (скидка, бесплатно, гарантия...)."""
+        labels = self.offer_tagger.labels(text)
+        return f"[{', '.join(labels)}] " if labels else ""
+
     def _format_org_context(self, org_context: dict) -> str:
         """Форматирует организационный контекст."""
         formatted = ""
         for name, content in org_context.items():
             if content and len(content.strip()) > 10:
                 formatted += f"\n{name}:\n{content[:500]}...\n"
-        return formatted if formatted else "No organizational context provided."
\ No newline at end of file
+        return formatted if formatted else "No organizational context provided."
+
+    def _build_competitors_block(self, competitors_artifact: dict) -> str:
+        """Компактные диффы с конкурентами (step_02c_competitors) вместо их сырого текста."""
+        lines = []
+        for c in competitors_artifact.get("competitors", []):
+            if c.get("status") != "ok" or "diff" not in c:
+                continue
+            diff = c["diff"]
+            lines.append(
+                f"- {c['name']}: their-only themes: {', '.join(diff['their_only_themes']) or '-'}; "
+                f"our-only themes: {', '.join(diff['our_only_themes']) or '-'}; "
+                f"their CTAs: {', '.join(diff['their_only_ctas'][:5]) or '-'}; "
+                f"prices: {', '.join(diff['their_price_points'][:5]) or '-'}"
+            )
+        if not lines:
+            return ""
+        return ("\n\nCOMPETITOR CONTEXT (for reference only — do NOT list competitor offers as ours):\n"
+                + "\n".join(lines))
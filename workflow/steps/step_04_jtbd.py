@@ -1,38 +1,52 @@
 # workflow/steps/step_04_jtbd.py
 from __future__ import annotations
 from pathlib import Path
-import json
-from typing import List, Dict, Any
+from itertools import zip_longest
+from typing import List, Dict, Any, Tuple
 
+import config
 from .base import BaseStep, StepResult
+from collectors.session_digest import clip, render
+from utils.corpus_store import CorpusStore
 from utils.io import ensure_run_dir
 from llm.client import LLM
 from validators.standards_loader import load_core_standards
 from validators.validate import validate_artifact
 
 
-def _read_jsonl(path: Path) -> List[dict]:
-    if not path.exists():
-        return []
-    rows = []
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                rows.append(json.loads(line))
-            except Exception:
-                continue
-    return rows
-
-
-def _load_corpus(run_dir: Path) -> List[dict]:
-    interviews_dir = run_dir / "interviews"
-    rows: List[dict] = []
-    for name in ("simulated.jsonl", "ingest.jsonl", "after_ingest.jsonl"):
-        rows.extend(_read_jsonl(interviews_dir / name))
-    return rows
+MAX_DIGESTS_PER_PRODUCT = 200
+TOP_VOC_RECORDS = 10
+VOC_RECORD_CHARS = 300
+
+
+def _evidence_digest(store: CorpusStore, products: list, estimate_tokens, budget_tokens: int) -> Tuple[str, dict]:
+    """
+    Доказательства для промпта в бюджете токенов: дайджесты сессий (collectors.session_digest —
+    резюме, работы, цитаты с E-id) по кругу между продуктами, на остаток бюджета — самые частые
+    VOC-записи ingest. Возвращает (текст, {"sessions": в промпте, "records": в промпте}).
+    """
+    labels = [p.get("name") or p.get("id") if isinstance(p, dict) else p for p in products or []]
+    groups = [store.digests(product=label, limit=MAX_DIGESTS_PER_PRODUCT) for label in labels]
+    if not any(groups):
+        groups = [store.digests(limit=MAX_DIGESTS_PER_PRODUCT * max(1, len(labels)))]
+    parts, spent, used = [], 0, {"sessions": 0, "records": 0}
+    for digest in (d for row in zip_longest(*groups) for d in row if d):
+        text = render(digest)
+        cost = estimate_tokens(text)
+        if spent + cost > budget_tokens:
+            break
+        parts.append(text)
+        spent += cost
+        used["sessions"] += 1
+    for record in store.records(limit=TOP_VOC_RECORDS):
+        text = f"VOC {record.get('source')}:{record.get('id')} ×{record.get('frequency', 1)}: {clip(record.get('text'), VOC_RECORD_CHARS)}"
+        cost = estimate_tokens(text)
+        if spent + cost > budget_tokens:
+            break
+        parts.append(text)
+        spent += cost
+        used["records"] += 1
+    return "\n".join(parts), used
 
 
 class Step(BaseStep):
@@ -42,25 +56,24 @@ class Step(BaseStep):
         self.llm = LLM()
 
     def run(self, context: dict, artifacts: dict) -> StepResult:
-        run_dir: Path = context.get("run_dir") or ensure_run_dir()
+        run_dir: Path = context.get("run_dir") or ensure_run_dir(context.get("run_id"))
         standards: Dict[str, str] = load_core_standards(context.get("project_dir"))
 
-        corpus = _load_corpus(run_dir)
-        if not corpus:
+        store = CorpusStore.open(run_dir)
+        corpus = store.stats() if store else {}
+        if not corpus.get("sessions") and not corpus.get("records"):
+            if store:
+                store.close()
             return StepResult(score=0.2, notes="No interview corpus found. Run step_03 first.")
+        evidence, evidence_used = _evidence_digest(store, context["input"].get("products", []),
+                                                   self.llm.estimate_tokens, config.JTBD_EVIDENCE_TOKENS)
+        store.close()
 
         # Получаем стандарты и гайды
         tdd = standards.get("tdd.md", "")
         jtbd_std = standards.get("jtbd.md", "")
         evidence_tags_md = (context.get("guides", {}) or {}).get("Evidence_Tags.md", "")
 
-        # Сделаем компактный превью корпуса (LLM-friendly)
-        preview_chunks = []
-        for row in corpus[:20]:  # safety cap
-            session = row.get("session") or row
-            preview_chunks.append(json.dumps(session, ensure_ascii=False)[:1200])
-        preview = "\n---\n".join(preview_chunks)
-
         system_prompt = (
             "You are a senior JTBD analyst. Produce structured JTBD items that VALIDATE against the JSON Schema. "
             "Attach evidence_refs with quotes and canonical tags. Follow TDD standard (red→green→refactor, 5 whys, DOD)."
@@ -70,7 +83,7 @@ class Step(BaseStep):
 INPUT CONTEXT:
 - Company: {context['input'].get('company', 'N/A')}
 - Products: {context['input'].get('products', [])}
-- Raw interviews/reviews may be available in artifacts and previous steps.
+- Interview corpus: {corpus['sessions']} sessions, {corpus['quotes']} quotes, {corpus['records']} VOC records.
 
 REQUIREMENTS:
 1) Follow JTBD standard and TDD rules strictly.
@@ -79,6 +92,11 @@ REQUIREMENTS:
 3) Use tag families from Evidence Tags guide.
 4) Output MUST validate against step_04_jtbd.schema.json.
 
+INTERVIEW EVIDENCE (reuse these E- ids in evidence_refs where they support a job):
+---
+{evidence}
+---
+
 EVIDENCE TAGS GUIDE:
 ---
 {evidence_tags_md[:2500]}
@@ -114,5 +132,6 @@ TDD:
         self_score = float(resp.get("score", 0.7))
         final_score = min(self_score, schema_score, checklist_score)
 
-        notes = f"JTBD built. Validation: {validation_notes}. LLM notes: {resp.get('notes','')}"
+        notes = (f"JTBD built from {evidence_used['sessions']}/{corpus['sessions']} session digests and "
+                 f"{evidence_used['records']} VOC records. Validation: {validation_notes}. LLM notes: {resp.get('notes','')}")
         return StepResult(data=data, score=final_score, notes=notes, uncertainty=float(resp.get("uncertainty", 0.2)))
@@ -1,6 +1,7 @@
 from .base import BaseStep, StepResult
 from llm.client import LLM
 from validators.standards_loader import get_standard_for_step
+from collectors.landing import select_blocks
 
 class Step(BaseStep):
     name = "step_05_segments"
@@ -10,7 +11,9 @@ class Step(BaseStep):
         md = get_standard_for_step(self.name, None, context.get("md_standards", {}))
         org = context.get("org_context", {})
         jtbd = artifacts.get("step_04_jtbd", {})
-        lp_text = artifacts.get("step_02_extract", {}).get("full_text","")
+        extracted = artifacts.get("step_02_extract", {})
+        blocks = (extracted.get("site") or extracted).get("blocks")
+        lp_text = "\n\n".join(b["text"] for b in select_blocks(blocks)) if blocks else extracted.get("full_text","")
 
         system = "You are a market analyst. Follow the standard, self-check via checklist/red-flags, and return data validating the schema. Include evidence_refs with quotes and canonical tags for all segments."
         user = (